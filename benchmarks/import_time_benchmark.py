@@ -0,0 +1,73 @@
+"""
+Time the cold start of the app, i.e. importing the pages, with `python -X importtime`.
+Prints the modules that take longest and exits with an error when the total is over the budget.
+
+    python -m benchmarks.import_time_benchmark --budget 2.5
+"""
+
+import argparse
+import subprocess
+import sys
+
+DEFAULT_MODULE = "pyopera.accumulate_pages"
+
+# seconds, the pages import without pandas, plotly, reverse_geocoder, PIL, requests and argon2
+DEFAULT_BUDGET_SECONDS = 2.5
+
+
+def measure_import(module: str) -> dict[str, tuple[int, int, int]]:
+    """
+    Import `module` in a new interpreter. Returns the self and cumulative microseconds and the
+    nesting level of every imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        timings[name.strip()] = (int(self_us), int(cumulative_us), level)
+
+    return timings
+
+
+def total_seconds(timings: dict[str, tuple[int, int, int]]) -> float:
+    # the cumulative time of the top level imports includes everything they import
+    return sum(cumulative_us for _, cumulative_us, level in timings.values() if level == 0) / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="seconds")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # the first runs also compile the bytecode and warm the file system cache, keep the fastest
+    runs = [measure_import(args.module) for _ in range(args.repeats)]
+    timings = min(runs, key=total_seconds)
+    total = total_seconds(timings)
+
+    print(f"Slowest imports of {args.module} (cumulative):")
+    for name, (self_us, cumulative_us, _) in sorted(timings.items(), key=lambda item: -item[1][1])[: args.top]:
+        print(f"{cumulative_us / 1e3:>10.1f} ms {self_us / 1e3:>10.1f} ms self  {name}")
+
+    print(f"Total: {total:.3f} s (budget {args.budget:.3f} s)")
+
+    if total > args.budget:
+        print(f"Importing {args.module} is over the budget by {total - args.budget:.3f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Time building performances from stored items, per 10k items.
+
+    python -m benchmarks.load_benchmark
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from benchmarks.synthetic_data import create_synthetic_items
+from pyopera.common import Performance
+from pyopera.deta_base import SCHEMA_VERSION_ATTRIBUTE, validate_items
+from pyopera.local_snapshot import get_schema_version
+
+
+def time_per_10k(load: Callable[[], list], count: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+
+    return best * 10_000 / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    items = create_synthetic_items(args.count)
+    schema_version = get_schema_version(Performance)
+    for item in items:
+        item[SCHEMA_VERSION_ATTRIBUTE] = schema_version
+
+    modes = {
+        "one by one": lambda: [Performance(**item) for item in items],
+        "type adapter": lambda: validate_items(Performance, items),
+        "trusted": lambda: validate_items(Performance, items, trusted=True),
+    }
+
+    for mode, load in modes.items():
+        print(f"{mode:>14}: {time_per_10k(load, args.count, args.repeats):.3f} s per 10k performances")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare serial and parallel (segmented) scans of the performances table.
+
+Requires a local DynamoDB stand-in, e.g.
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python -m benchmarks.scan_benchmark --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import time
+
+import boto3
+
+from benchmarks.synthetic_data import create_synthetic_items
+from pyopera.dynamodb_backend import scan_table_items
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def create_populated_table(dynamodb, size: int):
+    table_name = f"scan_benchmark_{size}"
+
+    try:
+        table = dynamodb.Table(table_name)
+        table.load()
+        if table.item_count >= size:
+            return table
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        table = dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{"AttributeName": "key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "key", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table.meta.client.get_waiter("table_exists").wait(TableName=table_name)
+
+    with table.batch_writer() as batch:
+        for item in create_synthetic_items(size):
+            batch.put_item(Item=item)
+
+    return table
+
+
+def time_scan(table, total_segments: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scan_table_items(table, total_segments)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint-url", default="http://localhost:8000")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource(
+        "dynamodb",
+        endpoint_url=args.endpoint_url,
+        region_name="us-east-1",
+        aws_access_key_id="local",
+        aws_secret_access_key="local",
+    )
+
+    print(f"{'items':>8} {'serial [s]':>12} {'parallel [s]':>14} {'speedup':>8}")
+    for size in args.sizes:
+        table = create_populated_table(dynamodb, size)
+        serial = time_scan(table, 1, args.repeats)
+        parallel = time_scan(table, args.segments, args.repeats)
+        print(f"{size:>8} {serial:>12.3f} {parallel:>14.3f} {serial / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
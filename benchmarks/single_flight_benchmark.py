@@ -0,0 +1,73 @@
+"""
+Simulate many sessions reading the performances right after the cache was invalidated and
+count the scans. With single-flight loading every invalidation causes exactly one scan.
+
+The scan is a local stand-in that builds synthetic performances after some latency.
+
+    python -m benchmarks.single_flight_benchmark --sessions 50 --invalidations 5
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic_data import create_synthetic_items
+from pyopera.common import Performance
+from pyopera.deta_base import EnumToSortKey, TableCache, validate_items
+
+
+class CountingScan:
+    def __init__(self, count: int, latency: float) -> None:
+        self._items = create_synthetic_items(count)
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def __call__(self) -> list[Performance]:
+        with self._lock:
+            self.scans += 1
+
+        time.sleep(self._latency)
+        return validate_items(Performance, self._items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--invalidations", type=int, default=5)
+    parser.add_argument("--count", type=int, default=1_000)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per scan")
+    args = parser.parse_args()
+
+    scan = CountingScan(args.count, args.latency)
+    table_cache = TableCache(EnumToSortKey.get(Performance))
+
+    # all sessions rerun at the same moment, like after an edit
+    barrier = threading.Barrier(args.sessions)
+
+    def run_session() -> int:
+        barrier.wait()
+        return len(table_cache.get(scan))
+
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        for invalidation in range(1, args.invalidations + 1):
+            table_cache.invalidate()
+            scans_before = scan.scans
+
+            start = time.perf_counter()
+            sizes = list(executor.map(lambda _: run_session(), range(args.sessions)))
+            seconds = time.perf_counter() - start
+
+            scans = scan.scans - scans_before
+            assert all(size == args.count for size in sizes)
+            print(f"invalidation {invalidation}: {args.sessions} sessions, {scans} scan(s), {seconds:.3f} s")
+
+            if scans != 1:
+                raise SystemExit(f"Expected exactly one scan per invalidation, got {scans}")
+
+    print(f"{scan.scans} scans for {args.invalidations} invalidations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import json
+import random
+from datetime import date, timedelta
+
+from pyopera.common import ApproxDate, Performance
+
+COMPOSERS = ["Giuseppe Verdi", "Richard Wagner", "Wolfgang Amadeus Mozart", "Giacomo Puccini", "Richard Strauss"]
+STAGES = ["WSO", "BSO", "ROH", "MET", "SCA", "TAW"]
+ROLES = ["Tosca", "Cavaradossi", "Scarpia", "Spoletta", "Sciarrone", "Angelotti", "Mesner", "Hirt"]
+LEADING_ROLES = ["Musikalische Leitung", "Inszenierung", "Bühne", "Kostüme", "Licht"]
+
+
+def create_synthetic_performance(rng: random.Random) -> Performance:
+    day = date(1990, 1, 1) + timedelta(days=rng.randrange(12_000))
+
+    return Performance(
+        name=f"Opera {rng.randrange(300)}",
+        date=ApproxDate(earliest_date=day, latest_date=day),
+        cast={role: [f"Singer {rng.randrange(5_000)}"] for role in rng.sample(ROLES, k=6)},
+        leading_team={role: [f"Person {rng.randrange(2_000)}"] for role in LEADING_ROLES},
+        stage=rng.choice(STAGES),
+        production=rng.choice(STAGES),
+        composers=[rng.choice(COMPOSERS)],
+        comments="",
+        is_concertante=rng.random() < 0.1,
+    )
+
+
+def create_synthetic_items(count: int, seed: int = 0) -> list[dict]:
+    """
+    Create `count` performances in the form they are stored in DynamoDB.
+    """
+    rng = random.Random(seed)
+    return [json.loads(create_synthetic_performance(rng).model_dump_json()) for _ in range(count)]
@@ -3,9 +3,12 @@ from typing import Callable
 import streamlit as st
 
 from pyopera.add_seen_performance import run as run_add_seen_performance
+from pyopera.db_metrics import set_current_page
+from pyopera.deta_base import prefetch_tables
 from pyopera.generate_logo import generate_logo
 from pyopera.show_overview import run as run_overview
 from pyopera.show_stats import run as run_stats
+from pyopera.streamlit_common import run_with_staleness_indicator
 from pyopera.visualize_json import run as run_vis_json
 
 CALLABLE_TITLE_ICON: list[tuple[Callable[[], None], str, str]] = [
@@ -31,6 +34,11 @@ def main():
 
     st.session_state.run_counter += 1
 
+    # on the first run of the process, the small tables load in the background while the navigation
+    # and the page are set up
+    prefetch_tables()
+
     st.logo(generate_logo(), size="large")
     page = st.navigation(create_pages())
-    page.run()
+    set_current_page(page.title)
+    run_with_staleness_indicator(page.run)
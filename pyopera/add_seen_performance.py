@@ -1,13 +1,19 @@
 import streamlit as st
 
 from pyopera.common import PasswordModel
-from pyopera.deta_base import DatabaseInterface
+from pyopera.deta_base import get_interface
 from pyopera.edit_main_db import run as edit_main_db
 from pyopera.edit_venues_db import run as edit_venues_db
 from pyopera.edit_works_year_db import run as edit_works_year_db
-from pyopera.streamlit_common import runs_on_streamlit_sharing
+from pyopera.show_db_metrics import run as show_db_metrics
+from pyopera.streamlit_common import (
+    PERFORMANCES_INTERFACE,
+    VENUES_INTERFACE,
+    WORKS_DATES_INTERFACE,
+    runs_on_streamlit_sharing,
+)
 
-PASS_INTERFACE = DatabaseInterface(PasswordModel)
+PASS_INTERFACE = get_interface(PasswordModel)
 
 
 def fetch_password() -> PasswordModel:
@@ -52,6 +58,7 @@ def run():
         edit_main_db: ":material/storage: Main database",
         edit_works_year_db: ":material/edit_calendar: Year of first performance",
         edit_venues_db: ":material/home: Venues",
+        show_db_metrics: ":material/monitoring: Database usage",
     }
 
     with st.sidebar:
@@ -61,6 +68,10 @@ def run():
             format_func=func_to_title.get,
         )
 
+        if st.button("Reload from database", icon=":material/refresh:"):
+            for interface in (PERFORMANCES_INTERFACE, VENUES_INTERFACE, WORKS_DATES_INTERFACE):
+                interface.refresh_db()
+
         st.markdown("---")
 
     function()
@@ -0,0 +1,172 @@
+"""
+Stream the archive tables to and from JSONL files, one entry per line.
+
+    python -m pyopera.archive_io export performances performances.jsonl
+    python -m pyopera.archive_io import performances performances.jsonl
+
+Both directions keep a checkpoint file next to the JSONL file. If a run is
+interrupted, running the same command again with --resume continues where it stopped.
+"""
+
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from pydantic import ValidationError
+
+from pyopera.deta_base import DatabaseInterface, DatabaseName, EnumToModel, get_interface
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_WORKERS = 4
+
+
+def get_checkpoint_path(jsonl_path: Path) -> Path:
+    return jsonl_path.with_name(jsonl_path.name + ".checkpoint")
+
+
+def load_checkpoint(jsonl_path: Path) -> Optional[dict[str, Any]]:
+    try:
+        return json.loads(get_checkpoint_path(jsonl_path).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(jsonl_path: Path, checkpoint: dict[str, Any]) -> None:
+    checkpoint_path = get_checkpoint_path(jsonl_path)
+    temporary_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    temporary_path.write_text(json.dumps(checkpoint))
+    os.replace(temporary_path, checkpoint_path)
+
+
+def export_table(interface: DatabaseInterface, output_path: Path, resume: bool) -> int:
+    """
+    Write every entry of the table to the output file, one page in memory at a time.
+    """
+    checkpoint = load_checkpoint(output_path) if resume else None
+
+    if checkpoint is None:
+        start_token, rows, offset = None, 0, 0
+    else:
+        start_token, rows, offset = checkpoint["token"], checkpoint["rows"], checkpoint["offset"]
+
+    with open(output_path, "r+b" if checkpoint is not None else "wb") as file:
+        # drop anything that was written after the last checkpoint
+        file.seek(offset)
+        file.truncate()
+
+        for entries, next_token in interface.iter_pages(start_token):
+            for entry in entries:
+                file.write(entry.model_dump_json().encode() + b"\n")
+
+            rows += len(entries)
+            file.flush()
+            os.fsync(file.fileno())
+
+            if next_token is not None:
+                write_checkpoint(output_path, dict(token=next_token, rows=rows, offset=file.tell()))
+
+            print(f"Exported {rows} entries", flush=True)
+
+    get_checkpoint_path(output_path).unlink(missing_ok=True)
+    return rows
+
+
+def iter_batches(
+    file, offset: int, line_number: int, batch_size: int
+) -> Iterator[tuple[list[tuple[int, str]], int, int]]:
+    """
+    Starting at `offset` (which is after line `line_number`), yield batches of
+    (line number, line) together with the last line number and the file offset after the batch.
+    """
+    file.seek(offset)
+    batch = []
+    for line in iter(file.readline, b""):
+        line_number += 1
+        if line.strip() != b"":
+            batch.append((line_number, line.decode()))
+
+        if len(batch) >= batch_size:
+            yield batch, line_number, file.tell()
+            batch = []
+
+    if len(batch) > 0:
+        yield batch, line_number, file.tell()
+
+
+def validate_batch(interface: DatabaseInterface, batch: list[tuple[int, str]]) -> list:
+    entries = []
+    for line_number, line in batch:
+        try:
+            entries.append(interface.create_instance(**json.loads(line)))
+        except (json.JSONDecodeError, ValidationError) as e:
+            raise ValueError(f"Invalid entry on line {line_number}: {e}") from e
+
+    return entries
+
+
+def import_table(interface: DatabaseInterface, input_path: Path, resume: bool) -> int:
+    """
+    Validate the entries of the input file and write them in parallel batches. At most
+    a few batches are held in memory at any time.
+    """
+    checkpoint = load_checkpoint(input_path) if resume else None
+
+    if checkpoint is None:
+        offset, rows, line_number = 0, 0, 0
+    else:
+        offset, rows, line_number = checkpoint["offset"], checkpoint["rows"], checkpoint["lines"]
+
+    # (write of the batch, number of entries, last line, offset after the batch)
+    in_flight: deque[tuple[Future, int, int, int]] = deque()
+
+    def complete_oldest() -> None:
+        nonlocal rows
+        future, batch_rows, last_line, batch_offset = in_flight.popleft()
+        future.result()
+
+        # batches are checkpointed in file order, so everything before the offset has been written
+        rows += batch_rows
+        write_checkpoint(input_path, dict(offset=batch_offset, rows=rows, lines=last_line))
+        print(f"Imported {rows} entries", flush=True)
+
+    with open(input_path, "rb") as file, ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        for batch, last_line, batch_offset in iter_batches(file, offset, line_number, IMPORT_BATCH_SIZE):
+            entries = validate_batch(interface, batch)
+            # replicas reload the table instead of reading every imported entry from the change log
+            future = executor.submit(interface.put_many, entries, log_items=False)
+            in_flight.append((future, len(entries), last_line, batch_offset))
+
+            if len(in_flight) >= 2 * IMPORT_WORKERS:
+                complete_oldest()
+
+        while len(in_flight) > 0:
+            complete_oldest()
+
+    get_checkpoint_path(input_path).unlink(missing_ok=True)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("direction", choices=["export", "import"])
+    parser.add_argument("table", choices=[db_name.value for db_name in DatabaseName])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    interface = get_interface(EnumToModel[DatabaseName(args.table)])
+
+    if args.direction == "export":
+        rows = export_table(interface, args.path, args.resume)
+    else:
+        rows = import_table(interface, args.path, args.resume)
+
+    print(f"Done, {rows} entries {args.direction}ed")
+
+
+if __name__ == "__main__":
+    main()
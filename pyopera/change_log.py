@@ -0,0 +1,181 @@
+import hashlib
+import time
+from decimal import Decimal
+from typing import Any, NamedTuple, Optional, Sequence
+
+from boto3.dynamodb.conditions import Key
+
+from pyopera.create_table import get_rate_limited_table, get_table, make_change_log_table
+from pyopera.db_metrics import measure
+from pyopera.dynamodb_backend import batch_write
+from pyopera.rate_limit import TokenBucket, call_with_backoff, get_table_buckets
+from pyopera.storage_backend import UPDATED_AT_ATTRIBUTE
+
+CHANGE_LOG_TABLE_NAME = "change_log"
+
+# entries older than this are removed, replicas that fall further behind reload the whole table
+CHANGE_LOG_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+# a missing entry that is followed by entries older than this is treated as lost
+MISSING_ENTRY_GRACE_SECONDS = 60
+
+# the item with this sequence number holds the last assigned sequence number of a table
+# (its generation) and the checksum of all changes
+COUNTER_SEQ = 0
+
+
+class TableVersion(NamedTuple):
+    """
+    The generation of a table is bumped by every write, the checksum adds up a digest of every
+    change. Together they tell whether a copy of the table that was taken at this version is
+    still up to date, also if the counter was reset in the meantime.
+    """
+
+    generation: int
+    checksum: int
+
+
+def change_digest(entry: dict[str, Any]) -> int:
+    version = entry.get("item", {}).get(UPDATED_AT_ATTRIBUTE, "")
+    if isinstance(version, Decimal):
+        # DynamoDB drops trailing zeros, entries read back must give the same digest as when they were appended
+        version = version.normalize()
+
+    digest = hashlib.sha1(f"{entry['op']}\0{entry['key']}\0{version}".encode()).hexdigest()
+    # 48 bits, so that the sum stays well within the precision of DynamoDB numbers
+    return int(digest[:12], 16)
+
+
+class ChangeLogGap(Exception):
+    """
+    Raised when entries between the last read sequence number and the oldest
+    available one are missing (e.g. because they expired).
+    """
+
+
+class ChangeLog:
+    """
+    An append-only log of the writes to one table, shared by all replicas of the app.
+    Every entry is either {"op": "put", "key": ..., "item": ...}, {"op": "delete", "key": ...}
+    or {"op": "reload", "key": "*"} for bulk writes that replicas should reload the table after.
+    """
+
+    def __init__(self, table_name: str) -> None:
+        self._table_name = table_name
+
+    @property
+    def _table(self):
+        # like the tables themselves, requests are sent with `call_with_backoff` and measured
+        # (see `pyopera.db_metrics`) under the name of the change log table
+        return get_rate_limited_table(CHANGE_LOG_TABLE_NAME, make_change_log_table)
+
+    @property
+    def _read_bucket(self) -> Optional[TokenBucket]:
+        return get_table_buckets(get_table(CHANGE_LOG_TABLE_NAME, make_change_log_table))[0]
+
+    @property
+    def _write_bucket(self) -> Optional[TokenBucket]:
+        return get_table_buckets(get_table(CHANGE_LOG_TABLE_NAME, make_change_log_table))[1]
+
+    def current_version(self) -> TableVersion:
+        """
+        The version of the table, a single strongly consistent read of the counter item.
+        """
+        with measure(CHANGE_LOG_TABLE_NAME, "version") as measurement:
+            response = call_with_backoff(
+                self._table.get_item,
+                self._read_bucket,
+                Key={"table": self._table_name, "seq": COUNTER_SEQ},
+                ConsistentRead=True,
+            )
+            counter = response.get("Item", {})
+            measurement.add_items([counter] if counter else [])
+
+        return TableVersion(int(counter.get("last_seq", 0)), int(counter.get("checksum", 0)))
+
+    def _allocate(self, count: int, checksum: int) -> int:
+        """
+        Atomically reserve `count` sequence numbers and add the checksum of the changes,
+        returns the first sequence number.
+        """
+        with measure(CHANGE_LOG_TABLE_NAME, "allocate") as measurement:
+            response = call_with_backoff(
+                self._table.update_item,
+                self._write_bucket,
+                Key={"table": self._table_name, "seq": COUNTER_SEQ},
+                UpdateExpression="ADD last_seq :count, checksum :checksum",
+                ExpressionAttributeValues={":count": count, ":checksum": checksum},
+                ReturnValues="UPDATED_NEW",
+            )
+            measurement.items = 1
+
+        return int(response["Attributes"]["last_seq"]) - count + 1
+
+    def append(self, entries: Sequence[dict[str, Any]]) -> None:
+        if len(entries) == 0:
+            return
+
+        first_seq = self._allocate(len(entries), sum(change_digest(entry) for entry in entries))
+        expires_at = int(time.time()) + CHANGE_LOG_RETENTION_SECONDS
+
+        items = [
+            {"table": self._table_name, "seq": seq, "expires_at": expires_at, **entry}
+            for seq, entry in enumerate(entries, start=first_seq)
+        ]
+
+        with measure(CHANGE_LOG_TABLE_NAME, "append") as measurement:
+            requests = {item["seq"]: {"PutRequest": {"Item": item}} for item in items}
+            batch_write(self._table, requests, self._write_bucket)
+            measurement.add_items(items)
+
+    def read_since(self, seq: int) -> list[dict[str, Any]]:
+        """
+        All entries after `seq` up to the first missing one, in order.
+        """
+        kwargs: dict[str, Any] = dict(
+            KeyConditionExpression=Key("table").eq(self._table_name) & Key("seq").gt(max(seq, COUNTER_SEQ)),
+            ConsistentRead=True,
+        )
+
+        entries = []
+        with measure(CHANGE_LOG_TABLE_NAME, "read") as measurement:
+            while True:
+                response = call_with_backoff(self._table.query, self._read_bucket, **kwargs)
+                entries.extend(response.get("Items", []))
+
+                if response.get("LastEvaluatedKey") is None:
+                    break
+
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+            measurement.add_items(entries)
+
+        return self._contiguous_entries(seq, entries)
+
+    def _contiguous_entries(self, seq: int, entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        The entries up to the first missing sequence number. A sequence number is missing for a
+        moment while its writer is still writing it (after reserving it), if it stays missing the
+        entries are lost (or expired) and a `ChangeLogGap` is raised.
+        """
+        expected_seq = seq + 1
+        for index, entry in enumerate(entries):
+            if int(entry["seq"]) == expected_seq:
+                expected_seq += 1
+                continue
+
+            # the entry after the gap was reserved after the missing one
+            written_at = int(entry["expires_at"]) - CHANGE_LOG_RETENTION_SECONDS
+            if time.time() - written_at > MISSING_ENTRY_GRACE_SECONDS:
+                raise ChangeLogGap(
+                    f"Change log of {self._table_name} continues at {entry['seq']} instead of {expected_seq}"
+                )
+
+            return entries[:index]
+
+        return entries
+
+
+def create_change_log(table_name: str, is_local: bool) -> Optional[ChangeLog]:
+    # local backends are not shared between replicas
+    return None if is_local else ChangeLog(table_name)
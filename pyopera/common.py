@@ -2,9 +2,9 @@ import json
 import random
 import string
 from collections import ChainMap, defaultdict
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from functools import total_ordering
+from functools import cache, total_ordering
 from typing import (
     Annotated,
     Any,
@@ -18,8 +18,6 @@ from typing import (
     TypeVar,
 )
 
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
 from more_itertools import flatten
 from pydantic import (
     AfterValidator,
@@ -77,6 +75,44 @@ def create_key_for_visited_performance_v3() -> str:
     return "".join(random.choices(available_characters, k=40))
 
 
+# Keys of performances start with the time they were created at, in milliseconds since
+# the epoch as this many hex digits, so that the keys sort by creation time
+KEY_TIME_DIGITS = 12
+
+# Follows the time in every time-ordered key (also the migrated ones, see `pyopera.key_migration`).
+# Random keys of the old scheme have it in that place once in 16 million keys
+TIME_ORDERED_KEY_MARKER = "7e0a4b"
+
+
+def get_key_prefix(moment: datetime) -> str:
+    """
+    The time prefix of the keys created at `moment`, keys >= the prefix were created at or after it.
+    Times before 1970 give the prefix of 1970 (a negative time would give an invalid key).
+    """
+    return f"{max(int(moment.timestamp() * 1000), 0):0{KEY_TIME_DIGITS}x}"
+
+
+def create_key_for_visited_performance_v4() -> str:
+    # the time prefix and random hex digits, 40 characters in total (like a sha1 hash)
+    available_characters = "abcdef" + string.digits
+    random_part = "".join(random.choices(available_characters, k=40 - KEY_TIME_DIGITS - len(TIME_ORDERED_KEY_MARKER)))
+    return get_key_prefix(datetime.now(timezone.utc)) + TIME_ORDERED_KEY_MARKER + random_part
+
+
+def get_key_time(key: str) -> datetime:
+    """
+    The time a time-ordered key was created at. Keys created before the time-ordered scheme
+    give meaningless times. Migrated keys (see `pyopera.key_migration`) give the date of their
+    performance instead (1970 for earlier performances), so for them the time is approximate.
+    """
+    return datetime.fromtimestamp(int(key[:KEY_TIME_DIGITS], 16) / 1000, timezone.utc)
+
+
+def is_time_ordered_key(key: str) -> bool:
+    # only the format of the key decides, not its time, so a key never changes its kind
+    return key[KEY_TIME_DIGITS : KEY_TIME_DIGITS + len(TIME_ORDERED_KEY_MARKER)] == TIME_ORDERED_KEY_MARKER
+
+
 def create_deta_style_key() -> str:
     available_characters = string.ascii_lowercase + string.digits
     # create a 12 character long random
@@ -96,43 +132,19 @@ class ApproxDate(BaseModel):
 
 
 PerformanceKey = Annotated[
-    SHA1Str, AfterValidator(key_create_creator(create_key_for_visited_performance_v3))
+    SHA1Str, AfterValidator(key_create_creator(create_key_for_visited_performance_v4))
 ]
 DetaKey = Annotated[str, AfterValidator(key_create_creator(create_deta_style_key))]
 
 
-class Performance(BaseModel):
-    name: NonEmptyStr
-    date: Optional[ApproxDate]
-    cast: Mapping[NonEmptyStr, NonEmptyStrList]
-    leading_team: Mapping[NonEmptyStr, NonEmptyStrList]
-    stage: NonEmptyStr
-    production: NonEmptyStr
-    composers: Annotated[NonEmptyStrList, BeforeValidator(normalize_composers)]
-    comments: str
-    is_concertante: bool
-    archived: bool = False
-    key: PerformanceKey = Field(default_factory=create_key_for_visited_performance_v3)
-    day_index: Optional[int] = None
-    visit_index: Optional[str] = None
-
-    @model_validator(mode="before")
-    @classmethod
-    def migrate_legacy_composer_field(cls, data: Any) -> Any:
-        if isinstance(data, Mapping):
-            data = dict(data)
-            if "composers" not in data and "composer" in data:
-                data["composers"] = data.pop("composer")
+# Leading team roles that identify a production (see `production_identifying_person`)
+PRODUCTION_IDENTIFYING_ROLES = ("Musikalische Leitung", "Dirigent", "Inszenierung")
 
-        return data
 
-    model_config = ConfigDict(
-        validate_assignment=True,
-        validate_default=True,
-        str_strip_whitespace=True,
-        arbitrary_types_allowed=True,
-        frozen=True,
-    )
+class PerformanceProperties:
+    """
+    Properties shared by `Performance` and `PerformanceSummary`.
+    """
 
     @property
     def production_key(self) -> tuple[str, str, str, tuple[str, ...]]:
@@ -183,6 +195,107 @@ class Performance(BaseModel):
         return ""
 
 
+def migrate_legacy_composer_field(data: Any) -> Any:
+    if isinstance(data, Mapping):
+        data = dict(data)
+        if "composers" not in data and "composer" in data:
+            data["composers"] = data.pop("composer")
+
+    return data
+
+
+class Performance(PerformanceProperties, BaseModel):
+    name: NonEmptyStr
+    date: Optional[ApproxDate]
+    cast: Mapping[NonEmptyStr, NonEmptyStrList]
+    leading_team: Mapping[NonEmptyStr, NonEmptyStrList]
+    stage: NonEmptyStr
+    production: NonEmptyStr
+    composers: Annotated[NonEmptyStrList, BeforeValidator(normalize_composers)]
+    comments: str
+    is_concertante: bool
+    archived: bool = False
+    key: PerformanceKey = Field(default_factory=create_key_for_visited_performance_v4)
+    day_index: Optional[int] = None
+    visit_index: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def migrate_legacy_composer_field(cls, data: Any) -> Any:
+        return migrate_legacy_composer_field(data)
+
+    model_config = ConfigDict(
+        validate_assignment=True,
+        validate_default=True,
+        str_strip_whitespace=True,
+        arbitrary_types_allowed=True,
+        frozen=True,
+    )
+
+
+def construct_approx_date_unchecked(data: Mapping | None) -> ApproxDate | None:
+    if data is None:
+        return None
+
+    return ApproxDate.model_construct(
+        earliest_date=date.fromisoformat(data["earliest_date"]),
+        latest_date=date.fromisoformat(data["latest_date"]),
+    )
+
+
+def construct_performance_unchecked(data: Mapping) -> Performance:
+    """
+    Build a performance from a stored item without running the validators. Only valid
+    for items that were written from a validated model of the current schema.
+    """
+    day_index = data.get("day_index")
+
+    return Performance.model_construct(
+        name=data["name"],
+        date=construct_approx_date_unchecked(data.get("date")),
+        cast={role: list(persons) for role, persons in data["cast"].items()},
+        leading_team={role: list(persons) for role, persons in data["leading_team"].items()},
+        stage=data["stage"],
+        production=data["production"],
+        composers=list(data["composers"]),
+        comments=data["comments"],
+        is_concertante=data["is_concertante"],
+        archived=data.get("archived", False),
+        key=data["key"],
+        day_index=None if day_index is None else int(day_index),
+        visit_index=data.get("visit_index"),
+    )
+
+
+class PerformanceSummary(PerformanceProperties, BaseModel):
+    """
+    The fields of a performance that are needed for lists and overviews. The leading team
+    only contains the roles that identify the production and the cast is not loaded.
+    """
+
+    name: NonEmptyStr
+    date: Optional[ApproxDate]
+    leading_team: Mapping[NonEmptyStr, NonEmptyStrList] = Field(default_factory=dict)
+    stage: NonEmptyStr
+    production: NonEmptyStr
+    composers: Annotated[NonEmptyStrList, BeforeValidator(normalize_composers)]
+    is_concertante: bool
+    archived: bool = False
+    key: SHA1Str
+    day_index: Optional[int] = None
+    visit_index: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def migrate_legacy_composer_field(cls, data: Any) -> Any:
+        return migrate_legacy_composer_field(data)
+
+    model_config = ConfigDict(
+        str_strip_whitespace=True,
+        frozen=True,
+    )
+
+
 def is_exact_date(date: ApproxDate | None | dict) -> bool:
     if date is None:
         return False
@@ -349,7 +462,12 @@ class VenueModel(BaseModel):
         return float(self.latitude) if self.latitude is not None else None
 
 
-PASS_HASH = PasswordHasher()
+@cache
+def get_password_hasher():
+    # argon2 is only imported when a password is hashed or checked
+    from argon2 import PasswordHasher
+
+    return PasswordHasher()
 
 
 def hash_password_if_needed(password: str) -> str:
@@ -357,7 +475,7 @@ def hash_password_if_needed(password: str) -> str:
         # already hashed
         return password
 
-    return PASS_HASH.hash(password)
+    return get_password_hasher().hash(password)
 
 
 class PasswordModel(BaseModel):
@@ -367,8 +485,10 @@ class PasswordModel(BaseModel):
     model_config = ConfigDict(frozen=True, validate_default=True)
 
     def verify_password(self, password: str):
+        from argon2.exceptions import VerifyMismatchError
+
         try:
-            return PASS_HASH.verify(self.password, password)
+            return get_password_hasher().verify(self.password, password)
         except VerifyMismatchError:
             return False
 
@@ -1,9 +1,71 @@
-import boto3
-import streamlit as st
 import os
+import threading
+import time
+from typing import Any, Callable
 
+import boto3
+import streamlit as st
+from botocore.config import Config
 from streamlit.errors import StreamlitSecretNotFoundError
 
+from pyopera.storage_backend import load_setting
+
+# Shared by all threads of the process. Keep-alive avoids a new TLS handshake per
+# request and the pool is large enough for the parallel scans and batch writes.
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=30,
+    retries={"max_attempts": 5, "mode": "standard"},
+)
+
+# For the requests sent with `pyopera.rate_limit.call_with_backoff`, which retries throttled requests
+# itself. Retrying them in botocore as well would hide the throttling from the token bucket of the table.
+RATE_LIMITED_BOTO_CONFIG = BOTO_CONFIG.merge(Config(retries={"max_attempts": 1, "mode": "standard"}))
+
+_resource_lock = threading.Lock()
+_dynamodb_resources = {}
+
+_tables_lock = threading.Lock()
+_tables = {}
+_rate_limited_tables = {}
+
+# Global secondary indexes of each table as (index name, partition key, partition key type), sorted
+# by `INDEX_SORT_KEY`, or with their own (..., sort key, sort key type). They only contain the keys.
+# Only the indexes listed in the "dynamodb_indexes" setting (comma separated names) are created and
+# queried. Every index has its own provisioned capacity (`INDEX_CAPACITY_UNITS`) and every write
+# to the table is written to it as well, the five tables alone use up the free tier.
+TableToIndexes = {
+    "performances": [
+        ("stage-index", "stage", "S"),
+        ("year-index", "earliest_year", "N"),
+        ("title-index", "normalized_title", "S"),
+        # all items in one partition sorted by their (time-ordered) key, for range reads of recent entries.
+        # Every write goes to that single partition, which is fine for the few writes of the app
+        ("recent-index", "key_partition", "S", "key", "S"),
+    ],
+}
+
+INDEX_SORT_KEY = "earliest_date"
+
+# The value of the partition key of "recent-index" for all items
+KEY_PARTITION_VALUE = "all"
+
+INDEX_POLL_SECONDS = 10
+
+# Read and write capacity units of every index
+INDEX_CAPACITY_UNITS = 5
+
+
+def get_enabled_indexes(table_name: str) -> list[tuple[str, ...]]:
+    """
+    The indexes of `TableToIndexes` that are enabled with the "dynamodb_indexes" setting.
+    """
+    enabled = {name.strip() for name in load_setting("dynamodb_indexes", "").split(",")}
+    return [index for index in TableToIndexes.get(table_name, []) if index[0] in enabled]
+
+
 def _load_secret(secret_name: str) -> str:
     """Load a secret from Streamlit secrets or environment variables."""
 
@@ -15,7 +77,7 @@ def _load_secret(secret_name: str) -> str:
     return secret
 
 
-def create_dynamodb_resource():
+def create_dynamodb_resource(config: Config = BOTO_CONFIG):
     try:
         st.secrets
     except Exception as e:
@@ -26,6 +88,8 @@ def create_dynamodb_resource():
     aws_access_key_id = _load_secret("aws_access_key_id")
     aws_secret_access_key = _load_secret("aws_secret_access_key")
     aws_region = _load_secret("aws_region")
+    # optional, allows pointing the app to a local DynamoDB stand-in (e.g. DynamoDB Local)
+    endpoint_url = _load_secret("endpoint_url")
 
     session = boto3.Session(
         aws_access_key_id=aws_access_key_id,
@@ -33,11 +97,57 @@ def create_dynamodb_resource():
         region_name=aws_region,
     )
 
-    dynamodb = session.resource("dynamodb")
+    dynamodb = session.resource("dynamodb", endpoint_url=endpoint_url, config=config)
     return dynamodb
 
 
-dynamodb = create_dynamodb_resource()
+def get_dynamodb_resource(rate_limited: bool = False):
+    """
+    The DynamoDB resource of the process, created on first use. The `rate_limited` one
+    does not retry requests (see `RATE_LIMITED_BOTO_CONFIG`).
+    """
+    with _resource_lock:
+        dynamodb = _dynamodb_resources.get(rate_limited)
+        if dynamodb is None:
+            dynamodb = create_dynamodb_resource(RATE_LIMITED_BOTO_CONFIG if rate_limited else BOTO_CONFIG)
+            _dynamodb_resources[rate_limited] = dynamodb
+
+        return dynamodb
+
+
+def get_table(table_name: str, make_table: Callable[[str], Any] | None = None):
+    """
+    The shared handle of a table, created (and the table checked) on first use.
+    """
+    table = _tables.get(table_name)
+    if table is not None:
+        return table
+
+    if make_table is None:
+        make_table = make_deta_style_table
+
+    # the describe call happens outside of the lock so that tables can be loaded concurrently,
+    # if two threads race the first handle wins and the other one is dropped
+    table = make_table(table_name)
+    with _tables_lock:
+        return _tables.setdefault(table_name, table)
+
+
+def get_rate_limited_table(table_name: str, make_table: Callable[[str], Any] | None = None):
+    """
+    The shared handle of a table for requests sent with `pyopera.rate_limit.call_with_backoff`,
+    its client does not retry throttled requests.
+    """
+    table = _rate_limited_tables.get(table_name)
+    if table is not None:
+        return table
+
+    # creates (or checks) the table
+    get_table(table_name, make_table)
+
+    table = get_dynamodb_resource(rate_limited=True).Table(table_name)
+    with _tables_lock:
+        return _rate_limited_tables.setdefault(table_name, table)
 
 
 def make_deta_style_table(table_name: str):
@@ -47,10 +157,22 @@ def make_deta_style_table(table_name: str):
     if len(table_name) < 3:
         raise ValueError("Table name must be at least 3 characters long.")
 
+    dynamodb = get_dynamodb_resource()
+
     key_schema = [{"AttributeName": "key", "KeyType": "HASH"}]
     attribute_definitions = [{"AttributeName": "key", "AttributeType": "S"}]
     provisioned_throughput = {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
 
+    indexes = get_enabled_indexes(table_name)
+    index_kwargs = {}
+    if len(indexes) > 0:
+        attribute_definitions.extend(
+            definition
+            for definition in get_index_attribute_definitions(indexes)
+            if definition["AttributeName"] != "key"
+        )
+        index_kwargs["GlobalSecondaryIndexes"] = [get_index_definition(*index) for index in indexes]
+
     try:
         table = dynamodb.Table(table_name)
         table.load()  # Check if the table exists
@@ -60,7 +182,152 @@ def make_deta_style_table(table_name: str):
             KeySchema=key_schema,
             AttributeDefinitions=attribute_definitions,
             ProvisionedThroughput=provisioned_throughput,
+            **index_kwargs,
         )
         table.meta.client.get_waiter("table_exists").wait(TableName=table_name)
         print(f"Table {table_name} created successfully.")
     return table
+
+
+def get_index_definition(
+    index_name: str,
+    partition_key: str,
+    partition_key_type: str,
+    sort_key: str = INDEX_SORT_KEY,
+    sort_key_type: str = "S",
+) -> dict:
+    return {
+        "IndexName": index_name,
+        "KeySchema": [
+            {"AttributeName": partition_key, "KeyType": "HASH"},
+            {"AttributeName": sort_key, "KeyType": "RANGE"},
+        ],
+        # every write is copied to every index, projecting the whole items would multiply the write
+        # capacity it consumes. Queries read the matching items from the table instead.
+        "Projection": {"ProjectionType": "KEYS_ONLY"},
+        "ProvisionedThroughput": {
+            "ReadCapacityUnits": INDEX_CAPACITY_UNITS,
+            "WriteCapacityUnits": INDEX_CAPACITY_UNITS,
+        },
+    }
+
+
+def get_index_attribute_definitions(indexes: list[tuple[str, ...]]) -> list[dict]:
+    attribute_types = {}
+    for _, partition_key, partition_key_type, *sort_key in indexes:
+        sort_key_name, sort_key_type = sort_key if len(sort_key) > 0 else (INDEX_SORT_KEY, "S")
+        attribute_types[partition_key] = partition_key_type
+        attribute_types[sort_key_name] = sort_key_type
+
+    return [{"AttributeName": name, "AttributeType": key_type} for name, key_type in attribute_types.items()]
+
+
+def get_active_indexes(table) -> set[str]:
+    return {
+        index["IndexName"]
+        for index in table.global_secondary_indexes or []
+        if index.get("IndexStatus") == "ACTIVE" and not index.get("Backfilling", False)
+    }
+
+
+def create_missing_indexes(table_name: str) -> list[str]:
+    """
+    Add the enabled indexes (see `get_enabled_indexes`) that an existing table does not have yet. DynamoDB
+    builds one index at a time, so this waits for every index to become active before
+    creating the next one. Returns the names of the created indexes.
+    """
+    table = make_deta_style_table(table_name)
+    indexes = get_enabled_indexes(table_name)
+    existing = {index["IndexName"] for index in table.global_secondary_indexes or []}
+
+    created = []
+    for index in indexes:
+        index_name = index[0]
+        if index_name in existing:
+            continue
+
+        table.meta.client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=get_index_attribute_definitions([index]),
+            GlobalSecondaryIndexUpdates=[{"Create": get_index_definition(*index)}],
+        )
+        print(f"Creating index {index_name} of {table_name} ...", flush=True)
+
+        while True:
+            time.sleep(INDEX_POLL_SECONDS)
+            table.reload()
+            if table.table_status == "ACTIVE" and index_name in get_active_indexes(table):
+                break
+
+        created.append(index_name)
+
+    return created
+
+
+def delete_outdated_indexes(table_name: str) -> list[str]:
+    """
+    Delete the indexes of an existing table that are not enabled anymore (see `get_enabled_indexes`)
+    or that project other attributes than `get_index_definition` (e.g. the whole items). DynamoDB cannot
+    change the projection of an index, `create_missing_indexes` creates them again. Returns the names
+    of the deleted indexes.
+    """
+    table = make_deta_style_table(table_name)
+    known = {index[0] for index in TableToIndexes.get(table_name, [])}
+    definitions = {index[0]: get_index_definition(*index) for index in get_enabled_indexes(table_name)}
+
+    deleted = []
+    for index in table.global_secondary_indexes or []:
+        index_name = index["IndexName"]
+        if index_name not in known or (
+            index_name in definitions and index.get("Projection") == definitions[index_name]["Projection"]
+        ):
+            continue
+
+        table.meta.client.update_table(
+            TableName=table_name,
+            GlobalSecondaryIndexUpdates=[{"Delete": {"IndexName": index_name}}],
+        )
+        print(f"Deleting index {index_name} of {table_name} ...", flush=True)
+
+        while True:
+            time.sleep(INDEX_POLL_SECONDS)
+            table.reload()
+            remaining = {index["IndexName"] for index in table.global_secondary_indexes or []}
+            if table.table_status == "ACTIVE" and index_name not in remaining:
+                break
+
+        deleted.append(index_name)
+
+    return deleted
+
+
+def make_change_log_table(table_name: str):
+    """
+    Create the change log table, items are keyed by the name of the changed table and a sequence number.
+    Old entries are removed by DynamoDB through the "expires_at" time to live attribute.
+    """
+    dynamodb = get_dynamodb_resource()
+
+    try:
+        table = dynamodb.Table(table_name)
+        table.load()  # Check if the table exists
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        table = dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": "table", "KeyType": "HASH"},
+                {"AttributeName": "seq", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "table", "AttributeType": "S"},
+                {"AttributeName": "seq", "AttributeType": "N"},
+            ],
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        table.meta.client.get_waiter("table_exists").wait(TableName=table_name)
+        table.meta.client.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification={"Enabled": True, "AttributeName": "expires_at"},
+        )
+        print(f"Table {table_name} created successfully.")
+    return table
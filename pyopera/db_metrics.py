@@ -0,0 +1,248 @@
+"""
+Time, items, bytes and consumed capacity of the database operations, aggregated per table,
+per page of the app and per operation. The totals are kept per process.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence
+
+from pydantic import BaseModel
+
+from pyopera.payload_encoding import item_size
+from pyopera.storage_backend import UPDATED_AT_ATTRIBUTE, ProgressCallback, StorageBackend, load_setting
+
+# Pages set this before they run, operations outside of a page (e.g. command line tools) use the default
+_current_page: ContextVar[str] = ContextVar("current_page", default="(none)")
+
+_current_measurement: ContextVar[Optional["Measurement"]] = ContextVar("current_measurement", default=None)
+
+# Minimum time between two writes of the metrics dump file
+DUMP_INTERVAL_SECONDS = 30.0
+
+
+class OperationTotals(BaseModel):
+    table: str
+    page: str
+    operation: str
+    calls: int = 0
+    seconds: float = 0.0
+    items: int = 0
+    bytes: int = 0
+    consumed_capacity: float = 0.0
+
+
+class Measurement:
+    """
+    The numbers of a single operation. Consumed capacity is added by every request made while
+    the operation is measured, also from the threads of a parallel scan.
+    """
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.bytes = 0
+        self.consumed_capacity = 0.0
+        self._lock = threading.Lock()
+
+    def add_consumed_capacity(self, units: float) -> None:
+        with self._lock:
+            self.consumed_capacity += units
+
+    def add_items(self, items: Iterable[Mapping[str, Any]]) -> None:
+        for item in items:
+            self.items += 1
+            self.bytes += item_size(item)
+
+
+_totals_lock = threading.Lock()
+_totals: dict[tuple[str, str, str], OperationTotals] = {}
+_last_dump = 0.0
+
+
+def set_current_page(page: str) -> None:
+    _current_page.set(page)
+
+
+def add_consumed_capacity(units: float) -> None:
+    measurement = _current_measurement.get()
+    if measurement is not None:
+        measurement.add_consumed_capacity(units)
+
+
+@contextmanager
+def measure(table: str, operation: str) -> Iterator[Measurement]:
+    """
+    Measure an operation, the caller sets the number of items and bytes on the measurement.
+
+        with measure("performances", "scan") as measurement:
+            items = backend.scan_items()
+            measurement.items = len(items)
+    """
+    measurement = Measurement()
+    token = _current_measurement.set(measurement)
+    start = time.perf_counter()
+
+    try:
+        yield measurement
+    finally:
+        seconds = time.perf_counter() - start
+        _current_measurement.reset(token)
+        record(table, operation, seconds, measurement)
+
+
+def measure_pages(
+    table: str, operation: str, pages: Iterator[tuple[list[dict], Any]]
+) -> Iterator[tuple[list[dict], Any]]:
+    """
+    Measure the reading of every page of `pages` as a separate operation.
+    """
+    while True:
+        measurement = Measurement()
+        token = _current_measurement.set(measurement)
+        start = time.perf_counter()
+
+        try:
+            page = next(pages)
+        except StopIteration:
+            return
+        finally:
+            _current_measurement.reset(token)
+
+        measurement.add_items(page[0])
+        record(table, operation, time.perf_counter() - start, measurement)
+
+        yield page
+
+
+def record(table: str, operation: str, seconds: float, measurement: Measurement) -> None:
+    key = (table, _current_page.get(), operation)
+
+    with _totals_lock:
+        totals = _totals.get(key)
+        if totals is None:
+            totals = OperationTotals(table=key[0], page=key[1], operation=key[2])
+            _totals[key] = totals
+
+        totals.calls += 1
+        totals.seconds += seconds
+        totals.items += measurement.items
+        totals.bytes += measurement.bytes
+        totals.consumed_capacity += measurement.consumed_capacity
+
+    write_metrics_dump()
+
+
+class MeasuredBackend:
+    """
+    Measures every operation of a storage backend (see `StorageBackend`).
+    """
+
+    def __init__(self, backend: StorageBackend, table_name: str) -> None:
+        self._backend = backend
+        self._table_name = table_name
+        self.is_local = backend.is_local
+        self.supports_query = backend.supports_query
+
+    def scan_items(self) -> list[dict]:
+        with measure(self._table_name, "scan") as measurement:
+            items = self._backend.scan_items()
+            measurement.add_items(items)
+
+        return items
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[dict], Any]]:
+        return measure_pages(self._table_name, "scan_page", iter(self._backend.iter_pages(start_token)))
+
+    def scan_projection(self, paths: Sequence[tuple[str, ...]]) -> list[dict]:
+        with measure(self._table_name, "scan_projection") as measurement:
+            items = self._backend.scan_projection(paths)
+            measurement.add_items(items)
+
+        return items
+
+    def scan_versions(self) -> dict[str, Any]:
+        with measure(self._table_name, "scan_versions") as measurement:
+            versions = self._backend.scan_versions()
+            measurement.add_items({"key": key, UPDATED_AT_ATTRIBUTE: version} for key, version in versions.items())
+
+        return versions
+
+    def get_items(self, keys: Iterable[str]) -> list[dict]:
+        with measure(self._table_name, "get_items") as measurement:
+            items = self._backend.get_items(keys)
+            measurement.add_items(items)
+
+        return items
+
+    def put_items(self, items: Sequence[dict], progress: Optional[ProgressCallback] = None) -> None:
+        with measure(self._table_name, "batch_write") as measurement:
+            self._backend.put_items(items, progress)
+            measurement.add_items(items)
+
+    def update_item(
+        self,
+        key: str,
+        set_attributes: Mapping[str, Any],
+        remove_attributes: Sequence[str],
+        expected_attributes: Optional[Mapping[str, bool]] = None,
+    ) -> None:
+        with measure(self._table_name, "update") as measurement:
+            self._backend.update_item(key, set_attributes, remove_attributes, expected_attributes)
+            measurement.add_items([set_attributes])
+
+    def delete_item(self, key: str) -> None:
+        with measure(self._table_name, "delete") as measurement:
+            self._backend.delete_item(key)
+            measurement.items = 1
+
+    def delete_items(self, keys: Sequence[str], progress: Optional[ProgressCallback] = None) -> None:
+        with measure(self._table_name, "batch_delete") as measurement:
+            self._backend.delete_items(keys, progress)
+            measurement.items = len(keys)
+
+    def query_items(self, **filters: Any) -> list[dict]:
+        with measure(self._table_name, "query") as measurement:
+            items = self._backend.query_items(**filters)
+            measurement.add_items(items)
+
+        return items
+
+
+def get_totals() -> list[OperationTotals]:
+    with _totals_lock:
+        return [totals.model_copy() for totals in _totals.values()]
+
+
+def reset_metrics() -> None:
+    with _totals_lock:
+        _totals.clear()
+
+
+def dump_metrics_json() -> str:
+    return json.dumps([totals.model_dump() for totals in get_totals()], indent=2)
+
+
+def write_metrics_dump(force: bool = False) -> None:
+    """
+    Write the totals to the file given by the "metrics_dump_path" setting (if any), at most
+    every `DUMP_INTERVAL_SECONDS`.
+    """
+    global _last_dump
+
+    path = load_setting("metrics_dump_path", "")
+    if path == "":
+        return
+
+    with _totals_lock:
+        if not force and time.monotonic() - _last_dump < DUMP_INTERVAL_SECONDS:
+            return
+        _last_dump = time.monotonic()
+
+    try:
+        with open(path, "w") as file:
+            file.write(dump_metrics_json())
+    except OSError as e:
+        print(f"Could not write the database metrics to {path}: {e}")
@@ -1,23 +1,58 @@
 from __future__ import annotations
 
+import contextvars
 import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from contextlib import nullcontext
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from enum import Enum
-from typing import Generic, Optional, Sequence, TypeVar
+from functools import cache, partial
+from typing import Any, Callable, Generic, Hashable, Iterable, Iterator, Optional, Sequence, TypeVar
 
 import streamlit as st
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from pyopera.common import (
     ApproxDate,
     PasswordModel,
+    PRODUCTION_IDENTIFYING_ROLES,
     Performance,
+    PerformanceSummary,
     VenueModel,
     WorkYearEntryModel,
+    construct_performance_unchecked,
+    get_all_names_from_performance,
+    get_key_time,
+    normalize_title,
     soft_isinstance,
 )
-from pyopera.create_table import make_deta_style_table
+from pyopera.change_log import ChangeLogGap, TableVersion, change_digest, create_change_log
+from pyopera.create_table import KEY_PARTITION_VALUE
+from pyopera.db_metrics import MeasuredBackend, set_current_page
+from pyopera.dynamodb_backend import DynamoDBBackend
+from pyopera.local_snapshot import get_schema_version, get_snapshot_path, load_snapshot, write_snapshot
+from pyopera.payload_encoding import PAYLOAD_ATTRIBUTE, compress_payload, decompress_payload, is_compressed
+from pyopera.shared_snapshot import (
+    SharedEntries,
+    TableToSharedColumns,
+    append_shared_changes,
+    attach_shared_entries,
+    discard_shared_snapshot,
+    publish_shared_snapshot,
+)
+from pyopera.sqlite_backend import SqliteBackend
+from pyopera.storage_backend import (
+    UPDATED_AT_ATTRIBUTE,
+    ProgressCallback,
+    StorageBackend,
+    UpdateConditionFailed,
+    load_setting,
+    project_item,
+)
 
 EntryType = TypeVar("EntryType", bound=BaseModel)
 
@@ -32,17 +67,29 @@ def get_earliest_date(date: Optional[ApproxDate]) -> datetime:
     return date.earliest_date or DEFAULT_DATE
 
 
-def sort_entries_by_date(entries: Sequence[Performance]) -> list[Performance]:
-    return sorted(
-        entries,
-        key=lambda x: (
-            get_earliest_date(x.date),
-            x.day_index if x.day_index is not None else 0,
-        ),
-        reverse=True,
+def get_date_sort_key(performance: Performance) -> tuple[date, int]:
+    return (
+        get_earliest_date(performance.date),
+        performance.day_index if performance.day_index is not None else 0,
     )
 
 
+def get_performance_index_attributes(performance: Performance) -> dict[str, Any]:
+    # undated performances are indexed with the default date, so that they are part of the indexes
+    earliest_date = get_earliest_date(performance.date)
+
+    return {
+        "earliest_date": earliest_date.isoformat(),
+        "earliest_year": earliest_date.year,
+        "normalized_title": normalize_title(performance.name),
+        "key_partition": KEY_PARTITION_VALUE,
+    }
+
+
+def sort_entries_by_date(entries: Sequence[Performance]) -> list[Performance]:
+    return sorted(entries, key=get_date_sort_key, reverse=True)
+
+
 class DatabaseName(str, Enum):
     performances = "performances"
     works_dates = "works_dates"
@@ -57,16 +104,627 @@ ModelToEnum = {
     PasswordModel: DatabaseName.passwords,
 }
 
+EnumToModel = {db_name: model for model, db_name in ModelToEnum.items()}
+
 EnumToLoadText = {
     Performance: "Loading performances ...",
     WorkYearEntryModel: "Loading work year data...",
     VenueModel: "Loading venue data...",
 }
 
-EnumToPostProcess = {
-    Performance: sort_entries_by_date,
+# Cached entries of these tables are kept in descending order of the sort key
+EnumToSortKey = {
+    Performance: get_date_sort_key,
 }
 
+# The attributes needed for lists and overviews. Loading only these (instead of
+# the full cast and leading team) is much cheaper for the pages opened most often.
+PERFORMANCE_SUMMARY_PATHS = [
+    ("key",),
+    ("name",),
+    ("date",),
+    ("stage",),
+    ("production",),
+    ("composers",),
+    ("composer",),  # legacy items
+    ("is_concertante",),
+    ("archived",),
+    ("day_index",),
+    ("visit_index",),
+    *(("leading_team", role) for role in PRODUCTION_IDENTIFYING_ROLES),
+]
+
+EnumToSummary = {
+    Performance: (PerformanceSummary, PERFORMANCE_SUMMARY_PATHS),
+}
+
+# Number of parallel scan segments per table, tables that are not listed are scanned serially
+EnumToScanSegments = {
+    DatabaseName.performances: 4,
+}
+
+# Builds a model from an item without validation, used for items that were written
+# with the current schema (see `SCHEMA_VERSION_ATTRIBUTE`) when trusted loading is enabled
+EnumToTrustedConstructor = {
+    Performance: construct_performance_unchecked,
+}
+
+# Attributes derived from an entry that are stored with it as the keys of secondary indexes
+EnumToIndexAttributes = {
+    Performance: get_performance_index_attributes,
+}
+
+# These fields are stored compressed when the "compress_payloads" setting is enabled
+EnumToCompressedFields = {
+    Performance: ("cast", "leading_team"),
+}
+
+# Every item records the schema version of the model it was written from
+SCHEMA_VERSION_ATTRIBUTE = "schema_version"
+
+# Number of trusted items per page that are still validated to check the fast path
+TRUSTED_SAMPLE_SIZE = 16
+
+# Above this many changed entries, the cache is patched by re-sorting once
+# instead of inserting the entries one by one
+BULK_PATCH_THRESHOLD = 64
+
+# Tables that are persisted to a local snapshot file and refreshed incrementally
+SNAPSHOT_TABLES = {
+    DatabaseName.performances,
+    DatabaseName.works_dates,
+    DatabaseName.venues,
+}
+
+# Tables that are loaded in the background when the app starts (see `prefetch_tables`). Passwords
+# are only read when editing, performances are read page by page or as summaries by the pages
+PREFETCH_TABLES = {
+    DatabaseName.works_dates,
+    DatabaseName.venues,
+}
+
+# Minimum time between two polls of the change log of a table
+CHANGE_LOG_POLL_SECONDS = 5.0
+
+# Maximum age (in seconds) of the cached entries of these tables when the "stale_while_revalidate"
+# setting is enabled, overridden by the "max_staleness_<table name>" setting. Older entries are
+# still shown while they are loaded again in the background. Passwords are never shown stale.
+EnumToMaxStaleness = {
+    DatabaseName.performances: 300.0,
+    DatabaseName.works_dates: 3600.0,
+    DatabaseName.venues: 3600.0,
+}
+
+# The tables the current page was shown stale entries of, with their age (see `track_stale_reads`)
+_stale_reads: contextvars.ContextVar[Optional[dict[str, float]]] = contextvars.ContextVar(
+    "stale_reads", default=None
+)
+
+
+def create_backend(db_name: DatabaseName) -> StorageBackend:
+    """
+    Create the storage backend of a table, selected with the "storage_backend" setting.
+    """
+    backend_name = load_setting("storage_backend", "dynamodb")
+
+    if backend_name == "dynamodb":
+        return DynamoDBBackend(db_name.value, EnumToScanSegments.get(db_name, 1))
+
+    if backend_name == "sqlite":
+        return SqliteBackend(db_name.value, load_setting("sqlite_path", "pyopera.sqlite3"))
+
+    raise ValueError(f"Unknown storage backend {backend_name}")
+
+
+@cache
+def get_list_adapter(entry_type: type[EntryType]) -> TypeAdapter[list[EntryType]]:
+    return TypeAdapter(list[entry_type])
+
+
+def trusted_loading_enabled() -> bool:
+    return load_setting("trusted_load", "false").lower() in ("1", "true", "yes")
+
+
+def payload_compression_enabled() -> bool:
+    return load_setting("compress_payloads", "false").lower() in ("1", "true", "yes")
+
+
+def shared_snapshot_enabled() -> bool:
+    return load_setting("shared_snapshot", "false").lower() in ("1", "true", "yes")
+
+
+def stale_while_revalidate_enabled() -> bool:
+    return load_setting("stale_while_revalidate", "false").lower() in ("1", "true", "yes")
+
+
+def get_max_staleness(db_name: DatabaseName) -> Optional[float]:
+    """
+    The maximum age of the cached entries of a table, None if readers always wait for fresh entries.
+    """
+    if not stale_while_revalidate_enabled() or db_name not in EnumToMaxStaleness:
+        return None
+
+    return float(load_setting(f"max_staleness_{db_name.value}", str(EnumToMaxStaleness[db_name])))
+
+
+def track_stale_reads() -> dict[str, float]:
+    """
+    Start recording the tables that are read stale, the returned dict is filled in while the page runs.
+    """
+    stale_reads: dict[str, float] = {}
+    _stale_reads.set(stale_reads)
+    return stale_reads
+
+
+def validate_items(entry_type: type[EntryType], items: Sequence[dict], trusted: bool = False) -> list[EntryType]:
+    """
+    Build the models of a page of items. All items are validated at once with a single
+    type adapter. With `trusted`, items written with the current schema version are built
+    without validation and only a random sample of them is validated (and compared).
+    """
+    constructor = EnumToTrustedConstructor.get(entry_type)
+    if not trusted or constructor is None:
+        return get_list_adapter(entry_type).validate_python(items)
+
+    schema_version = get_schema_version(entry_type)
+    is_trusted = [item.get(SCHEMA_VERSION_ATTRIBUTE) == schema_version for item in items]
+
+    untrusted_indices = [i for i, trusted_item in enumerate(is_trusted) if not trusted_item]
+    validated = get_list_adapter(entry_type).validate_python([items[i] for i in untrusted_indices])
+
+    entries: list = [None] * len(items)
+    for i, entry in zip(untrusted_indices, validated):
+        entries[i] = entry
+
+    trusted_indices = [i for i, trusted_item in enumerate(is_trusted) if trusted_item]
+    for i in trusted_indices:
+        entries[i] = constructor(items[i])
+
+    sample = random.sample(trusted_indices, min(TRUSTED_SAMPLE_SIZE, len(trusted_indices)))
+    sample_validated = get_list_adapter(entry_type).validate_python([items[i] for i in sample])
+    if any(entries[i] != entry for i, entry in zip(sample, sample_validated)):
+        print(f"Trusted loading of {entry_type.__name__} does not match validation, validating everything")
+        return get_list_adapter(entry_type).validate_python(items)
+
+    return entries
+
+
+def performance_matches_filters(performance: Performance, **filters: Any) -> bool:
+    for field, value in filters.items():
+        if field == "date_from":
+            matches = performance.date is not None and performance.date.earliest_date >= value
+        elif field == "date_to":
+            matches = performance.date is not None and performance.date.earliest_date <= value
+        elif field == "created_from":
+            matches = get_key_time(performance.key) >= value
+        elif field == "composer":
+            matches = value in performance.composers
+        elif field == "person":
+            matches = value in get_all_names_from_performance(performance)
+        else:
+            matches = getattr(performance, field) == value
+
+        if not matches:
+            return False
+
+    return True
+
+
+def get_changed_attributes(
+    old_item: dict, new_item: dict, rewritten: Iterable[str] = ()
+) -> tuple[dict[str, Any], list[str]]:
+    """
+    The attributes to set and to remove to turn the stored `old_item` into `new_item`. The
+    `rewritten` attributes are set (or removed) even if they did not change.
+    """
+    rewritten = set(rewritten)
+    set_attributes = {
+        attribute: value
+        for attribute, value in new_item.items()
+        if attribute in rewritten or attribute not in old_item or old_item[attribute] != value
+    }
+    remove_attributes = [attribute for attribute in dict.fromkeys([*old_item, *rewritten]) if attribute not in new_item]
+
+    return set_attributes, remove_attributes
+
+
+class TableSnapshot(Sequence[EntryType]):
+    """
+    The entries of a table at one point in time, read-only so that it can be shared between
+    all callers without copying. The view without the archived entries is built once, when it is
+    first used. Every snapshot of a table has a new `generation`, downstream caches can use it
+    (together with `includes_archived`) as their key.
+    """
+
+    def __init__(self, entries: Iterable[EntryType], generation: Hashable, includes_archived: bool = True) -> None:
+        # the entries of a shared snapshot are built on access, they are not copied
+        self._entries = entries if isinstance(entries, (tuple, SharedEntries)) else tuple(entries)
+        self.generation = generation
+        self.includes_archived = includes_archived
+        self._without_archived: Optional[TableSnapshot[EntryType]] = None if includes_archived else self
+
+    @property
+    def without_archived(self) -> "TableSnapshot[EntryType]":
+        if self._without_archived is None:
+            if isinstance(self._entries, SharedEntries):
+                entries = self._entries.without_archived()
+            else:
+                entries = tuple(entry for entry in self._entries if not getattr(entry, "archived", False))
+
+            self._without_archived = TableSnapshot(entries, self.generation, includes_archived=False)
+
+        return self._without_archived
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def __iter__(self) -> Iterator[EntryType]:
+        return iter(self._entries)
+
+    def __repr__(self) -> str:
+        return f"TableSnapshot(generation={self.generation}, entries={len(self)})"
+
+
+class TableCache(Generic[EntryType]):
+    """
+    The cached entries of a table. Writes are applied to the cached entries in place
+    (keeping the sort order) instead of reloading the whole table.
+
+    Loads are single-flight: when several sessions miss the cache at the same time, the first
+    one runs the loader and the others wait for its result (or its error). If the one reading
+    the pages (see `get_pages`) stops early, one of the waiting callers loads the table instead.
+    Writes made while the table is loading are applied to the loaded entries before they are
+    cached, an invalidation while loading means the loaded entries are handed to the waiting
+    callers but not cached.
+
+    The last loaded entries are kept when the cache is invalidated, `peek` returns them
+    for readers that prefer stale entries over waiting for a load (see `fetch_all_cached`).
+    """
+
+    def __init__(self, sort_key: Optional[Callable[[EntryType], Any]] = None) -> None:
+        self._sort_key = sort_key
+        self._entries: Optional[list[EntryType]] = None
+        self._by_key: dict[str, EntryType] = {}
+        self._lock = threading.RLock()
+        self._flight: Optional[Future] = None
+        self._flight_writes: list[Callable[[], None]] = []
+        self._flight_invalidated = False
+        self._loaded_at: Optional[float] = None
+        self._stale_entries: Optional[list[EntryType]] = None
+        self._snapshot: Optional[TableSnapshot[EntryType]] = None
+        self._snapshot_source: Optional[list[EntryType]] = None
+        self._generation = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._entries is not None
+
+    @property
+    def is_loading(self) -> bool:
+        # another thread is running the loader, `get` waits for it instead of loading again
+        return self._flight is not None
+
+    @property
+    def age(self) -> Optional[float]:
+        """
+        Seconds since the cached (or stale) entries were loaded, None if nothing was loaded yet.
+        """
+        loaded_at = self._loaded_at
+        return None if loaded_at is None else time.monotonic() - loaded_at
+
+    def peek(self) -> Optional[list[EntryType]]:
+        """
+        The cached entries, or the last loaded ones if the cache was invalidated since, without loading.
+        """
+        with self._lock:
+            return self._entries if self._entries is not None else self._stale_entries
+
+    def get(self, loader: Callable[[], Sequence[EntryType]]) -> list[EntryType]:
+        while True:
+            entries, flight = self._join_or_lead()
+            if entries is not None:
+                return entries
+
+            if flight is None:
+                return self._load(loader)
+
+            entries = flight.result()
+            if entries is not None:
+                return entries
+
+    def get_pages(self, page_loader: Callable[[], Iterable[Sequence[EntryType]]]) -> Iterator[Sequence[EntryType]]:
+        """
+        Like `get`, but the caller that runs the load gets the pages as `page_loader` yields them.
+        Callers that find the table cached or loading get all entries as a single page, once it is loaded.
+        """
+        while True:
+            entries, flight = self._join_or_lead()
+            if entries is None and flight is not None:
+                entries = flight.result()
+
+            if entries is not None:
+                yield entries.copy()
+                return
+
+            if flight is None:
+                break
+
+        flight = self._flight
+        assert flight is not None
+
+        loaded: list[EntryType] = []
+        try:
+            for page in page_loader():
+                loaded.extend(page)
+                yield page
+        except GeneratorExit:
+            # the caller stopped reading, the callers waiting for the flight load the table themselves
+            self._end_flight(flight)
+            flight.set_result(None)
+            raise
+        except BaseException as e:
+            self._end_flight(flight)
+            flight.set_exception(e)
+            raise
+
+        self._finish_flight(flight, loaded)
+
+    def reload(self, loader: Callable[[], Sequence[EntryType]], join: bool = True) -> list[EntryType]:
+        """
+        Load the table again, the cached entries are kept until the load is done.
+        Joins the running load, if there is one. Without `join`, the running load
+        is waited for and the table is loaded again after it.
+        """
+        while True:
+            with self._lock:
+                flight = self._flight
+                if flight is None:
+                    self._start_flight()
+                    break
+
+            if not join:
+                wait([flight])
+                continue
+
+            entries = flight.result()
+            if entries is not None:
+                return entries
+
+        return self._load(loader)
+
+    def _start_flight(self) -> None:
+        self._flight = Future()
+        self._flight_writes = []
+        self._flight_invalidated = False
+
+    def _join_or_lead(self) -> tuple[Optional[list[EntryType]], Optional[Future]]:
+        """
+        The cached entries, or else the running flight to wait for. If there is neither,
+        a new flight is started and the caller has to load the table.
+        """
+        with self._lock:
+            if self._entries is not None:
+                return self._entries, None
+
+            flight = self._flight
+            if flight is None:
+                self._start_flight()
+
+            return None, flight
+
+    def _end_flight(self, flight: Future) -> None:
+        with self._lock:
+            if self._flight is flight:
+                self._flight = None
+
+    def _load(self, loader: Callable[[], Sequence[EntryType]]) -> list[EntryType]:
+        assert self._flight is not None
+        flight = self._flight
+
+        try:
+            entries = list(loader())
+        except BaseException as e:
+            self._end_flight(flight)
+            flight.set_exception(e)
+            raise
+
+        return self._finish_flight(flight, entries)
+
+    def _finish_flight(self, flight: Future, entries: list[EntryType]) -> list[EntryType]:
+        if self._sort_key is not None:
+            entries.sort(key=self._sort_key, reverse=True)
+
+        with self._lock:
+            self._flight = None
+            if not self._flight_invalidated:
+                self._snapshot = None
+                self._entries = entries
+                self._by_key = {entry.key: entry for entry in entries}
+                self._loaded_at = time.monotonic()
+                self._stale_entries = None
+
+                for write in self._flight_writes:
+                    write()
+
+                # a write found the entries inconsistent and invalidated them
+                if self._entries is not None:
+                    entries = self._entries
+
+            self._flight_writes = []
+
+        flight.set_result(entries)
+        return entries
+
+    def snapshot(self, entries: list[EntryType]) -> TableSnapshot[EntryType]:
+        """
+        An immutable snapshot of `entries` (as returned by `get` or `peek`). The snapshot is
+        reused until the cached entries change.
+        """
+        with self._lock:
+            if self._snapshot is None or self._snapshot_source is not entries:
+                self._generation += 1
+                self._snapshot = TableSnapshot(entries, self._generation)
+                self._snapshot_source = entries
+
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            if self._entries is not None:
+                self._stale_entries = self._entries
+
+            self._entries = None
+            self._by_key = {}
+
+            if self._flight is not None:
+                self._flight_invalidated = True
+
+    def _record_while_loading(self, write: Callable[[], None]) -> None:
+        # the running load may have read the table before the write, apply it once it is done
+        if self._flight is not None:
+            self._flight_writes.append(write)
+
+    def lookup(self, keys: Iterable[str]) -> list[EntryType]:
+        with self._lock:
+            return [self._by_key[key] for key in keys if key in self._by_key]
+
+    def upsert(self, entries: Sequence[EntryType]) -> None:
+        with self._lock:
+            self._record_while_loading(partial(self.upsert, entries))
+            self._snapshot = None
+
+            if self._entries is None:
+                # nothing cached, the next read loads the table anyway
+                return
+
+            if len(entries) > BULK_PATCH_THRESHOLD:
+                self._by_key.update((entry.key, entry) for entry in entries)
+                self._rebuild()
+                return
+
+            for entry in entries:
+                if entry.key in self._by_key:
+                    self._remove_entry(self._by_key[entry.key])
+
+                index = self._insertion_index(entry)
+                self._entries.insert(index, entry)
+                self._by_key[entry.key] = entry
+
+                if not self._is_consistent(index):
+                    self.invalidate()
+                    return
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            keys = list(keys)
+            self._record_while_loading(partial(self.remove, keys))
+            self._snapshot = None
+
+            if self._entries is None:
+                return
+
+            if len(keys) > BULK_PATCH_THRESHOLD:
+                for key in keys:
+                    self._by_key.pop(key, None)
+                self._rebuild()
+                return
+
+            for key in keys:
+                entry = self._by_key.get(key)
+                if entry is not None:
+                    self._remove_entry(entry)
+
+            if len(self._entries) != len(self._by_key):
+                self.invalidate()
+
+    def _rebuild(self) -> None:
+        entries = list(self._by_key.values())
+        if self._sort_key is not None:
+            entries.sort(key=self._sort_key, reverse=True)
+
+        self._entries = entries
+
+    def _insertion_index(self, entry: EntryType) -> int:
+        assert self._entries is not None
+        if self._sort_key is None:
+            return len(self._entries)
+
+        # binary search for the first entry with a smaller sort key (the entries are in descending order)
+        sort_key = self._sort_key(entry)
+        low, high = 0, len(self._entries)
+        while low < high:
+            middle = (low + high) // 2
+            if self._sort_key(self._entries[middle]) < sort_key:
+                high = middle
+            else:
+                low = middle + 1
+
+        return low
+
+    def _index_of(self, entry: EntryType) -> int:
+        assert self._entries is not None
+        if self._sort_key is None:
+            return next(i for i, cached in enumerate(self._entries) if cached.key == entry.key)
+
+        # the entry is among the entries with the same sort key, right before the insertion index
+        sort_key = self._sort_key(entry)
+        index = self._insertion_index(entry) - 1
+        while index >= 0 and self._sort_key(self._entries[index]) == sort_key:
+            if self._entries[index].key == entry.key:
+                return index
+            index -= 1
+
+        raise ValueError(f"Entry {entry.key} is not in the cache")
+
+    def _remove_entry(self, entry: EntryType) -> None:
+        assert self._entries is not None
+        del self._entries[self._index_of(entry)]
+        del self._by_key[entry.key]
+
+    def _is_consistent(self, index: int) -> bool:
+        assert self._entries is not None
+        if len(self._entries) != len(self._by_key):
+            return False
+
+        if self._sort_key is None:
+            return True
+
+        sort_key = self._sort_key(self._entries[index])
+        before_ok = index == 0 or self._sort_key(self._entries[index - 1]) >= sort_key
+        after_ok = index == len(self._entries) - 1 or self._sort_key(self._entries[index + 1]) <= sort_key
+
+        return before_ok and after_ok
+
+
+class DetailCache(Generic[EntryType]):
+    """
+    Single entries that were loaded on demand, by key.
+    """
+
+    def __init__(self) -> None:
+        self._by_key: dict[str, EntryType] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, keys: Iterable[str]) -> dict[str, EntryType]:
+        with self._lock:
+            return {key: self._by_key[key] for key in keys if key in self._by_key}
+
+    def upsert(self, entries: Iterable[EntryType]) -> None:
+        with self._lock:
+            self._by_key.update((entry.key, entry) for entry in entries)
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._by_key.pop(key, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_key = {}
+
 
 class DatabaseInterface(Generic[EntryType]):
     """
@@ -79,45 +737,651 @@ class DatabaseInterface(Generic[EntryType]):
     ) -> None:
         self._entry_type = entry_type
         self._db_name = ModelToEnum[entry_type]
-        self._table = make_deta_style_table(self._db_name.value)
+        self._backend = MeasuredBackend(create_backend(self._db_name), self._db_name.value)
+
+        # local backends store json and index the cast, so they always store it uncompressed
+        self._compress_payloads = (
+            payload_compression_enabled()
+            and not self._backend.is_local
+            and self._entry_type in EnumToCompressedFields
+        )
+
+        # all server processes of the machine read the table from one memory mapped snapshot,
+        # instead of keeping a copy of the entries each (see `pyopera.shared_snapshot`)
+        self._share_snapshot = (
+            shared_snapshot_enabled()
+            and self._db_name.value in TableToSharedColumns
+            and self._entry_type in EnumToTrustedConstructor
+        )
+        self._shared_lock = threading.Lock()
+        self._shared_view: Optional[TableSnapshot[EntryType]] = None
+
+        # the cached entries are up to date with the change log up to this sequence number
+        self._change_log = create_change_log(self._db_name.value, self._backend.is_local)
+        self._change_seq: Optional[int] = None
+        self._last_change_poll = 0.0
+        self._change_lock = threading.Lock()
+
+        # the snapshot items that were served without being compared with the table yet
+        self._unrefreshed_snapshot: Optional[list[dict]] = None
+
+    def _start_change_tracking(self) -> Optional[TableVersion]:
+        """
+        Called before loading from the table, changes made while loading are replayed on the next sync.
+        Returns the version of the table before loading (None for local backends).
+        """
+        if self._change_log is None:
+            return None
+
+        version = self._change_log.current_version()
+
+        with self._change_lock:
+            if self._change_seq is None:
+                self._change_seq = version.generation
+                self._last_change_poll = time.monotonic()
+
+        return version
+
+    def _record_changes(self, changes: Sequence[dict]) -> None:
+        if self._change_log is None:
+            return
+
+        try:
+            self._change_log.append(changes)
+            return
+        except Exception as e:
+            print(f"Could not append to the change log of {self._db_name.value}: {e}")
+
+        # The write itself succeeded, but other replicas would never see it. A reload entry makes
+        # them load the table again: right away, or once the entries that could not be written are
+        # past their grace period (see `ChangeLog.read_since`). Either way, the version of the table
+        # changes and local snapshots taken before it are not used as they are.
+        try:
+            self._change_log.append([{"op": "reload", "key": "*"}])
+        except Exception as e:
+            print(f"Could not append a reload entry to the change log of {self._db_name.value}: {e}")
+
+    def sync_changes(self, force: bool = False) -> None:
+        """
+        Apply the changes other replicas made since the last sync to the cached entries.
+        The change log is polled at most every `CHANGE_LOG_POLL_SECONDS` unless `force` is set.
+        """
+        self._start_snapshot_refresh()
+
+        with self._change_lock:
+            if self._change_log is None or self._change_seq is None:
+                return
+
+            if not force and time.monotonic() - self._last_change_poll < CHANGE_LOG_POLL_SECONDS:
+                return
+
+            self._last_change_poll = time.monotonic()
+
+            try:
+                changes = self._change_log.read_since(self._change_seq)
+            except ChangeLogGap as e:
+                print(f"{e}, reloading the table")
+                changes = None
+
+            if changes is not None and any(change["op"] == "reload" for change in changes):
+                changes = None
+
+            if changes is None:
+                self._change_seq = None
+            elif len(changes) > 0:
+                self._change_seq = int(changes[-1]["seq"])
+
+        if changes is None:
+            self.refresh_db()
+            return
+
+        # only the last change of every key matters
+        last_changes = {change["key"]: change for change in changes}
+
+        deleted_keys = [key for key, change in last_changes.items() if change["op"] == "delete"]
+        put_items = [change["item"] for change in last_changes.values() if change["op"] == "put"]
+
+        self._apply_deletes(deleted_keys)
+        self._apply_puts(self._validate_items(put_items), put_items)
+
+    def _shared_entries(self, load: bool = True) -> Optional[SharedEntries]:
+        """
+        The entries of the shared snapshot of the table. If there is none yet and `load`
+        is set, the table is loaded and published.
+        """
+        if not self._share_snapshot:
+            return None
+
+        attach = partial(
+            attach_shared_entries,
+            self._db_name.value,
+            EnumToTrustedConstructor[self._entry_type],
+            EnumToSortKey.get(self._entry_type),
+        )
+
+        shared = attach()
+        if shared is None and load:
+            with self._shared_lock:
+                shared = attach()
+                if shared is None:
+                    self._publish_shared(self._fetch_db())
+                    shared = attach()
+
+        if shared is None:
+            return None
+
+        metadata = shared.snapshot.metadata
+        with self._change_lock:
+            if self._change_seq is None and metadata.get("change_seq") is not None:
+                # changes made after the snapshot was published are applied on the next sync
+                self._change_seq = metadata["change_seq"]
+
+        return shared
+
+    def _publish_shared(self, entries: Iterable[EntryType]) -> None:
+        entries = list(entries)
+        sort_key = EnumToSortKey.get(self._entry_type)
+        if sort_key is not None:
+            entries.sort(key=sort_key, reverse=True)
+
+        items = [json.loads(entry.model_dump_json()) for entry in entries]
+        publish_shared_snapshot(self._db_name.value, items, dict(change_seq=self._change_seq))
+
+    def _update_shared(self, entries: Sequence[EntryType], deleted_keys: Sequence[str]) -> None:
+        shared = self._shared_entries(load=False)
+        if shared is None:
+            return
+
+        # every process applies the changes from the change log, only the first one that
+        # finds them missing appends them to the delta of the snapshot
+        current = {entry.key: entry for entry in shared.lookup([*(entry.key for entry in entries), *deleted_keys])}
+        if all(current.get(entry.key) == entry for entry in entries) and all(
+            key not in current for key in deleted_keys
+        ):
+            return
+
+        changes = [dict(op="delete", key=key) for key in deleted_keys]
+        changes.extend(dict(op="put", item=json.loads(entry.model_dump_json())) for entry in entries)
+
+        append_shared_changes(
+            self._db_name.value,
+            changes,
+            EnumToTrustedConstructor[self._entry_type],
+            EnumToSortKey.get(self._entry_type),
+        )
+
+    def _apply_puts(self, entries: Sequence[EntryType], item_dicts: Sequence[dict]) -> None:
+        if len(entries) == 0:
+            return
+
+        self._update_shared(entries, [])
+
+        get_table_cache(self).upsert(entries)
+        get_detail_cache(self).upsert(entries)
+        if self._entry_type in EnumToSummary:
+            get_summary_cache(self).upsert([self._summarize_item(item_dict) for item_dict in item_dicts])
+
+    def _apply_deletes(self, keys: Sequence[str]) -> None:
+        if len(keys) == 0:
+            return
+
+        self._update_shared([], keys)
+
+        get_table_cache(self).remove(keys)
+        get_detail_cache(self).remove(keys)
+        get_summary_cache(self).remove(keys)
+
+    def _uses_snapshot(self) -> bool:
+        return not self._backend.is_local and self._db_name in SNAPSHOT_TABLES
 
     def _fetch_db(self) -> Sequence[EntryType]:
         # The actual fetching of the database
-        final_items = []
-        kwargs = {}
+        version = self._start_change_tracking()
 
-        while True:
-            response = self._table.scan(**kwargs)
+        if not self._uses_snapshot():
+            final_items = self._backend.scan_items()
+            return self._validate_items(final_items)
 
-            items = response.get("Items", [])
-            final_items.extend(items)
+        snapshot = load_snapshot(self._db_name.value, self._entry_type)
 
-            # If there are no more items to fetch, break the loop
-            if response.get("LastEvaluatedKey") is None:
-                break
+        if snapshot is None:
+            final_items = self._backend.scan_items()
+        else:
+            snapshot_items, snapshot_version = snapshot
+            if version is not None and snapshot_version == version:
+                # nothing was written since the snapshot was taken, checking that took a single read
+                return self._validate_items(snapshot_items)
+
+            final_items = self._catch_up_snapshot_items(snapshot_items, snapshot_version, version)
+
+            if final_items is None and not self._share_snapshot:
+                # the change log does not reach back to the snapshot, it is shown as it is
+                # and compared with the table in the background (see `_start_snapshot_refresh`)
+                with self._change_lock:
+                    self._unrefreshed_snapshot = snapshot_items
+
+                return self._validate_items(snapshot_items)
+
+            if final_items is None:
+                final_items = self._refresh_snapshot_items(snapshot_items)
+
+        write_snapshot(self._db_name.value, self._entry_type, self._decompress_items(final_items), version)
+
+        return self._validate_items(final_items)
+
+    def _catch_up_snapshot_items(
+        self,
+        snapshot_items: list[dict],
+        snapshot_version: Optional[tuple[int, int]],
+        version: Optional[TableVersion],
+    ) -> Optional[list[dict]]:
+        """
+        The snapshot items with the changes from the change log since the snapshot was taken
+        applied, a single query. None if the change log does not have all of these changes.
+        """
+        if self._change_log is None or snapshot_version is None or version is None:
+            return None
+
+        snapshot_generation, snapshot_checksum = snapshot_version
+        if snapshot_generation > version.generation:
+            # the counter was reset
+            return None
 
-            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        try:
+            changes = self._change_log.read_since(snapshot_generation)
+        except ChangeLogGap:
+            return None
 
-        return [self._entry_type(**item) for item in final_items]
+        # later changes are replayed by the next sync
+        changes = [change for change in changes if int(change["seq"]) <= version.generation]
+        if any(change["op"] == "reload" for change in changes):
+            return None
+
+        # the checksums only add up if every change since the snapshot is there
+        if snapshot_checksum + sum(change_digest(change) for change in changes) != version.checksum:
+            return None
+
+        items_by_key = {item["key"]: item for item in snapshot_items}
+        for change in changes:
+            if change["op"] == "delete":
+                items_by_key.pop(change["key"], None)
+            else:
+                items_by_key[change["key"]] = change["item"]
+
+        return list(items_by_key.values())
+
+    def _refresh_snapshot(self, snapshot_items: list[dict]) -> list[EntryType]:
+        # changes made while refreshing are replayed by the next sync
+        version = self._start_change_tracking()
+        final_items = self._refresh_snapshot_items(snapshot_items)
+        write_snapshot(self._db_name.value, self._entry_type, self._decompress_items(final_items), version)
+
+        return self._validate_items(final_items)
+
+    def _start_snapshot_refresh(self) -> None:
+        """
+        Compare the snapshot that `_fetch_db` served with the table in the background, the cached
+        entries are replaced once that is done.
+        """
+        with self._change_lock:
+            snapshot_items, self._unrefreshed_snapshot = self._unrefreshed_snapshot, None
+
+        if snapshot_items is None:
+            return
+
+        # the cache is looked up here since streamlit caches are only available on the script thread.
+        # The load that served the snapshot may still be finishing, the refresh has to run after it.
+        loader = partial(get_table_cache(self).reload, partial(self._refresh_snapshot, snapshot_items), join=False)
+        _prefetch_executor.submit(contextvars.copy_context().run, run_prefetch, self._db_name, loader, "(refresh)")
+
+    def _refresh_snapshot_items(self, snapshot_items: list[dict]) -> list[dict]:
+        # the full items are fetched only for the ones that changed since the snapshot
+        remote_versions = self._backend.scan_versions()
+
+        snapshot_by_key = {item["key"]: item for item in snapshot_items}
+
+        changed_keys = [
+            key
+            for key, updated_at in remote_versions.items()
+            if key not in snapshot_by_key or snapshot_by_key[key].get(UPDATED_AT_ATTRIBUTE) != updated_at
+        ]
+
+        changed_items = self._backend.get_items(changed_keys)
+
+        # items that are not in the remote table anymore have been deleted
+        final_items = {key: item for key, item in snapshot_by_key.items() if key in remote_versions}
+        final_items.update((item["key"], item) for item in changed_items)
+
+        return list(final_items.values())
+
+    def _decompress_items(self, items: Sequence[dict]) -> Sequence[dict]:
+        if self._entry_type not in EnumToCompressedFields:
+            return items
+
+        return [decompress_payload(item) if is_compressed(item) else item for item in items]
+
+    def _validate_items(self, items: Sequence[dict]) -> list[EntryType]:
+        return validate_items(self._entry_type, self._decompress_items(items), trusted_loading_enabled())
+
+    def _fetch_summaries(self) -> Sequence[BaseModel]:
+        summary_type, paths = EnumToSummary[self._entry_type]
+        self._start_change_tracking()
+        return validate_items(summary_type, self._backend.scan_projection(paths))
+
+    def _summarize_item(self, item: dict) -> Optional[BaseModel]:
+        summary = EnumToSummary.get(self._entry_type)
+        if summary is None:
+            return None
+
+        summary_type, paths = summary
+        return summary_type(**project_item(item, paths))
+
+    def fetch_db(self) -> TableSnapshot[EntryType]:
+        """
+        All entries of the table as an immutable snapshot, shared by all callers.
+        """
+        self.sync_changes()
+
+        shared = self._shared_entries()
+        if shared is not None:
+            shared_view = self._shared_view
+            if shared_view is None or shared_view.generation != shared.generation:
+                shared_view = TableSnapshot(shared, shared.generation)
+                self._shared_view = shared_view
+
+            return shared_view
+
+        entries = fetch_all_cached(self)
+        self._start_snapshot_refresh()
+
+        return get_table_cache(self).snapshot(entries)
+
+    def iter_db(self, cache: bool = False) -> Iterator[Sequence[EntryType]]:
+        """
+        Yield the entries page by page while the table is read, so that callers can start
+        working on the first page before the last one arrives. If the table is cached, the
+        cached entries are yielded as a single page.
+
+        Pages come in storage order. With `cache`, the entries are also kept and put into
+        the table cache once the last page has been read, sessions that start reading while
+        the table loads get all entries as a single page when it is done. Without it, only
+        one page at a time is held in memory.
+        """
+        self.sync_changes()
+
+        if self._full_table_available():
+            yield self.fetch_db()
+            return
+
+        if cache and self._uses_snapshot() and get_snapshot_path(self._db_name.value).exists():
+            # refreshing the local snapshot only reads what changed, which beats streaming the table
+            yield fetch_all_cached(self).copy()
+            return
+
+        if cache:
+            # sessions that read the table at the same time share one scan, see `TableCache.get_pages`
+            yield from get_table_cache(self).get_pages(self._iter_fetch_db)
+            return
+
+        for items, _ in self._backend.iter_pages():
+            yield self._validate_items(items)
+
+    def _iter_fetch_db(self) -> Iterator[list[EntryType]]:
+        # `_fetch_db` page by page, the local snapshot is written but not read
+        version = self._start_change_tracking()
+
+        loaded_items: list[dict] = []
+        for items, _ in self._backend.iter_pages():
+            loaded_items.extend(items)
+            yield self._validate_items(items)
+
+        if self._uses_snapshot():
+            write_snapshot(self._db_name.value, self._entry_type, self._decompress_items(loaded_items), version)
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[EntryType], Any]]:
+        """
+        Read the table page by page without caching it, see `StorageBackend.iter_pages`.
+        """
+        for items, next_token in self._backend.iter_pages(start_token):
+            yield self._validate_items(items), next_token
+
+    def fetch_summaries(self) -> list[BaseModel]:
+        """
+        The entries with only the attributes needed for lists and overviews (see `EnumToSummary`).
+        """
+        if self._entry_type not in EnumToSummary or self._full_table_available():
+            # the full entries are (or will soon be) there and have all the attributes of a summary
+            return self.fetch_db()
+
+        self.sync_changes()
+        return fetch_summaries_cached(self).copy()
+
+    def fetch_details(self, keys: Iterable[str]) -> list[EntryType]:
+        """
+        The full entries with the given keys. Uses the cached table if it is loaded,
+        otherwise the missing entries are fetched (in batches) and cached by key.
+        """
+        keys = list(keys)
+        self.sync_changes()
+
+        shared = self._shared_entries()
+        if shared is not None:
+            return shared.lookup(keys)
+
+        table_cache = get_table_cache(self)
+        if table_cache.is_loaded or table_cache.is_loading:
+            table_cache.get(self._fetch_db)
+            return table_cache.lookup(keys)
+
+        detail_cache = get_detail_cache(self)
+        found = detail_cache.lookup(keys)
+
+        missing_keys = [key for key in keys if key not in found]
+        if len(missing_keys) > 0:
+            self._start_change_tracking()
+            loaded = self._validate_items(self._backend.get_items(missing_keys))
+            detail_cache.upsert(loaded)
+            found.update((entry.key, entry) for entry in loaded)
+
+        return [found[key] for key in keys if key in found]
+
+    def query(
+        self,
+        *,
+        stage: Optional[str] = None,
+        name: Optional[str] = None,
+        composer: Optional[str] = None,
+        person: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        created_from: Optional[datetime] = None,
+        include_archived_entries: bool = False,
+    ) -> list[EntryType]:
+        """
+        Return the performances matching all given filters. If the table is cached (or the
+        backend cannot answer the query) the cached table is filtered, otherwise the backend
+        reads only the matching items (e.g. using an index). `created_from` selects the
+        performances that were added at or after a (timezone aware) time, see `get_key_time`.
+        It is approximate for performances added before the time-ordered keys, their keys
+        were migrated with the date of the performance as the time.
+        """
+        filters = {
+            field: value
+            for field, value in dict(
+                stage=stage,
+                name=name,
+                composer=composer,
+                person=person,
+                date_from=date_from,
+                date_to=date_to,
+                created_from=created_from,
+            ).items()
+            if value is not None
+        }
+        if not include_archived_entries:
+            filters["archived"] = False
 
-    def fetch_db(self) -> list[EntryType]:
-        return fetch_all_cached(self).copy()
+        items = None
+        if self._backend.supports_query and not self._full_table_available():
+            try:
+                items = self._backend.query_items(**filters)
+            except NotImplementedError:
+                pass
+
+        if items is None and "person" not in filters and self._can_query_summaries():
+            # the summaries have every attribute needed by the other filters, only the matches are loaded in full
+            summaries = fetch_summaries_cached(self)
+            keys = [summary.key for summary in summaries if performance_matches_filters(summary, **filters)]
+            return self.fetch_details(keys)
+
+        if items is None:
+            return [entry for entry in self.fetch_db() if performance_matches_filters(entry, **filters)]
+
+        # backends may apply only some of the filters
+        entries = [
+            entry for entry in self._validate_items(items) if performance_matches_filters(entry, **filters)
+        ]
+
+        sort_key = EnumToSortKey.get(self._entry_type)
+        if sort_key is not None:
+            entries.sort(key=sort_key, reverse=True)
+
+        return entries
+
+    def _full_table_available(self) -> bool:
+        table_cache = get_table_cache(self)
+        if table_cache.is_loaded or table_cache.is_loading or self._share_snapshot:
+            return True
+
+        # stale entries are shown right away
+        return get_max_staleness(self._db_name) is not None and table_cache.peek() is not None
+
+    def _can_query_summaries(self) -> bool:
+        return (
+            self._entry_type in EnumToSummary
+            and not self._full_table_available()
+            and get_summary_cache(self).is_loaded
+        )
+
+    def _encode_item(self, item: EntryType) -> dict:
+        # this converts the pydantic model to a json string (that pydantic knows how to convert back)
+        item_json_str = item.model_dump_json()
+        # this converts the json string to a dictionary which is what boto3 expects
+        item_dict = json.loads(item_json_str)
+        item_dict[UPDATED_AT_ATTRIBUTE] = Decimal(str(time.time()))
+        item_dict[SCHEMA_VERSION_ATTRIBUTE] = get_schema_version(self._entry_type)
+
+        index_attributes = EnumToIndexAttributes.get(self._entry_type)
+        if index_attributes is not None:
+            item_dict.update(index_attributes(item))
+
+        if self._compress_payloads:
+            # the attributes read by summaries stay uncompressed
+            _, summary_paths = EnumToSummary.get(self._entry_type, (None, []))
+            item_dict = compress_payload(item_dict, EnumToCompressedFields[self._entry_type], summary_paths)
+
+        return item_dict
 
     def put_db(self, items_to_put: EntryType | Sequence[EntryType]) -> None:
         if soft_isinstance(items_to_put, self._entry_type):
             items_to_put = [items_to_put]
 
         assert isinstance(items_to_put, Sequence)
-        with self._table.batch_writer() as batch:
-            for item in items_to_put:
-                # this converts the pydantic model to a json string (that pydantic knows how to convert back)
-                item_json_str = item.model_dump_json()
-                # this converts the json string to a dictionary which is what boto3 expects
-                item_dict = json.loads(item_json_str)
+        self.put_many(items_to_put)
 
-                batch.put_item(Item=item_dict)
+    def put_many(
+        self,
+        items_to_put: Sequence[EntryType],
+        progress: Optional[ProgressCallback] = None,
+        log_items: bool = True,
+    ) -> None:
+        """
+        Write many entries with batch writes, the caches are patched once at the end.
+        Without `log_items`, a single "reload" entry is added to the change log instead
+        of every item, other replicas reload the table (e.g. after an import).
+        """
+        item_dicts = [self._encode_item(item) for item in items_to_put]
+
+        self._backend.put_items(item_dicts, progress)
+        if log_items:
+            self._record_changes([{"op": "put", "key": item_dict["key"], "item": item_dict} for item_dict in item_dicts])
+        else:
+            self._record_changes([{"op": "reload", "key": "*"}])
+
+        self._apply_puts(items_to_put, item_dicts)
+
+    def update_db(self, old_entry: EntryType, new_entry: EntryType) -> None:
+        """
+        Store `new_entry` by sending only the attributes that differ from `old_entry`
+        (the currently stored version) in a single update.
+        """
+        if old_entry.key != new_entry.key:
+            raise ValueError("Cannot change the key of an entry with an update")
+
+        old_item = self._encode_item(old_entry)
+        new_item = self._encode_item(new_entry)
 
-        fetch_all_cached.clear(self)
+        if self._entry_type not in EnumToCompressedFields or self._backend.is_local:
+            # local backends always store the items uncompressed
+            self._backend.update_item(new_entry.key, *get_changed_attributes(old_item, new_item))
+        else:
+            try:
+                # only valid if the stored item is encoded like the setting says (with or without payload)
+                self._backend.update_item(
+                    new_entry.key,
+                    *get_changed_attributes(old_item, new_item),
+                    expected_attributes={PAYLOAD_ATTRIBUTE: self._compress_payloads},
+                )
+            except UpdateConditionFailed:
+                # it was written before compression was turned on or off, its large fields are rewritten
+                rewritten = {*EnumToCompressedFields[self._entry_type], PAYLOAD_ATTRIBUTE}
+                self._backend.update_item(new_entry.key, *get_changed_attributes(old_item, new_item, rewritten))
+
+        self._record_changes([{"op": "put", "key": new_entry.key, "item": new_item}])
+
+        self._apply_puts([new_entry], [new_item])
+
+    def update_fields(self, entry: EntryType, **changes: Any) -> EntryType:
+        """
+        Change some fields of a stored entry, e.g. `update_fields(performance, archived=True)`.
+        """
+        new_entry = self._entry_type(**{**entry.model_dump(), **changes})
+        self.update_db(entry, new_entry)
+
+        return new_entry
+
+    def delete_many(
+        self,
+        to_delete: Sequence[EntryType | str],
+        progress: Optional[ProgressCallback] = None,
+    ) -> None:
+        """
+        Delete many entries (or keys) with batch writes, the caches are patched once at the end.
+        """
+        keys = [item.key if soft_isinstance(item, self._entry_type) else item for item in to_delete]
+
+        self._backend.delete_items(keys, progress)
+        self._record_changes([{"op": "delete", "key": key} for key in keys])
+
+        self._apply_deletes(keys)
+
+    def update_where(
+        self,
+        predicate: Callable[[EntryType], bool],
+        changes: dict[str, Any],
+        progress: Optional[ProgressCallback] = None,
+    ) -> int:
+        """
+        Apply the same changes to every entry matching the predicate, e.g.
+        `update_where(lambda performance: performance.stage == "WSO", {"archived": True})`.
+        Returns the number of updated entries.
+        """
+        to_update = [entry for entry in self.fetch_db() if predicate(entry)]
+        updated = [self._entry_type(**{**entry.model_dump(), **changes}) for entry in to_update]
+
+        self.put_many(updated, progress)
+
+        return len(updated)
 
     def create_instance(self, **kwargs) -> EntryType:
         return self._entry_type(**kwargs)
@@ -126,34 +1390,192 @@ class DatabaseInterface(Generic[EntryType]):
         if soft_isinstance(to_delete, self._entry_type):
             to_delete = to_delete.key
 
-        self._table.delete_item(Key={"key": to_delete})
+        self._backend.delete_item(to_delete)
+        self._record_changes([{"op": "delete", "key": to_delete}])
+
+        self._apply_deletes([to_delete])
+
+    def clear_db(self, progress: Optional[ProgressCallback] = None) -> None:
+        self.delete_many(self.fetch_db(), progress)
+
+        self.refresh_db()
 
-        fetch_all_cached.clear(self)
+    def refresh_db(self) -> None:
+        """
+        Drop the cached entries, the next read scans the whole table again.
+        """
+        with self._change_lock:
+            self._change_seq = None
 
-    def clear_db(self) -> None:
-        for item in self.fetch_db():
-            self.delete_item_db(item)
+        if self._share_snapshot:
+            discard_shared_snapshot(self._db_name.value)
 
-        fetch_all_cached.clear(self)
+        get_table_cache(self).invalidate()
+        get_detail_cache(self).invalidate()
+        get_summary_cache(self).invalidate()
 
     def __hash__(self) -> int:
         return hash(self._db_name.value)
 
 
+_interfaces_lock = threading.Lock()
+_interfaces: dict[DatabaseName, DatabaseInterface] = {}
+
+
+def get_interface(entry_type: type[EntryType]) -> DatabaseInterface[EntryType]:
+    """
+    The shared interface of the table storing `entry_type`.
+    """
+    db_name = ModelToEnum[entry_type]
+    with _interfaces_lock:
+        interface = _interfaces.get(db_name)
+        if interface is None or interface._entry_type is not entry_type:
+            # the model class changes when streamlit reloads a modified module
+            interface = DatabaseInterface(entry_type)
+            _interfaces[db_name] = interface
+
+        return interface
+
+
 @st.cache_resource(
     show_spinner=False,
     hash_funcs={DatabaseInterface: lambda interface: interface._db_name},
 )
-def fetch_all_cached(interface: DatabaseInterface[EntryType]) -> list[EntryType]:
-    text_for_spinner = EnumToLoadText.get(interface._entry_type)
+def get_table_cache(interface: DatabaseInterface[EntryType]) -> TableCache[EntryType]:
+    return TableCache(EnumToSortKey.get(interface._entry_type))
+
+
+@st.cache_resource(
+    show_spinner=False,
+    hash_funcs={DatabaseInterface: lambda interface: interface._db_name},
+)
+def get_summary_cache(interface: DatabaseInterface) -> TableCache:
+    return TableCache(EnumToSortKey.get(interface._entry_type))
+
+
+@st.cache_resource(
+    show_spinner=False,
+    hash_funcs={DatabaseInterface: lambda interface: interface._db_name},
+)
+def get_detail_cache(interface: DatabaseInterface[EntryType]) -> DetailCache[EntryType]:
+    return DetailCache()
+
+
+# Runs the loads started by `prefetch_tables`, one thread per table
+_prefetch_executor = ThreadPoolExecutor(max_workers=len(DatabaseName), thread_name_prefix="prefetch")
+
+_prefetch_lock = threading.Lock()
+_prefetch_started = False
+
+
+def prefetch_tables() -> None:
+    """
+    Start loading the tables of `PREFETCH_TABLES` that are not cached yet in the background, all
+    tables at the same time. Pages that read a table while it is loading wait for the running load
+    instead of starting their own. Only the first call of the process starts loads, later script
+    runs find the tables cached (or loading) anyway.
+    """
+    global _prefetch_started
+
+    with _prefetch_lock:
+        if _prefetch_started:
+            return
+        _prefetch_started = True
+
+    for db_name in PREFETCH_TABLES:
+        interface = get_interface(EnumToModel[db_name])
+
+        if interface._share_snapshot:
+            if interface._shared_entries(load=False) is not None:
+                continue
+
+            loader = interface._shared_entries
+        else:
+            # the cache is looked up here since streamlit caches are only available on the script thread
+            table_cache = get_table_cache(interface)
+            if table_cache.is_loaded or table_cache.is_loading:
+                continue
+
+            loader = partial(table_cache.get, interface._fetch_db)
+
+        _prefetch_executor.submit(contextvars.copy_context().run, run_prefetch, interface._db_name, loader)
+
+
+def run_prefetch(db_name: DatabaseName, loader: Callable[[], Any], page: str = "(prefetch)") -> None:
+    set_current_page(page)
+    try:
+        loader()
+    except Exception as e:
+        # the page that needs the table loads it again and shows the error
+        print(f"Loading {db_name.value} in the background failed: {e}")
+
+
+def revalidate(table_cache: TableCache, loader: Callable[[], Sequence], max_staleness: float) -> None:
+    # another session may have started the same refresh a moment earlier
+    age = table_cache.age
+    if table_cache.is_loaded and age is not None and age <= max_staleness:
+        return
+
+    table_cache.reload(loader)
+
+
+def fetch_stale_while_revalidate(
+    interface: DatabaseInterface[EntryType], table_cache: TableCache[EntryType], max_staleness: float
+) -> Optional[list[EntryType]]:
+    """
+    The cached entries of a table even if they are older than `max_staleness` or were invalidated,
+    in which case they are loaded again in the background. None if the table was never loaded.
+    """
+    entries = table_cache.peek()
+    if entries is None:
+        return None
+
+    age = table_cache.age
+    if table_cache.is_loaded and age is not None and age <= max_staleness:
+        return entries
+
+    if not table_cache.is_loading:
+        loader = partial(revalidate, table_cache, interface._fetch_db, max_staleness)
+        _prefetch_executor.submit(
+            contextvars.copy_context().run, run_prefetch, interface._db_name, loader, "(revalidate)"
+        )
+
+    stale_reads = _stale_reads.get()
+    if stale_reads is not None and age is not None:
+        stale_reads[interface._db_name.value] = age
+
+    return entries
+
+
+def load_with_spinner(table_cache: TableCache, loader: Callable[[], Sequence], text_for_spinner: Optional[str]) -> list:
+    if table_cache.is_loaded:
+        return table_cache.get(loader)
 
     context_manager = nullcontext() if text_for_spinner is None else st.spinner(text_for_spinner)
 
     with context_manager:
-        raw_data = interface._fetch_db()
+        return table_cache.get(loader)
+
 
-        post_process = EnumToPostProcess.get(interface._entry_type)
-        if post_process is not None:
-            raw_data = post_process(raw_data)
+def fetch_all_cached(interface: DatabaseInterface[EntryType]) -> list[EntryType]:
+    table_cache = get_table_cache(interface)
 
-    return raw_data
+    max_staleness = get_max_staleness(interface._db_name)
+    if max_staleness is not None:
+        entries = fetch_stale_while_revalidate(interface, table_cache, max_staleness)
+        if entries is not None:
+            return entries
+
+    return load_with_spinner(
+        table_cache,
+        interface._fetch_db,
+        EnumToLoadText.get(interface._entry_type),
+    )
+
+
+def fetch_summaries_cached(interface: DatabaseInterface) -> list:
+    return load_with_spinner(
+        get_summary_cache(interface),
+        interface._fetch_summaries,
+        EnumToLoadText.get(interface._entry_type),
+    )
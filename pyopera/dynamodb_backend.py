@@ -0,0 +1,385 @@
+import contextvars
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from pyopera.common import get_key_prefix, normalize_title
+from pyopera.create_table import (
+    INDEX_SORT_KEY,
+    KEY_PARTITION_VALUE,
+    get_enabled_indexes,
+    get_rate_limited_table,
+    get_table,
+)
+from pyopera.rate_limit import (
+    MAX_RETRIES,
+    TokenBucket,
+    backoff_delay,
+    call_with_backoff,
+    get_index_bucket,
+    get_table_buckets,
+)
+from pyopera.storage_backend import UPDATED_AT_ATTRIBUTE, ProgressCallback, UpdateConditionFailed, load_setting
+
+MAX_SCAN_WORKERS = 8
+
+MAX_BATCH_GET_SIZE = 100
+
+# maximum number of requests in a BatchWriteItem request
+BATCH_WRITE_SIZE = 25
+
+# The index (see `TableToIndexes`) answering a query filter:
+# filter -> (index name, partition key, partition key value of a filter value)
+TableToQueryIndexes: dict[str, dict[str, tuple[str, str, Callable[[Any], Any]]]] = {
+    "performances": {
+        "name": ("title-index", "normalized_title", normalize_title),
+        "stage": ("stage-index", "stage", lambda stage: stage),
+    },
+}
+
+# The index answering date ranges with one query per year: (index name, partition key)
+TableToYearIndex = {
+    "performances": ("year-index", "earliest_year"),
+}
+
+# The index with all items sorted by their time-ordered key, for "created_from": (index name, partition key)
+TableToRecentIndex = {
+    "performances": ("recent-index", "key_partition"),
+}
+
+def iter_scan_pages(
+    table,
+    bucket: Optional[TokenBucket] = None,
+    **scan_kwargs,
+) -> Iterator[tuple[list[dict], Optional[dict]]]:
+    """
+    Scan the table page by page. Yields the items of each page and the key to continue
+    the scan from (None after the last page).
+    """
+    # the client of the table resource is used since (unlike the resource) it is thread safe,
+    # like the resource it sends and returns plain python values
+    client = table.meta.client
+    kwargs = {"TableName": table.name, **scan_kwargs}
+
+    while True:
+        response = call_with_backoff(client.scan, bucket, **kwargs)
+
+        items = response.get("Items", [])
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        yield items, last_evaluated_key
+
+        # If there are no more items to fetch, break the loop
+        if last_evaluated_key is None:
+            break
+
+        kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+
+def scan_segment(
+    table,
+    segment: int = 0,
+    total_segments: int = 1,
+    bucket: Optional[TokenBucket] = None,
+    **scan_kwargs,
+) -> list[dict]:
+    if total_segments > 1:
+        scan_kwargs = {**scan_kwargs, "Segment": segment, "TotalSegments": total_segments}
+
+    return [item for items, _ in iter_scan_pages(table, bucket, **scan_kwargs) for item in items]
+
+
+def scan_table_items(
+    table,
+    total_segments: int = 1,
+    bucket: Optional[TokenBucket] = None,
+    **scan_kwargs,
+) -> list[dict]:
+    """
+    Scan the whole table. If `total_segments` is larger than one, the table is split
+    into segments which are scanned concurrently on a bounded thread pool.
+    All segments share `bucket`, so together they stay within the read capacity.
+    """
+    if total_segments <= 1:
+        return scan_segment(table, bucket=bucket, **scan_kwargs)
+
+    with ThreadPoolExecutor(max_workers=min(total_segments, MAX_SCAN_WORKERS)) as executor:
+        # the segments run in (a copy of) the context of the caller, so that their consumed capacity
+        # is added to the measurement of the caller (see `pyopera.db_metrics`)
+        contexts = [contextvars.copy_context() for _ in range(total_segments)]
+        segments = executor.map(
+            lambda segment, context: context.run(scan_segment, table, segment, total_segments, bucket, **scan_kwargs),
+            range(total_segments),
+            contexts,
+        )
+        return [item for segment_items in segments for item in segment_items]
+
+
+def batch_get_items(table, keys: Iterable[str], bucket: Optional[TokenBucket] = None) -> list[dict]:
+    """
+    Fetch the items with the given keys using BatchGetItem. Keys that do not exist are skipped.
+    """
+    client = table.meta.client
+    keys = list(keys)
+    final_items = []
+
+    for start in range(0, len(keys), MAX_BATCH_GET_SIZE):
+        request_items = {
+            table.name: {"Keys": [{"key": key} for key in keys[start : start + MAX_BATCH_GET_SIZE]]}
+        }
+
+        attempt = 0
+        while len(request_items) > 0:
+            response = call_with_backoff(client.batch_get_item, bucket, RequestItems=request_items)
+            items = response.get("Responses", {}).get(table.name, [])
+            final_items.extend(items)
+
+            # DynamoDB may not process all keys in one go (e.g. when throttled), retry the rest
+            request_items = response.get("UnprocessedKeys", {})
+            if len(request_items) > 0:
+                attempt = wait_before_retry(bucket, attempt)
+
+    return final_items
+
+
+def wait_before_retry(bucket: Optional[TokenBucket], attempt: int) -> int:
+    # unprocessed items are treated like a throttled request
+    if attempt >= MAX_RETRIES:
+        raise RuntimeError("DynamoDB did not process the batch request after repeated retries")
+
+    if bucket is not None:
+        bucket.throttled()
+
+    time.sleep(backoff_delay(attempt))
+    return attempt + 1
+
+
+def batch_write(
+    table,
+    requests: Mapping[str, dict],
+    bucket: Optional[TokenBucket] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> None:
+    """
+    Send write requests (by key) with BatchWriteItem, 25 at a time. Unprocessed requests
+    are put back at the front of the queue and sent again after a backoff. Items and keys are
+    plain python values, the client of the table resource serializes them.
+    """
+    client = table.meta.client
+    pending = deque(requests.values())
+    done = 0
+    attempt = 0
+
+    while len(pending) > 0:
+        batch = [pending.popleft() for _ in range(min(BATCH_WRITE_SIZE, len(pending)))]
+        response = call_with_backoff(client.batch_write_item, bucket, RequestItems={table.name: batch})
+
+        unprocessed = response.get("UnprocessedItems", {}).get(table.name, [])
+        done += len(batch) - len(unprocessed)
+
+        if progress is not None:
+            progress(done)
+
+        if len(unprocessed) > 0:
+            pending.extendleft(reversed(unprocessed))
+            attempt = wait_before_retry(bucket, attempt)
+        else:
+            attempt = 0
+
+
+class DynamoDBBackend:
+    """
+    Stores a table in DynamoDB.
+    """
+
+    is_local = False
+
+    def __init__(self, table_name: str, total_segments: int = 1) -> None:
+        self._table_name = table_name
+        self._total_segments = total_segments
+        # the indexes only contain items that were written with the index attributes, so queries
+        # are enabled once the indexes are created and all items are rewritten (see `pyopera.query_indexes`)
+        self._indexes = {index[0] for index in get_enabled_indexes(table_name)}
+        self.supports_query = (
+            load_setting("dynamodb_queries", "false").lower() in ("1", "true", "yes") and len(self._indexes) > 0
+        )
+
+    @property
+    def _table(self):
+        # resolved on first use, so creating a backend does not contact DynamoDB.
+        # All requests go through `call_with_backoff`, so botocore does not retry them
+        return get_rate_limited_table(self._table_name)
+
+    @property
+    def _read_bucket(self) -> Optional[TokenBucket]:
+        return get_table_buckets(get_table(self._table_name))[0]
+
+    @property
+    def _write_bucket(self) -> Optional[TokenBucket]:
+        return get_table_buckets(get_table(self._table_name))[1]
+
+    def scan_items(self) -> list[dict]:
+        return scan_table_items(self._table, self._total_segments, self._read_bucket)
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[dict], Any]]:
+        scan_kwargs = {} if start_token is None else {"ExclusiveStartKey": start_token}
+        return iter_scan_pages(self._table, self._read_bucket, **scan_kwargs)
+
+    def scan_projection(self, paths: Sequence[tuple[str, ...]]) -> list[dict]:
+        # attribute names are always passed as placeholders since many of them
+        # are reserved words (e.g. "name", "date") or contain spaces
+        placeholders: dict[str, str] = {}
+        expressions = []
+        for path in paths:
+            parts = [placeholders.setdefault(part, f"#attribute{len(placeholders)}") for part in path]
+            expressions.append(".".join(parts))
+
+        return scan_table_items(
+            self._table,
+            self._total_segments,
+            self._read_bucket,
+            ProjectionExpression=", ".join(expressions),
+            ExpressionAttributeNames={placeholder: name for name, placeholder in placeholders.items()},
+        )
+
+    def scan_versions(self) -> dict[str, Any]:
+        # only the key and the write time of each item are transferred
+        items = scan_table_items(
+            self._table,
+            self._total_segments,
+            self._read_bucket,
+            ProjectionExpression="#key, #updated_at",
+            ExpressionAttributeNames={"#key": "key", "#updated_at": UPDATED_AT_ATTRIBUTE},
+        )
+        return {item["key"]: item.get(UPDATED_AT_ATTRIBUTE) for item in items}
+
+    def get_items(self, keys: Iterable[str]) -> list[dict]:
+        return batch_get_items(self._table, keys, self._read_bucket)
+
+    def put_items(self, items: Sequence[dict], progress: Optional[ProgressCallback] = None) -> None:
+        # a later item with the same key replaces an earlier one (a batch cannot contain a key twice)
+        requests = {item["key"]: {"PutRequest": {"Item": item}} for item in items}
+        batch_write(self._table, requests, self._write_bucket, progress)
+
+    def update_item(
+        self,
+        key: str,
+        set_attributes: Mapping[str, Any],
+        remove_attributes: Sequence[str],
+        expected_attributes: Optional[Mapping[str, bool]] = None,
+    ) -> None:
+        names = {"#key": "key"}
+        values = {}
+        set_expressions = []
+        remove_expressions = []
+
+        for i, (attribute, value) in enumerate(set_attributes.items()):
+            names[f"#set{i}"] = attribute
+            values[f":set{i}"] = value
+            set_expressions.append(f"#set{i} = :set{i}")
+
+        for i, attribute in enumerate(remove_attributes):
+            names[f"#remove{i}"] = attribute
+            remove_expressions.append(f"#remove{i}")
+
+        # never create a partial item if the item was deleted in the meantime
+        conditions = ["attribute_exists(#key)"]
+        for i, (attribute, exists) in enumerate((expected_attributes or {}).items()):
+            names[f"#expected{i}"] = attribute
+            conditions.append(f"{'attribute_exists' if exists else 'attribute_not_exists'}(#expected{i})")
+
+        update_expression = ""
+        if len(set_expressions) > 0:
+            update_expression += "SET " + ", ".join(set_expressions)
+        if len(remove_expressions) > 0:
+            update_expression += " REMOVE " + ", ".join(remove_expressions)
+
+        kwargs = dict(
+            Key={"key": key},
+            UpdateExpression=update_expression.strip(),
+            ConditionExpression=" AND ".join(conditions),
+            ExpressionAttributeNames=names,
+        )
+        if len(values) > 0:
+            kwargs["ExpressionAttributeValues"] = values
+
+        try:
+            call_with_backoff(self._table.update_item, self._write_bucket, **kwargs)
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+            if expected_attributes is None or error_code != "ConditionalCheckFailedException":
+                raise
+
+            raise UpdateConditionFailed(f"Item {key} does not exist or does not have the expected attributes") from e
+
+    def delete_item(self, key: str) -> None:
+        call_with_backoff(self._table.delete_item, self._write_bucket, Key={"key": key})
+
+    def delete_items(self, keys: Sequence[str], progress: Optional[ProgressCallback] = None) -> None:
+        requests = {key: {"DeleteRequest": {"Key": {"key": key}}} for key in keys}
+        batch_write(self._table, requests, self._write_bucket, progress)
+
+    def query_items(self, **filters: Any) -> list[dict]:
+        """
+        Answer a query with one of the enabled global secondary indexes. Only the filter selecting the
+        index and the date range are applied by DynamoDB, so the items may not match the other filters.
+        The indexes only contain the keys, the matching items are read from the table with BatchGetItem.
+        """
+        date_from, date_to = filters.get("date_from"), filters.get("date_to")
+        if date_from is not None and date_to is not None:
+            date_condition = Key(INDEX_SORT_KEY).between(date_from.isoformat(), date_to.isoformat())
+        elif date_from is not None:
+            date_condition = Key(INDEX_SORT_KEY).gte(date_from.isoformat())
+        elif date_to is not None:
+            date_condition = Key(INDEX_SORT_KEY).lte(date_to.isoformat())
+        else:
+            date_condition = None
+
+        query_indexes = TableToQueryIndexes.get(self._table_name, {})
+        for field, (index_name, partition_key, to_partition_value) in query_indexes.items():
+            if field in filters and index_name in self._indexes:
+                partition_condition = Key(partition_key).eq(to_partition_value(filters[field]))
+                return self._query_index(index_name, partition_condition, date_condition)
+
+        recent_index = TableToRecentIndex.get(self._table_name)
+        if recent_index is not None and recent_index[0] in self._indexes and filters.get("created_from") is not None:
+            index_name, partition_key = recent_index
+            key_condition = Key(partition_key).eq(KEY_PARTITION_VALUE) & Key("key").gte(
+                get_key_prefix(filters["created_from"])
+            )
+            return self._query_index(index_name, key_condition, None)
+
+        year_index = TableToYearIndex.get(self._table_name)
+        if year_index is not None and year_index[0] in self._indexes and date_from is not None and date_to is not None:
+            index_name, partition_key = year_index
+            return [
+                item
+                for year in range(date_from.year, date_to.year + 1)
+                for item in self._query_index(index_name, Key(partition_key).eq(year), date_condition)
+            ]
+
+        raise NotImplementedError(f"No index of {self._table_name} answers a query by {', '.join(filters)}")
+
+    def _query_index(self, index_name: str, key_condition, date_condition) -> list[dict]:
+        if date_condition is not None:
+            key_condition = key_condition & date_condition
+
+        kwargs: dict[str, Any] = dict(IndexName=index_name, KeyConditionExpression=key_condition)
+
+        # the index has its own read capacity
+        bucket = get_index_bucket(get_table(self._table_name), index_name)
+
+        items = []
+        while True:
+            response = call_with_backoff(self._table.query, bucket, **kwargs)
+            items.extend(response.get("Items", []))
+
+            if response.get("LastEvaluatedKey") is None:
+                break
+
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        return self.get_items(item["key"] for item in items)
@@ -13,14 +13,15 @@ from pyopera.common import (
     is_performance_instance,
     normalize_composers,
 )
-from pyopera.deta_base import DatabaseInterface
+from pyopera.deta_base import get_interface
 from pyopera.streamlit_common import (
     format_title,
+    load_current_performance,
     load_db,
     write_cast_and_leading_team,
 )
 
-BASE_INTERFACE = DatabaseInterface(Performance)
+BASE_INTERFACE = get_interface(Performance)
 
 
 def send_new_performance(new_performance: Union[Performance, dict]) -> None:
@@ -30,6 +31,10 @@ def send_new_performance(new_performance: Union[Performance, dict]) -> None:
     BASE_INTERFACE.put_db(new_performance)
 
 
+def update_performance(old_performance: dict, new_performance: Performance) -> None:
+    BASE_INTERFACE.update_db(Performance(**old_performance), new_performance)
+
+
 def delete_performance_by_key(key: str) -> None:
     return BASE_INTERFACE.delete_item_db(key)
 
@@ -52,7 +57,7 @@ def run() -> None:
             ]
 
         else:
-            db_to_use = [None] + db
+            db_to_use = [None, *db]
 
         if len(db_to_use) < 1:
             st.error("No entries were found")
@@ -67,7 +72,7 @@ def run() -> None:
 
         # if isinstance(entry_to_update_raw, Performance):
         if is_performance_instance(entry_to_update_raw):
-            entry_to_update = entry_to_update_raw.model_dump()
+            entry_to_update = load_current_performance(entry_to_update_raw.key).model_dump()
         else:
             entry_to_update = {}
 
@@ -409,13 +414,13 @@ def remove_person_from_performance(remove: tuple[str, str]):
 
 
 def toggle_archive_entry(entry_to_update):
-    if entry_to_update.get("archived", False):
-        entry_to_update["archived"] = False
+    is_archived = entry_to_update.get("archived", False)
+    BASE_INTERFACE.update_fields(Performance(**entry_to_update), archived=not is_archived)
+
+    if is_archived:
         st.toast("Unarchived entry", icon=":material/undo:")
     else:
-        entry_to_update["archived"] = True
         st.toast("Archived entry", icon=":material/archive:")
-    send_new_performance(entry_to_update)
 
 
 def do_deletion(entry_to_update, user_text_confirmation):
@@ -484,19 +489,17 @@ def do_submission(
             visit_index=visit_index if visit_index != "" else None,
         )
 
+        if update_existing:
+            # keep the key, so that only the changed fields have to be sent
+            final_dict["key"] = entry_to_update["key"]
+
         try:
             final_data = Performance(**final_dict)
 
-            final_data_dict = final_data.model_dump()
-
-            if update_existing and entry_to_update["key"] != final_data_dict["key"]:
-                delete_performance_by_key(entry_to_update["key"])
-            try:
-                send_new_performance(final_data_dict)
-            except Exception:
-                if entry_to_update != {}:
-                    send_new_performance(entry_to_update)
-                raise
+            if update_existing:
+                update_performance(entry_to_update, final_data)
+            else:
+                send_new_performance(final_data)
 
             # clear the leading team and cast
             clear_cast_leading_team_from_session_state()
@@ -50,7 +50,7 @@ def run():
     title_element = st.empty()
 
     venues_db_list = load_db_venues(list_of_entries=True)
-    assert isinstance(venues_db_list, list)
+    assert not isinstance(venues_db_list, dict)
 
     if len(venues_db_list) > 0 and st.toggle("Registered Venue "):
         venue = st.selectbox(
@@ -2,7 +2,7 @@ import streamlit as st
 from pydantic import ValidationError
 
 from pyopera.common import WorkYearEntryModel, normalize_composers
-from pyopera.deta_base import DatabaseInterface
+from pyopera.deta_base import get_interface
 from pyopera.streamlit_common import (
     load_db,
     load_db_works_year,
@@ -36,8 +36,7 @@ def extract_all_existing_composers_and_titles() -> dict:
 
 
 def delete_from_db(to_delete: str) -> None:
-    assert isinstance(st.session_state.interface, DatabaseInterface)
-    st.session_state.interface.delete_item_db(to_delete)
+    INTERFACE.delete_item_db(to_delete)
     st.toast("Deleted entry", icon=":material/delete:")
 
 
@@ -59,7 +58,7 @@ def upload_to_db(**kwargs) -> None:
     st.toast("Updated database", icon=":material/cloud_sync:")
 
 
-INTERFACE = DatabaseInterface(WorkYearEntryModel)
+INTERFACE = get_interface(WorkYearEntryModel)
 
 
 def run() -> None:
@@ -3,11 +3,7 @@ from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 from typing import Sequence
 
-import pandas as pd
-import plotly.express as px
-import reverse_geocoder as rg
 import streamlit as st
-from unidecode import unidecode
 
 from pyopera.common import (
     Performance,
@@ -22,6 +18,10 @@ from pyopera.streamlit_common import load_db, load_db_venues
 
 
 def run_expanded_stats():
+    # imported here, they take long to import and are only needed when the numbers are shown
+    import pandas as pd
+    import plotly.express as px
+
     performances = load_db()
     composer_stats_performances = [
         performance
@@ -1,32 +1,66 @@
+"""
+Images rendered from text. They are rendered once and stored on disk, named after a hash of
+the text, the font and the dimensions, so later processes read the file instead of loading
+the font with Pillow. Render them ahead of time with
+
+    python -m pyopera.generate_logo
+"""
+
+import hashlib
+import os
+import tempfile
+from functools import cache
 from io import BytesIO
 from pathlib import Path
+from typing import NamedTuple, Optional
 
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont
 
+from pyopera.storage_backend import load_setting
+
+
+class TextImageSpec(NamedTuple):
+    text: str
+    font_size: int
+    width: int
+    height: int
 
-# Cached function to generate the logo with a transparent background
-@st.cache_resource
-def generate_text_image(
-    text: str,
-    font_path: Path,
-    font_size: int = 50,
-    width: int = 400,
-    height: int = 200,
-) -> BytesIO:
-    font_path = Path(font_path)
 
-    image = Image.new(
-        "RGBA", (width, height), (255, 255, 255, 0)
-    )  # (R, G, B, A) - A=0 means fully transparent
+# every generated image of the app, add size variants or icons here so they are rendered ahead of time too
+ImageNameToSpec: dict[str, TextImageSpec] = {
+    "logo": TextImageSpec(text="OperArchive", font_size=100, width=550, height=160),
+}
+
+
+def load_font_path():
+    return Path(__file__).parent.parent / "assets" / "SourceSans3-Bold.ttf"
+
+
+def get_image_cache_dir() -> Path:
+    default_dir = Path(tempfile.gettempdir()) / "pyopera_images"
+    return Path(load_setting("image_cache_dir", str(default_dir)))
+
+
+@cache
+def get_font_hash(font_path: Path) -> str:
+    return hashlib.sha1(Path(font_path).read_bytes()).hexdigest()
+
+
+def get_text_image_path(text: str, font_path: Path, font_size: int, width: int, height: int) -> Path:
+    key = "\0".join([text, get_font_hash(font_path), str(font_size), str(width), str(height)])
+    return get_image_cache_dir() / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.png"
+
+
+def render_text_image(text: str, font_path: Path, font_size: int, width: int, height: int) -> bytes:
+    """
+    Render `text` centered in black on a transparent background, as a PNG.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGBA", (width, height), (255, 255, 255, 0))  # (R, G, B, A) - A=0 means fully transparent
     draw = ImageDraw.Draw(image)
 
-    # Load the font
-    try:
-        font = ImageFont.truetype(font_path, font_size)
-    except IOError:
-        st.error("Font not found. Please check the font path.")
-        return None
+    font = ImageFont.truetype(font_path, font_size)
 
     # Calculate text size using textbbox
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -35,32 +69,68 @@ def generate_text_image(
     # Position the text in the center
     text_position = ((width - text_width) / 2, (height - text_height) / 2)
 
-    # Draw the text in black (or any other color you prefer)
     draw.text(text_position, text, font=font, fill="black")
 
-    # Save the image to a BytesIO object
-    logo_bytes = BytesIO()
-    image.save(logo_bytes, format="PNG")
-    logo_bytes.seek(0)
+    image_bytes = BytesIO()
+    image.save(image_bytes, format="PNG")
 
-    return logo_bytes
+    return image_bytes.getvalue()
 
 
-def load_font_path():
-    return Path(__file__).parent.parent / "assets" / "SourceSans3-Bold.ttf"
+def ensure_text_image(text: str, font_path: Path, font_size: int, width: int, height: int) -> Path:
+    """
+    The path of the rendered image, rendering it first if it is not on disk yet.
+    """
+    path = get_text_image_path(text, font_path, font_size, width, height)
+    if path.exists():
+        return path
+
+    image = render_text_image(text, font_path, font_size, width, height)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, delete=False) as file:
+        file.write(image)
+    os.replace(file.name, path)
+
+    return path
+
+
+@st.cache_resource
+def generate_text_image(
+    text: str,
+    font_path: Path,
+    font_size: int = 50,
+    width: int = 400,
+    height: int = 200,
+) -> Optional[BytesIO]:
+    font_path = Path(font_path)
+
+    try:
+        path = ensure_text_image(text, font_path, font_size, width, height)
+        return BytesIO(path.read_bytes())
+    except FileNotFoundError:
+        st.error("Font not found. Please check the font path.")
+        return None
+    except OSError as e:
+        # e.g. the cache directory is not writable, render it in memory every time
+        print(f"Could not store the rendered image of {text!r}: {e}")
+        return BytesIO(render_text_image(text, font_path, font_size, width, height))
+
+
+def generate_image(name: str) -> Optional[BytesIO]:
+    spec = ImageNameToSpec[name]
+    return generate_text_image(font_path=load_font_path(), **spec._asdict())
+
+
+def generate_logo() -> Optional[BytesIO]:
+    return generate_image("logo")
 
 
-def generate_logo() -> BytesIO:
-    # Load the font path
-    font_path = load_font_path()
+def main() -> None:
+    for name, spec in ImageNameToSpec.items():
+        path = ensure_text_image(font_path=load_font_path(), **spec._asdict())
+        print(f"{name}: {path}")
 
-    # Generate the logo with the specified text and font
-    logo_bytes = generate_text_image(
-        text="OperArchive",
-        font_path=font_path,
-        font_size=100,  # Adjust this value as needed
-        width=550,  # Adjust this value as needed
-        height=160,  # Adjust this value as needed
-    )
 
-    return logo_bytes
+if __name__ == "__main__":
+    main()
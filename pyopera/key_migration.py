@@ -0,0 +1,107 @@
+"""
+Give the stored performances time-ordered keys (see `create_key_for_visited_performance_v4`).
+Performances created before the time-ordered keys get the time of their date as their key prefix,
+visit groups that use the key of one of their performances as their id keep pointing to it.
+
+    python -m pyopera.key_migration report
+    python -m pyopera.key_migration migrate
+
+Run "python -m pyopera.query_indexes backfill performances" before, so that all items are
+part of the index that is sorted by key. Migrating again only rewrites the remaining old keys,
+keys without the format marker (`TIME_ORDERED_KEY_MARKER`) count as old ones.
+"""
+
+import argparse
+import hashlib
+from datetime import datetime, time, timezone
+
+from pyopera.common import TIME_ORDERED_KEY_MARKER, Performance, get_key_prefix, is_time_ordered_key
+from pyopera.deta_base import DEFAULT_DATE, get_interface
+
+
+def get_migrated_key(performance: Performance) -> str:
+    """
+    The new key of a performance with an old (random) key. The same old key always gives the same
+    new key, so that an interrupted migration can be run again. Its time is the date of the
+    performance, performances before 1970 all get the prefix of 1970.
+    """
+    earliest_date = DEFAULT_DATE if performance.date is None else performance.date.earliest_date
+    prefix = get_key_prefix(datetime.combine(earliest_date, time(), timezone.utc)) + TIME_ORDERED_KEY_MARKER
+
+    return prefix + hashlib.sha1(performance.key.encode()).hexdigest()[: 40 - len(prefix)]
+
+
+def plan_migration(performances: list[Performance]) -> list[tuple[Performance, Performance]]:
+    """
+    The (old, new) performances that have to be written.
+    """
+    new_keys = {
+        performance.key: get_migrated_key(performance)
+        for performance in performances
+        if not is_time_ordered_key(performance.key)
+    }
+
+    changes = []
+    for performance in performances:
+        new_key = new_keys.get(performance.key, performance.key)
+        new_visit_index = new_keys.get(performance.visit_index, performance.visit_index)
+
+        if new_key != performance.key or new_visit_index != performance.visit_index:
+            migrated = Performance(**{**performance.model_dump(), "key": new_key, "visit_index": new_visit_index})
+            changes.append((performance, migrated))
+
+    return changes
+
+
+def report() -> None:
+    interface = get_interface(Performance)
+    performances = list(interface.fetch_db())
+    changes = plan_migration(performances)
+
+    rekeyed = sum(1 for old, new in changes if old.key != new.key)
+    regrouped = sum(1 for old, new in changes if old.visit_index != new.visit_index)
+    print(f"Performances: {len(performances)}")
+    print(f"Keys to rewrite: {rekeyed}")
+    print(f"Visit groups to point to a rewritten key: {regrouped}")
+
+
+def migrate() -> None:
+    """
+    Write the performances with their new keys, then delete the ones with the old keys. A performance
+    is never missing in between, it exists twice until the old one is deleted.
+    """
+    interface = get_interface(Performance)
+    changes = plan_migration(list(interface.fetch_db()))
+
+    if len(changes) == 0:
+        print("Done, all performances have time-ordered keys")
+        return
+
+    interface.put_many(
+        [new for _, new in changes],
+        progress=lambda done: print(f"Wrote {done}/{len(changes)} performances", flush=True),
+    )
+
+    old_keys = [old.key for old, new in changes if old.key != new.key]
+    interface.delete_many(
+        old_keys,
+        progress=lambda done: print(f"Deleted {done}/{len(old_keys)} old keys", flush=True),
+    )
+
+    regrouped = len(changes) - len(old_keys)
+    print(f"Done, rewrote {len(old_keys)} keys and the visit group of {regrouped} other performances")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "migrate"])
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report()
+    else:
+        migrate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import zlib
+from decimal import Decimal
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from pyopera.storage_backend import encode_json_value, load_setting
+
+# bump this if the layout of the snapshot file itself changes
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+@cache
+def get_schema_version(entry_type: type[BaseModel]) -> str:
+    """
+    A short hash of the json schema of the model. Changes whenever the shape of the model changes.
+    """
+    schema_str = json.dumps(entry_type.model_json_schema(), sort_keys=True)
+    return hashlib.sha1(schema_str.encode()).hexdigest()[:12]
+
+
+def get_snapshot_dir() -> Path:
+    default_dir = Path(tempfile.gettempdir()) / "pyopera_snapshots"
+    return Path(load_setting("snapshot_dir", str(default_dir)))
+
+
+def get_snapshot_path(table_name: str) -> Path:
+    return get_snapshot_dir() / f"{table_name}.snapshot"
+
+
+def ensure_private_dir(directory: Path) -> None:
+    """
+    Create `directory` so that only the current user can access it. Raises a PermissionError
+    if it exists and belongs to another user, since they could replace the files in it.
+    """
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    # there is no owner to check on Windows
+    if not hasattr(os, "getuid"):
+        return
+
+    status = directory.stat()
+    if status.st_uid != os.getuid():
+        raise PermissionError(f"{directory} belongs to another user")
+
+    if stat.S_IMODE(status.st_mode) != 0o700:
+        directory.chmod(0o700)
+
+
+def load_snapshot(table_name: str, entry_type: type[BaseModel]) -> Optional[tuple[list[dict], Optional[tuple[int, int]]]]:
+    """
+    Load the snapshot of a table. Returns the raw items and the version of the table (generation
+    and checksum, see `pyopera.change_log.TableVersion`) the snapshot was taken at, or None if
+    there is no usable snapshot.
+    """
+    path = get_snapshot_path(table_name)
+
+    try:
+        ensure_private_dir(path.parent)
+        # numbers are read back as decimals, like DynamoDB returns them
+        payload = json.loads(zlib.decompress(path.read_bytes()), parse_float=Decimal)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    if (
+        payload.get("format_version") != SNAPSHOT_FORMAT_VERSION
+        or payload.get("schema_version") != get_schema_version(entry_type)
+    ):
+        # the model changed shape, the snapshot cannot be trusted anymore
+        path.unlink(missing_ok=True)
+        return None
+
+    table_version = payload.get("table_version")
+    return payload["items"], None if table_version is None else tuple(table_version)
+
+
+def write_snapshot(
+    table_name: str,
+    entry_type: type[BaseModel],
+    items: list[dict],
+    table_version: Optional[tuple[int, int]] = None,
+) -> None:
+    """
+    Atomically replace the snapshot of a table. `table_version` is the version of the table
+    read before the items were, if it is known.
+    """
+    path = get_snapshot_path(table_name)
+    payload = dict(
+        format_version=SNAPSHOT_FORMAT_VERSION,
+        schema_version=get_schema_version(entry_type),
+        items=items,
+        table_version=None if table_version is None else list(table_version),
+    )
+    data = zlib.compress(json.dumps(payload, default=encode_json_value).encode())
+
+    try:
+        ensure_private_dir(path.parent)
+        # write to a temporary file in the same directory and then rename it,
+        # readers will either see the old or the new snapshot, never a partial one
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, delete=False) as file:
+            file.write(data)
+        os.replace(file.name, path)
+    except OSError as e:
+        print(f"Could not write snapshot {path}: {e}")
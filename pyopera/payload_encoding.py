@@ -0,0 +1,97 @@
+"""
+Optional compressed storage of the large fields of an item (the cast and leading team of a performance).
+
+The fields are stored as a single zlib compressed json document in a binary attribute. The parts
+of them that summaries read with a projection (e.g. the conductor) are also kept uncompressed, so
+that loading summaries does not need the compressed payload. Items without the payload attribute
+(written before compression was enabled) are read as they are.
+"""
+
+import json
+import math
+import zlib
+from decimal import Decimal
+from typing import Any, Mapping, Sequence
+
+PAYLOAD_ATTRIBUTE = "payload"
+
+COMPRESSION_LEVEL = 9
+
+# DynamoDB charges one read capacity unit per 4 KB for strongly consistent reads, scans are
+# eventually consistent by default and cost half of that
+READ_UNIT_BYTES = 4096
+
+
+def _payload_bytes(value: Any) -> bytes:
+    # boto3 returns binary attributes wrapped in `Binary`
+    return bytes(getattr(value, "value", value))
+
+
+def compress_payload(item: dict, fields: Sequence[str], kept_paths: Sequence[tuple[str, ...]] = ()) -> dict:
+    """
+    Move `fields` of the item into the compressed payload attribute. For the paths in `kept_paths`
+    that point into one of the fields (e.g. ("leading_team", "Inszenierung")) the value is also
+    kept uncompressed.
+    """
+    payload = {field: item[field] for field in fields if field in item}
+    compressed = {key: value for key, value in item.items() if key not in payload}
+
+    for field, *rest in kept_paths:
+        if field not in payload or len(rest) != 1 or rest[0] not in payload[field]:
+            continue
+
+        compressed.setdefault(field, {})[rest[0]] = payload[field][rest[0]]
+
+    payload_json = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    compressed[PAYLOAD_ATTRIBUTE] = zlib.compress(payload_json.encode(), COMPRESSION_LEVEL)
+
+    return compressed
+
+
+def decompress_payload(item: Mapping[str, Any]) -> dict:
+    """
+    The item with its payload attribute (if any) expanded back into the original fields.
+    """
+    if PAYLOAD_ATTRIBUTE not in item:
+        return dict(item)
+
+    decompressed = {key: value for key, value in item.items() if key != PAYLOAD_ATTRIBUTE}
+    decompressed.update(json.loads(zlib.decompress(_payload_bytes(item[PAYLOAD_ATTRIBUTE]))))
+
+    return decompressed
+
+
+def is_compressed(item: Mapping[str, Any]) -> bool:
+    return PAYLOAD_ATTRIBUTE in item
+
+
+def attribute_value_size(value: Any) -> int:
+    """
+    The size of a value as DynamoDB counts it for capacity and item size limits.
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+
+    if isinstance(value, str):
+        return len(value.encode())
+
+    if isinstance(value, (int, float, Decimal)):
+        digits = len(str(abs(value)).replace(".", "").lstrip("0")) or 1
+        return math.ceil(digits / 2) + 1
+
+    if isinstance(value, Mapping):
+        return 3 + sum(len(str(key).encode()) + attribute_value_size(element) + 1 for key, element in value.items())
+
+    if isinstance(value, (list, tuple, set)):
+        return 3 + sum(attribute_value_size(element) + 1 for element in value)
+
+    return len(_payload_bytes(value))
+
+
+def item_size(item: Mapping[str, Any]) -> int:
+    return sum(len(key.encode()) + attribute_value_size(value) for key, value in item.items())
+
+
+def scan_read_units(item_sizes: Sequence[int]) -> float:
+    # a scan is charged by the total size of the items it reads, not per item
+    return math.ceil(sum(item_sizes) / READ_UNIT_BYTES) / 2
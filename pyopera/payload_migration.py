@@ -0,0 +1,83 @@
+"""
+Migrate the stored performances to the storage encoding selected with the "compress_payloads"
+setting, or report how much storage and read capacity the compressed encoding saves.
+
+    python -m pyopera.payload_migration report
+    python -m pyopera.payload_migration migrate
+"""
+
+import argparse
+
+from pyopera.common import Performance
+from pyopera.deta_base import EnumToCompressedFields, EnumToSummary, get_interface
+from pyopera.payload_encoding import (
+    compress_payload,
+    decompress_payload,
+    is_compressed,
+    item_size,
+    scan_read_units,
+)
+
+
+def report() -> None:
+    """
+    Compare the size of every stored item in both encodings.
+    """
+    interface = get_interface(Performance)
+    fields = EnumToCompressedFields[Performance]
+    _, summary_paths = EnumToSummary[Performance]
+
+    plain_sizes = []
+    compressed_sizes = []
+    for items, _ in interface._backend.iter_pages():
+        for item in items:
+            plain = decompress_payload(item)
+            plain_sizes.append(item_size(plain))
+            compressed_sizes.append(item_size(compress_payload(plain, fields, summary_paths)))
+
+    if len(plain_sizes) == 0:
+        print("The table is empty")
+        return
+
+    plain_total, compressed_total = sum(plain_sizes), sum(compressed_sizes)
+    print(f"Items: {len(plain_sizes)}")
+    print(f"Uncompressed: {plain_total} bytes, {plain_total / len(plain_sizes):.0f} bytes per item")
+    print(f"Compressed: {compressed_total} bytes, {compressed_total / len(compressed_sizes):.0f} bytes per item")
+    print(f"Saved: {1 - compressed_total / plain_total:.1%}")
+    print(
+        f"Read capacity of a full scan: {scan_read_units(plain_sizes)} RCU uncompressed, "
+        f"{scan_read_units(compressed_sizes)} RCU compressed"
+    )
+
+
+def migrate() -> None:
+    """
+    Rewrite every item that is not stored in the selected encoding.
+    """
+    interface = get_interface(Performance)
+    compress = interface._compress_payloads
+
+    rewritten = 0
+    for items, _ in interface._backend.iter_pages():
+        to_rewrite = [item for item in items if is_compressed(item) != compress]
+        interface.put_many(interface._validate_items(to_rewrite))
+
+        rewritten += len(to_rewrite)
+        print(f"Rewrote {rewritten} entries", flush=True)
+
+    print(f"Done, all entries are stored {'compressed' if compress else 'uncompressed'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "migrate"])
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report()
+    else:
+        migrate()
+
+
+if __name__ == "__main__":
+    main()
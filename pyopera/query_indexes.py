@@ -0,0 +1,67 @@
+"""
+Set up the secondary indexes used by `DatabaseInterface.query` on an existing DynamoDB table.
+
+    python -m pyopera.query_indexes create performances
+    python -m pyopera.query_indexes backfill performances
+
+The indexes are opt-in, list the ones to use in the "dynamodb_indexes" setting (e.g.
+"stage-index,year-index"), each one costs its own provisioned capacity (see `TableToIndexes`).
+"create" adds the enabled indexes the table does not have yet, "backfill" rewrites the items
+that were written before the index attributes existed. Afterwards queries are enabled with the
+"dynamodb_queries" setting.
+
+    python -m pyopera.query_indexes recreate performances
+
+"recreate" deletes the indexes that are not enabled anymore and replaces the ones that were created
+with another projection (e.g. the whole items), disable the "dynamodb_queries" setting while it runs.
+"""
+
+import argparse
+
+from pyopera.create_table import TableToIndexes, create_missing_indexes, delete_outdated_indexes
+from pyopera.deta_base import DatabaseName, EnumToIndexAttributes, EnumToModel, get_interface
+
+
+def backfill(db_name: DatabaseName) -> int:
+    """
+    Rewrite every item that is missing one of its index attributes. Returns the number of rewritten items.
+    """
+    interface = get_interface(EnumToModel[db_name])
+    index_attributes = EnumToIndexAttributes[interface._entry_type]
+
+    rewritten = 0
+    for items, _ in interface._backend.iter_pages():
+        entries = interface._validate_items(items)
+        to_rewrite = [
+            entry
+            for item, entry in zip(items, entries)
+            if any(item.get(attribute) != value for attribute, value in index_attributes(entry).items())
+        ]
+        interface.put_many(to_rewrite)
+
+        rewritten += len(to_rewrite)
+        print(f"Rewrote {rewritten} entries", flush=True)
+
+    return rewritten
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["create", "backfill", "recreate"])
+    parser.add_argument("table", choices=list(TableToIndexes))
+    args = parser.parse_args()
+
+    if args.command == "create":
+        created = create_missing_indexes(args.table)
+        print(f"Done, created {len(created)} indexes")
+    elif args.command == "recreate":
+        deleted = delete_outdated_indexes(args.table)
+        create_missing_indexes(args.table)
+        print(f"Done, recreated {len(deleted)} indexes")
+    else:
+        rewritten = backfill(DatabaseName(args.table))
+        print(f"Done, rewrote {rewritten} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from botocore.exceptions import ClientError
+
+from pyopera.db_metrics import add_consumed_capacity
+
+# Error codes DynamoDB answers with when a request exceeds the capacity of a table
+THROTTLING_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+
+MAX_RETRIES = 10
+BASE_BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 20.0
+
+# After throttling the rate is halved (but not below this fraction of the provisioned capacity),
+# every successful request raises it again by this fraction of the provisioned capacity
+MIN_RATE_FRACTION = 0.1
+RATE_INCREASE_FRACTION = 0.05
+
+# Like DynamoDB (which retains up to five minutes of unused capacity as burst capacity), the bucket
+# saves up this many seconds worth of capacity. A large page is paid from it instead of being waited for.
+BURST_SECONDS = 300.0
+
+
+class TokenBucket:
+    """
+    Limits the capacity units consumed per second by all threads using a table.
+
+    Requests wait until the bucket is not empty and pay for the capacity they actually consumed
+    (as reported by DynamoDB) afterwards, so the bucket can go into debt after a large page.
+    The rate adapts to throttling, it is halved whenever a request is throttled and slowly
+    raised again up to the provisioned capacity. Up to `burst_seconds` of unused capacity is saved up.
+    """
+
+    def __init__(self, capacity_per_second: float, burst_seconds: float = BURST_SECONDS) -> None:
+        self._ceiling = capacity_per_second
+        self._rate = capacity_per_second
+        self._burst_seconds = burst_seconds
+        self._tokens = capacity_per_second * burst_seconds
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._rate * self._burst_seconds, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens > 0:
+                    return
+
+                delay = -self._tokens / self._rate + 0.001
+
+            time.sleep(delay)
+
+    def consume(self, units: float) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens -= units
+            self._rate = min(self._ceiling, self._rate + self._ceiling * RATE_INCREASE_FRACTION)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = max(self._ceiling * MIN_RATE_FRACTION, self._rate / 2)
+            # the burst capacity of DynamoDB is used up as well
+            self._tokens = min(self._tokens, 0.0)
+
+
+def backoff_delay(attempt: int) -> float:
+    # exponential backoff with full jitter, so that retrying threads do not stay in lockstep
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt))
+
+
+def consumed_capacity(response: dict) -> float:
+    consumed = response.get("ConsumedCapacity", [])
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+
+    return sum(float(entry.get("CapacityUnits", 0.0)) for entry in consumed)
+
+
+def call_with_backoff(operation: Callable[..., dict], bucket: Optional[TokenBucket], **kwargs: Any) -> dict:
+    """
+    Call a DynamoDB operation, waiting for capacity in `bucket` (if any) and retrying
+    throttled requests with exponential backoff.
+    """
+    attempt = 0
+    while True:
+        if bucket is not None:
+            bucket.wait()
+
+        try:
+            response = operation(ReturnConsumedCapacity="TOTAL", **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in THROTTLING_ERROR_CODES or attempt >= MAX_RETRIES:
+                raise
+
+            if bucket is not None:
+                bucket.throttled()
+
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        units = consumed_capacity(response)
+        add_consumed_capacity(units)
+        if bucket is not None:
+            bucket.consume(units)
+
+        return response
+
+
+_buckets_lock = threading.Lock()
+_buckets: dict[str, tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+_index_buckets: dict[tuple[str, str], Optional[TokenBucket]] = {}
+
+
+def get_table_buckets(table) -> tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+    """
+    The shared read and write buckets of a table, sized to its provisioned capacity.
+    Tables in on demand mode (without provisioned capacity) are not limited.
+    """
+    with _buckets_lock:
+        buckets = _buckets.get(table.name)
+        if buckets is None:
+            throughput = table.provisioned_throughput or {}
+            read_capacity = throughput.get("ReadCapacityUnits", 0)
+            write_capacity = throughput.get("WriteCapacityUnits", 0)
+
+            buckets = (
+                TokenBucket(read_capacity) if read_capacity > 0 else None,
+                TokenBucket(write_capacity) if write_capacity > 0 else None,
+            )
+            _buckets[table.name] = buckets
+
+        return buckets
+
+
+def get_index_bucket(table, index_name: str) -> Optional[TokenBucket]:
+    """
+    The shared read bucket of a global secondary index, which has its own provisioned capacity.
+    """
+    with _buckets_lock:
+        key = (table.name, index_name)
+        if key not in _index_buckets:
+            index = next(
+                (index for index in table.global_secondary_indexes or [] if index["IndexName"] == index_name),
+                {},
+            )
+            read_capacity = index.get("ProvisionedThroughput", {}).get("ReadCapacityUnits", 0)
+            _index_buckets[key] = TokenBucket(read_capacity) if read_capacity > 0 else None
+
+        return _index_buckets[key]
@@ -0,0 +1,534 @@
+"""
+A read-only, column oriented copy of a table in a memory mapped file, shared by all
+server processes on a machine.
+
+Every column is stored as a flat array (strings as one utf-8 blob plus offsets), so attaching
+to a snapshot only maps the file, the operating system shares its pages between processes.
+Entries are built from a row when they are first accessed. Every published snapshot has a unique
+token, a pointer file names the current one and is replaced atomically, so readers either see the
+old or the new snapshot. Files of old snapshots stay valid for processes that still have them mapped.
+
+Writes are appended to a delta file next to the snapshot (one json change per line) and applied by
+every reader on top of the mapped columns. Once the delta is large, the writer that notices folds it
+into a new snapshot. All writers of a table hold a lock file (with `fcntl`) while they write.
+"""
+
+import copy
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+from pyopera.local_snapshot import ensure_private_dir
+from pyopera.storage_backend import encode_json_value, load_setting
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, a single server process is assumed there
+    fcntl = None
+
+MAGIC = b"PYOCOLS1"
+
+# (column name, kind) of the tables that can be shared. "str" columns hold strings, "json" columns
+# any json value, "bool" and "int" columns are numeric arrays that can be read without building rows.
+TableToSharedColumns: dict[str, list[tuple[str, str]]] = {
+    "performances": [
+        ("key", "str"),
+        ("name", "str"),
+        ("stage", "str"),
+        ("production", "str"),
+        ("comments", "str"),
+        ("composers", "json"),
+        ("date", "json"),
+        ("cast", "json"),
+        ("leading_team", "json"),
+        ("day_index", "json"),
+        ("visit_index", "json"),
+        ("is_concertante", "bool"),
+        ("archived", "bool"),
+    ],
+}
+
+# numeric columns derived from the items, not part of the rows
+TableToDerivedColumns: dict[str, dict[str, Callable[[Mapping], int]]] = {
+    "performances": {
+        "earliest_ordinal": lambda item: (
+            0 if item.get("date") is None else date.fromisoformat(item["date"]["earliest_date"]).toordinal()
+        ),
+    },
+}
+
+ARRAY_TYPECODES = {"bool": "B", "int": "q", "offsets": "Q"}
+
+ATTACH_ATTEMPTS = 3
+
+# The delta is folded into a new snapshot once it is larger than this fraction of the snapshot file
+MAX_DELTA_FRACTION = 0.1
+
+
+def get_shared_dir() -> Path:
+    default_dir = Path(tempfile.gettempdir()) / "pyopera_shared"
+    return Path(load_setting("shared_snapshot_dir", str(default_dir)))
+
+
+def get_pointer_path(table_name: str) -> Path:
+    return get_shared_dir() / f"{table_name}.current"
+
+
+def get_lock_path(table_name: str) -> Path:
+    return get_shared_dir() / f"{table_name}.lock"
+
+
+def get_columns_path(table_name: str, token: str) -> Path:
+    return get_shared_dir() / f"{table_name}.{token}.columns"
+
+
+def get_delta_path(table_name: str, token: str) -> Path:
+    return get_shared_dir() / f"{table_name}.{token}.delta"
+
+
+def read_current_token(table_name: str) -> Optional[str]:
+    try:
+        return get_pointer_path(table_name).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def publish_lock(table_name: str) -> Iterator[None]:
+    """
+    Held by every process that writes the shared snapshot of a table.
+    """
+    ensure_private_dir(get_shared_dir())
+
+    with open(get_lock_path(table_name), "a") as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _encode_strings(values: Sequence[str]) -> tuple[bytes, bytes]:
+    blob = bytearray()
+    offsets = array(ARRAY_TYPECODES["offsets"], [0])
+    for value in values:
+        blob += value.encode()
+        offsets.append(len(blob))
+
+    return offsets.tobytes(), bytes(blob)
+
+
+def _encode_column(kind: str, values: Sequence[Any]) -> list[bytes]:
+    if kind == "str":
+        return list(_encode_strings(values))
+
+    if kind == "json":
+        return list(_encode_strings([json.dumps(value, default=encode_json_value) for value in values]))
+
+    return [array(ARRAY_TYPECODES[kind], [int(value) for value in values]).tobytes()]
+
+
+def encode_table(table_name: str, token: str, items: Sequence[Mapping], metadata: Mapping[str, Any]) -> bytes:
+    """
+    Lay out the items of a table in columns. The header records where every buffer starts.
+    """
+    columns = [(name, kind, [item.get(name) for item in items]) for name, kind in TableToSharedColumns[table_name]]
+    columns.extend(
+        (name, "int", [derive(item) for item in items])
+        for name, derive in TableToDerivedColumns.get(table_name, {}).items()
+    )
+
+    buffers = [(name, kind, _encode_column(kind, values)) for name, kind, values in columns]
+
+    # buffers are aligned to 8 bytes so that they can be cast to arrays without copying
+    layout = {}
+    position = 0
+    for name, kind, column_buffers in buffers:
+        spans = []
+        for buffer in column_buffers:
+            spans.append((position, len(buffer)))
+            position += len(buffer) + (-len(buffer) % 8)
+        layout[name] = dict(kind=kind, spans=spans)
+
+    header = json.dumps(dict(token=token, rows=len(items), metadata=metadata, columns=layout)).encode()
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+    data_start = len(MAGIC) + 8 + len(header)
+
+    data = bytearray(MAGIC + struct.pack("<Q", len(header)) + header)
+    for _, _, column_buffers in buffers:
+        for buffer in column_buffers:
+            data += buffer + b"\0" * (-len(buffer) % 8)
+
+    assert len(data) == data_start + position
+    return bytes(data)
+
+
+class ColumnarSnapshot:
+    """
+    A memory mapped snapshot of a table. Rows are decoded on access.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a columnar snapshot")
+
+        (header_length,) = struct.unpack("<Q", view[len(MAGIC) : len(MAGIC) + 8])
+        data_start = len(MAGIC) + 8 + header_length
+        header = json.loads(bytes(view[len(MAGIC) + 8 : data_start]))
+
+        self.token: str = header["token"]
+        self.metadata: dict[str, Any] = header["metadata"]
+        self._rows: int = header["rows"]
+        self._kinds: dict[str, str] = {}
+        self._buffers: dict[str, list[memoryview]] = {}
+        for name, column in header["columns"].items():
+            self._kinds[name] = column["kind"]
+            self._buffers[name] = [
+                view[data_start + start : data_start + start + length] for start, length in column["spans"]
+            ]
+
+        self._key_to_row: Optional[dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def numeric_column(self, name: str) -> memoryview:
+        """
+        A numeric column as a zero-copy array view.
+        """
+        kind = self._kinds[name]
+        return self._buffers[name][0].cast(ARRAY_TYPECODES[kind])
+
+    def value(self, name: str, row: int) -> Any:
+        kind = self._kinds[name]
+        if kind in ("bool", "int"):
+            value = self.numeric_column(name)[row]
+            return bool(value) if kind == "bool" else value
+
+        offsets_buffer, blob = self._buffers[name]
+        offsets = offsets_buffer.cast(ARRAY_TYPECODES["offsets"])
+        text = str(blob[offsets[row] : offsets[row + 1]], "utf-8")
+
+        return text if kind == "str" else json.loads(text)
+
+    def row(self, row: int, columns: Iterable[str]) -> dict[str, Any]:
+        return {name: self.value(name, row) for name in columns}
+
+    def key_to_row(self) -> dict[str, int]:
+        # only the key column is decoded
+        if self._key_to_row is None:
+            self._key_to_row = {self.value("key", row): row for row in range(self._rows)}
+
+        return self._key_to_row
+
+
+class SharedEntries(Sequence):
+    """
+    The entries of a shared snapshot with the changes of its delta applied, as a read-only sequence.
+    Entries are built with `constructor` (the rows were written from validated entries) when they
+    are first accessed and kept for all views of the same snapshot.
+
+    Every entry has an id, the ids below the number of rows of the snapshot are its rows, the others
+    are the items of the delta. `_ids` is the order of the entries, kept sorted in descending order
+    of `sort_key` (if any). Applying more changes (`with_changes`) gives a new view, views never change.
+    """
+
+    def __init__(
+        self,
+        snapshot: ColumnarSnapshot,
+        table_name: str,
+        constructor: Callable[[dict], Any],
+        sort_key: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        self.snapshot = snapshot
+        self.delta_offset = 0
+        self._columns = [name for name, _ in TableToSharedColumns[table_name]]
+        self._constructor = constructor
+        self._sort_key = sort_key
+        self._ids: Sequence[int] = range(len(snapshot))
+        self._key_to_id: Optional[dict[str, int]] = None
+        self._delta_items: list[dict] = []
+        # shared by all views of the snapshot, the entries of the delta are kept per view
+        self._row_entries: list[Any] = [None] * len(snapshot)
+        self._delta_entries: list[Any] = []
+
+    @property
+    def generation(self) -> tuple[str, int]:
+        return self.snapshot.token, self.delta_offset
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(entry_id) for entry_id in self._ids[index]]
+
+        return self._entry(self._ids[index])
+
+    def __iter__(self) -> Iterator:
+        for entry_id in self._ids:
+            yield self._entry(entry_id)
+
+    def _item(self, entry_id: int) -> dict:
+        if entry_id < len(self.snapshot):
+            return self.snapshot.row(entry_id, self._columns)
+
+        return self._delta_items[entry_id - len(self.snapshot)]
+
+    def _entry(self, entry_id: int) -> Any:
+        rows = len(self.snapshot)
+        built = self._row_entries if entry_id < rows else self._delta_entries
+        index = entry_id if entry_id < rows else entry_id - rows
+
+        entry = built[index]
+        if entry is None:
+            entry = self._constructor(self._item(entry_id))
+            built[index] = entry
+
+        return entry
+
+    def _get_key_to_id(self) -> dict[str, int]:
+        if self._key_to_id is None:
+            self._key_to_id = self.snapshot.key_to_row()
+
+        return self._key_to_id
+
+    def lookup(self, keys: Iterable[str]) -> list:
+        key_to_id = self._get_key_to_id()
+        entry_ids = (key_to_id.get(key) for key in keys)
+        return [self._entry(entry_id) for entry_id in entry_ids if entry_id is not None]
+
+    def items(self) -> Iterator[dict]:
+        """
+        The items of the entries in order, without building the entries.
+        """
+        for entry_id in self._ids:
+            yield self._item(entry_id)
+
+    def without_archived(self) -> "SharedEntries":
+        """
+        The view without the archived entries, the rows are filtered with the archived column
+        (without building their entries).
+        """
+        archived = self.snapshot.numeric_column("archived")
+        rows = len(self.snapshot)
+
+        view = copy.copy(self)
+        view._ids = [
+            entry_id
+            for entry_id in self._ids
+            if not (archived[entry_id] if entry_id < rows else self._delta_items[entry_id - rows].get("archived"))
+        ]
+        return view
+
+    def with_changes(self, changes: Sequence[dict], delta_offset: int) -> "SharedEntries":
+        """
+        A new view with the changes (read from the delta up to `delta_offset`) applied.
+        """
+        if len(changes) == 0 and delta_offset == self.delta_offset:
+            return self
+
+        view = copy.copy(self)
+        view.delta_offset = delta_offset
+        view._ids = list(self._ids)
+        view._key_to_id = dict(self._get_key_to_id())
+        view._delta_items = list(self._delta_items)
+        view._delta_entries = list(self._delta_entries)
+
+        for change in changes:
+            view._remove(change["key"] if change["op"] == "delete" else change["item"]["key"])
+            if change["op"] == "put":
+                view._insert(change["item"])
+
+        return view
+
+    def _remove(self, key: str) -> None:
+        entry_id = self._key_to_id.pop(key, None)
+        if entry_id is not None:
+            self._ids.remove(entry_id)
+
+    def _insert(self, item: dict) -> None:
+        entry_id = len(self.snapshot) + len(self._delta_items)
+        self._delta_items.append(item)
+        self._delta_entries.append(None)
+        self._key_to_id[item["key"]] = entry_id
+
+        index = len(self._ids)
+        if self._sort_key is not None:
+            # binary search for the first entry with a smaller sort key (the entries are in descending order)
+            sort_key = self._sort_key(self._entry(entry_id))
+            low, high = 0, len(self._ids)
+            while low < high:
+                middle = (low + high) // 2
+                if self._sort_key(self._entry(self._ids[middle])) < sort_key:
+                    high = middle
+                else:
+                    low = middle + 1
+            index = low
+
+        self._ids.insert(index, entry_id)
+
+
+def read_delta(table_name: str, token: str, offset: int) -> tuple[list[dict], int]:
+    """
+    The changes appended to the delta of a snapshot after `offset`, and the offset after them.
+    """
+    try:
+        with open(get_delta_path(table_name, token), "rb") as file:
+            file.seek(offset)
+            data = file.read()
+    except FileNotFoundError:
+        # folded into a newer snapshot, the next attach maps that one
+        return [], offset
+
+    # a line that is still being written is read the next time
+    complete = data[: data.rfind(b"\n") + 1]
+    return [json.loads(line) for line in complete.splitlines() if line.strip() != b""], offset + len(complete)
+
+
+def _publish_locked(table_name: str, items: Iterable[Mapping], metadata: Mapping[str, Any]) -> str:
+    directory = get_shared_dir()
+    previous = read_current_token(table_name)
+    # tokens are unique, a reader never mistakes a new snapshot for one it has mapped
+    token = uuid.uuid4().hex
+    path = get_columns_path(table_name, token)
+
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=path.name, delete=False) as file:
+        file.write(encode_table(table_name, token, list(items), metadata))
+    os.replace(file.name, path)
+
+    pointer_path = get_pointer_path(table_name)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=pointer_path.name, delete=False, mode="w") as file:
+        file.write(token)
+    os.replace(file.name, pointer_path)
+
+    if previous is not None:
+        _remove_snapshot_files(table_name, previous)
+
+    return token
+
+
+def _remove_snapshot_files(table_name: str, token: str) -> None:
+    try:
+        # processes that still have it mapped keep reading the old snapshot
+        get_columns_path(table_name, token).unlink(missing_ok=True)
+        get_delta_path(table_name, token).unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def publish_shared_snapshot(table_name: str, items: Sequence[Mapping], metadata: Mapping[str, Any]) -> str:
+    """
+    Write a new snapshot of a table (with some json serializable metadata) and make it
+    the current one. Returns its token.
+    """
+    with publish_lock(table_name):
+        return _publish_locked(table_name, items, metadata)
+
+
+def append_shared_changes(
+    table_name: str,
+    changes: Sequence[dict],
+    constructor: Callable[[dict], Any],
+    sort_key: Optional[Callable[[Any], Any]] = None,
+) -> None:
+    """
+    Append changes ({"op": "put", "item": ...} or {"op": "delete", "key": ...}) to the delta of
+    the current snapshot. If the delta is large, it is folded into a new snapshot.
+    """
+    with publish_lock(table_name):
+        token = read_current_token(table_name)
+        if token is None:
+            # discarded, the next reader loads the table again
+            return
+
+        delta_path = get_delta_path(table_name, token)
+        with open(delta_path, "ab") as file:
+            file.write(b"".join(json.dumps(change, default=encode_json_value).encode() + b"\n" for change in changes))
+
+        columns_size = get_columns_path(table_name, token).stat().st_size
+        if delta_path.stat().st_size <= MAX_DELTA_FRACTION * columns_size:
+            return
+
+        shared = _attach_locked(table_name, constructor, sort_key)
+        if shared is not None and shared.snapshot.token == token:
+            _publish_locked(table_name, shared.items(), shared.snapshot.metadata)
+
+
+def discard_shared_snapshot(table_name: str) -> None:
+    """
+    Drop the current snapshot, the next reader loads the table again.
+    """
+    with publish_lock(table_name):
+        token = read_current_token(table_name)
+        get_pointer_path(table_name).unlink(missing_ok=True)
+
+        if token is not None:
+            _remove_snapshot_files(table_name, token)
+
+
+_attached_lock = threading.Lock()
+_attached: dict[str, SharedEntries] = {}
+
+
+def attach_shared_entries(
+    table_name: str,
+    constructor: Callable[[dict], Any],
+    sort_key: Optional[Callable[[Any], Any]] = None,
+) -> Optional[SharedEntries]:
+    """
+    The entries of the current snapshot of a table with its delta applied. Every snapshot is mapped
+    once per process, later calls only read the changes appended to the delta since.
+    """
+    for _ in range(ATTACH_ATTEMPTS):
+        token = read_current_token(table_name)
+        if token is None:
+            return None
+
+        with _attached_lock:
+            shared = _attached.get(table_name)
+            if shared is None or shared.snapshot.token != token:
+                try:
+                    snapshot = ColumnarSnapshot(get_columns_path(table_name, token))
+                except FileNotFoundError:
+                    # replaced by a newer snapshot between reading the pointer and opening the file
+                    continue
+                except ValueError as e:
+                    print(f"Could not attach the shared snapshot of {table_name}: {e}")
+                    return None
+
+                shared = SharedEntries(snapshot, table_name, constructor, sort_key)
+
+            changes, delta_offset = read_delta(table_name, token, shared.delta_offset)
+            shared = shared.with_changes(changes, delta_offset)
+
+            _attached[table_name] = shared
+            return shared
+
+    return None
+
+
+def _attach_locked(
+    table_name: str,
+    constructor: Callable[[dict], Any],
+    sort_key: Optional[Callable[[Any], Any]] = None,
+) -> Optional[SharedEntries]:
+    # with the publish lock held no delta line is being written, the view has every change
+    return attach_shared_entries(table_name, constructor, sort_key)
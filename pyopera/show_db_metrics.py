@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+import streamlit as st
+
+from pyopera.db_metrics import dump_metrics_json, get_totals, reset_metrics
+
+
+def run():
+    st.title("Database usage")
+    st.caption("Totals of this server process since it started (or since the last reset).")
+
+    totals = get_totals()
+    if len(totals) == 0:
+        st.info("No database operations recorded yet")
+        return
+
+    group_by = st.segmented_control("Group by", ["table", "page", "operation"], default="table")
+
+    groups: defaultdict[str, dict[str, float]] = defaultdict(
+        lambda: dict(calls=0, seconds=0.0, items=0, bytes=0, consumed_capacity=0.0)
+    )
+    for operation_totals in totals:
+        group = groups[getattr(operation_totals, group_by or "table")]
+        for field in group:
+            group[field] += getattr(operation_totals, field)
+
+    st.dataframe(
+        [{group_by or "table": name, **group} for name, group in sorted(groups.items())],
+        hide_index=True,
+    )
+
+    with st.expander("All operations"):
+        st.dataframe([operation_totals.model_dump() for operation_totals in totals], hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "Download as JSON",
+            dump_metrics_json(),
+            file_name="pyopera_db_metrics.json",
+            mime="application/json",
+            icon=":material/download:",
+        )
+    with col2:
+        if st.button("Reset", icon=":material/restart_alt:"):
+            reset_metrics()
+            st.rerun()
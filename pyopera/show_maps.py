@@ -2,11 +2,6 @@ from collections import defaultdict
 from decimal import Decimal
 from typing import Optional
 
-import numpy as np
-import pandas as pd
-import plotly.express as px
-import requests
-import reverse_geocoder as rg
 import streamlit as st
 
 from pyopera.common import group_performances_by_visit
@@ -22,6 +17,8 @@ def load_countries_geojson(
     Download and cache a GeoJSON of world countries (with ISO codes under properties.ISO3166-1-Alpha-3),
     then copy that into properties.iso_a3 so we can match it easily.
     """
+    import requests
+
     resp = requests.get(url)
     resp.raise_for_status()
     geojson = resp.json()
@@ -42,6 +39,9 @@ def load_countries_geojson(
 
 @st.cache_data
 def longitude_latitude_to_country(longitude: Decimal | None, latitude: Decimal | None) -> Optional[str]:
+    # building the search tree of reverse_geocoder takes a few seconds, only do it when needed
+    import reverse_geocoder as rg
+
     if longitude is None or latitude is None:
         return None
 
@@ -60,6 +60,8 @@ def longitude_latitude_to_country(longitude: Decimal | None, latitude: Decimal |
 
 @st.cache_data
 def longitude_latitude_to_location(longitude: Decimal | None, latitude: Decimal | None) -> Optional[str]:
+    import reverse_geocoder as rg
+
     if longitude is None or latitude is None:
         return None
 
@@ -116,6 +118,8 @@ def longitude_latitude_to_location(longitude: Decimal | None, latitude: Decimal
 
 
 def calculate_city_coordinates() -> None:
+    import numpy as np
+
     performances = load_db()
     stages = load_db_venues(list_of_entries=True)
     if st.session_state.get("city_name_to_coords") is None:
@@ -132,6 +136,8 @@ def calculate_city_coordinates() -> None:
 
 
 def calculate_country_coordinates() -> None:
+    import numpy as np
+
     performances = load_db()
     stages = load_db_venues(list_of_entries=True)
     if st.session_state.get("country_name_to_coords") is None:
@@ -148,6 +154,10 @@ def calculate_country_coordinates() -> None:
 
 
 def run_maps() -> None:
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+
     performances = load_db()
     calculate_city_coordinates()
     calculate_country_coordinates()
@@ -264,6 +274,10 @@ def run_maps() -> None:
 
 @st.cache_data
 def create_countries_plot(coords_counter):
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+
     country_data = pd.DataFrame(
         [
             {
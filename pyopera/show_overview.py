@@ -13,6 +13,7 @@ from pyopera.expanded_stats import run_expanded_stats
 from pyopera.streamlit_common import (
     format_iso_date_to_day_month_year_with_dots,
     load_db,
+    load_db_progressively,
     load_db_venues,
     load_db_works_year,
 )
@@ -170,13 +171,35 @@ def create_markdown_string(db, title_and_composer_to_dates):
 
 
 def run_performances() -> None:
-    db = load_db()
-
     venues_db = load_db_venues()
 
-    markdown_string = create_performances_markdown_string(db, venues_db)
+    # rendered again after every page, so the list shows up while the rest is loading.
+    # Only the lines of the new performances are formatted, in the order of the performances
+    placeholder = st.empty()
+    lines: list[str] = []
+    undated = 0
+    for _, insertions in load_db_progressively():
+        for index, entry in insertions:
+            lines.insert(index, format_performance_line(entry, venues_db))
+            undated += entry.date is None
 
-    st.markdown(markdown_string, unsafe_allow_html=True)
+        # the performances without a date are sorted last
+        dated = len(lines) - undated
+        separator = ["---"] if undated > 0 else []
+        markdown_string = "\n".join(["# Performances", *lines[:dated], *separator, *lines[dated:]])
+
+        placeholder.markdown(markdown_string, unsafe_allow_html=True)
+
+
+def format_performance_line(entry: Performance, venues_db: dict[str, str]) -> str:
+    stage = venues_db.get(entry.stage, entry.stage)
+
+    base_string = f"{stage} - {entry.composers_display} - {entry.name}\n"
+    if entry.date is not None:
+        date = format_iso_date_to_day_month_year_with_dots(entry.date)
+        base_string = f"{date} - {base_string}"
+
+    return base_string
 
 
 def create_performances_markdown_string(
@@ -190,17 +213,11 @@ def create_performances_markdown_string(
     have_added_following_works_no_dates = False
 
     for entry in db:
-        stage = venues_db.get(entry.stage, entry.stage)
-
-        base_string = f"{stage} - {entry.composers_display} - {entry.name}\n"
-        if entry.date is not None:
-            date = format_iso_date_to_day_month_year_with_dots(entry.date)
-            base_string = f"{date} - {base_string}"
-        elif not have_added_following_works_no_dates:
+        if entry.date is None and not have_added_following_works_no_dates:
             markdown_text.append("---")
             have_added_following_works_no_dates = True
 
-        markdown_text.append(base_string)
+        markdown_text.append(format_performance_line(entry, venues_db))
 
     return "\n".join(markdown_text)
 
@@ -242,11 +259,11 @@ def create_productions_markdown_string(db: Sequence[Performance]) -> str:
 
 
 def run_productions() -> None:
-    db = load_db()
+    placeholder = st.empty()
+    for db, _ in load_db_progressively():
+        markdown_string = create_productions_markdown_string(db)
 
-    markdown_string = create_productions_markdown_string(db)
-
-    st.markdown(markdown_string, unsafe_allow_html=True)
+        placeholder.markdown(markdown_string, unsafe_allow_html=True)
 
 
 def run() -> None:
@@ -257,7 +274,12 @@ def run() -> None:
     }
 
     tabs = st.tabs(modes.keys())
+    tabs_and_modes = list(zip(tabs, modes.values()))
+
+    # the performances are filled in while the table is still loading, the other
+    # tabs need the whole table, so they are rendered afterwards
+    tabs_and_modes.sort(key=lambda tab_and_mode: tab_and_mode[1] is not run_performances)
 
-    for tab, mode_function in zip(tabs, modes.values()):
+    for tab, mode_function in tabs_and_modes:
         with tab:
             mode_function()
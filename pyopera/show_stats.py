@@ -10,10 +10,12 @@ import streamlit as st
 from more_itertools.recipes import flatten
 
 from pyopera.common import (
+    Performance,
     get_all_names_from_performance,
     group_performances_by_visit,
     visit_has_single_composer,
 )
+from pyopera.deta_base import TableSnapshot
 from pyopera.show_overview import create_performances_markdown_string
 from pyopera.show_stats_utils import (
     create_frequency_chart,
@@ -25,7 +27,9 @@ from pyopera.show_stats_utils import (
 from pyopera.streamlit_common import (
     format_iso_date_to_day_month_year_with_dots,
     load_db,
+    load_db_summaries,
     load_db_venues,
+    query_db,
     remove_singular_prefix_from_role,
 )
 
@@ -247,7 +251,7 @@ def run_query_and_analytics():
 
 def run_single_opus():
     venues_db = load_db_venues()
-    loaded_db = load_db()
+    loaded_db = load_db_summaries()
     composer_stats_eligible_keys = {
         performance.key
         for visit in group_performances_by_visit(loaded_db).values()
@@ -278,25 +282,36 @@ def run_single_opus():
 
     st.title(name)
     st.markdown(f"#### {composer}")
-    all_entries_of_opus = [performance for performance in db if performance.name == name and performance.composer == composer]
+    all_entries_of_opus = [
+        performance
+        for performance in db
+        if performance.name == name and performance.composer == composer
+    ]
 
     for entry in all_entries_of_opus:
         date_string = "" if entry.date is None else f"- {format_iso_date_to_day_month_year_with_dots(entry.date)} "
         st.markdown(f"{date_string} - {venues_db.get(entry.stage, entry.stage)}")
 
 
+@st.cache_resource(
+    show_spinner=False,
+    max_entries=2,
+    hash_funcs={TableSnapshot: lambda snapshot: (snapshot.generation, snapshot.includes_archived)},
+)
+def get_all_person_names(db: TableSnapshot[Performance]) -> list[str]:
+    return sorted(set(flatten(get_all_names_from_performance(performance) for performance in db)))
+
+
 def run_single_person():
     venues_db = load_db_venues()
 
     with st.sidebar:
-        all_persons = sorted(set(flatten(get_all_names_from_performance(performance) for performance in load_db())))
+        all_persons = get_all_person_names(load_db())
 
         person = st.selectbox("Person", all_persons)
 
     st.title(person)
-    all_entries_with_person = [
-        performance for performance in load_db() if person in get_all_names_from_performance(performance)
-    ]
+    all_entries_with_person = query_db(person=person)
     for entry in all_entries_with_person:
         all_roles = ChainMap(entry.leading_team, entry.cast)
         roles = [role for role, persons in all_roles.items() if person in persons]
@@ -0,0 +1,254 @@
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+from pyopera.common import get_key_prefix
+from pyopera.storage_backend import (
+    UPDATED_AT_ATTRIBUTE,
+    ProgressCallback,
+    UpdateConditionFailed,
+    encode_json_value,
+    project_item,
+)
+
+PAGE_SIZE = 1_000
+
+
+def get_earliest_date_iso(item: Mapping) -> str | None:
+    date = item.get("date")
+    return None if date is None else date["earliest_date"]
+
+
+def get_all_persons(item: Mapping) -> list[str]:
+    # same names as `get_all_names_from_performance`, i.e. including the composers
+    people = chain(
+        chain.from_iterable(item.get("cast", {}).values()),
+        chain.from_iterable(item.get("leading_team", {}).values()),
+        item.get("composers", []),
+    )
+    return sorted(set(people))
+
+
+# Indexed columns (extracted from the items) of each table
+TableToColumns: dict[str, dict[str, Callable[[Mapping], Any]]] = {
+    "performances": {
+        "earliest_date": get_earliest_date_iso,
+        "stage": lambda item: item["stage"],
+        "name": lambda item: item["name"],
+        "archived": lambda item: bool(item.get("archived", False)),
+    },
+    "works_dates": {
+        "title": lambda item: item["title"],
+        "composer": lambda item: item["composer"],
+    },
+    "venues": {
+        "short_name": lambda item: item["short_name"],
+    },
+    "passwords": {},
+}
+
+# Indexed columns with multiple values per item, stored in a separate table each
+TableToMultiColumns: dict[str, dict[str, Callable[[Mapping], Iterable[Any]]]] = {
+    "performances": {
+        "composer": lambda item: item.get("composers", []),
+        "person": get_all_persons,
+    },
+}
+
+# Columns that are indexed together
+TableToCompositeIndexes: dict[str, list[tuple[str, ...]]] = {
+    "performances": [("name", "earliest_date")],
+    "works_dates": [("title", "composer")],
+}
+
+
+class SqliteBackend:
+    """
+    Stores a table in a local SQLite database. Every item is stored as json alongside
+    indexed columns, so that queries are answered by SQLite instead of in Python.
+    """
+
+    is_local = True
+    supports_query = True
+
+    def __init__(self, table_name: str, path: str) -> None:
+        self._table_name = table_name
+        self._path = path
+        self._columns = TableToColumns.get(table_name, {})
+        self._multi_columns = TableToMultiColumns.get(table_name, {})
+        self._create_tables()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # a new connection per operation, sqlite connections cannot be shared between streamlit's threads
+        with closing(sqlite3.connect(self._path, timeout=30)) as connection:
+            with connection:
+                yield connection
+
+    def _multi_column_table(self, column: str) -> str:
+        return f"{self._table_name}_{column}"
+
+    def _create_tables(self) -> None:
+        table = self._table_name
+        columns = "".join(f", {column}" for column in self._columns)
+
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL{columns})"
+            )
+            for column in self._columns:
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_by_{column} ON {table} ({column})")
+
+            for index_columns in TableToCompositeIndexes.get(table, []):
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_by_{'_'.join(index_columns)} ON {table} ({', '.join(index_columns)})"
+                )
+
+            for column in self._multi_columns:
+                multi_table = self._multi_column_table(column)
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {multi_table} (key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (key, value))"
+                )
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {multi_table}_by_value ON {multi_table} (value)")
+
+    def _select(self, where: str = "", parameters: Sequence[Any] = ()) -> list[dict]:
+        with self._connect() as connection:
+            rows = connection.execute(f"SELECT data FROM {self._table_name} {where}", parameters).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def scan_items(self) -> list[dict]:
+        return self._select()
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[dict], Any]]:
+        # keyset pagination, the token is the last key of the previous page
+        last_key = start_token
+        while True:
+            with self._connect() as connection:
+                if last_key is None:
+                    rows = connection.execute(
+                        f"SELECT key, data FROM {self._table_name} ORDER BY key LIMIT ?", (PAGE_SIZE,)
+                    ).fetchall()
+                else:
+                    rows = connection.execute(
+                        f"SELECT key, data FROM {self._table_name} WHERE key > ? ORDER BY key LIMIT ?",
+                        (last_key, PAGE_SIZE),
+                    ).fetchall()
+
+            last_key = rows[-1][0] if len(rows) == PAGE_SIZE else None
+            yield [json.loads(data) for _, data in rows], last_key
+
+            if last_key is None:
+                break
+
+    def scan_projection(self, paths: Sequence[tuple[str, ...]]) -> list[dict]:
+        # the data is local, projecting after reading is as cheap as it gets
+        return [project_item(item, paths) for item in self.scan_items()]
+
+    def scan_versions(self) -> dict[str, Any]:
+        with self._connect() as connection:
+            rows = connection.execute(f"SELECT key, updated_at FROM {self._table_name}").fetchall()
+
+        return dict(rows)
+
+    def get_items(self, keys: Iterable[str]) -> list[dict]:
+        keys = list(keys)
+        if len(keys) == 0:
+            return []
+
+        placeholders = ", ".join("?" for _ in keys)
+        return self._select(f"WHERE key IN ({placeholders})", keys)
+
+    def put_items(self, items: Sequence[dict], progress: Optional[ProgressCallback] = None) -> None:
+        table = self._table_name
+        columns = ["key", "data", "updated_at", *self._columns]
+        placeholders = ", ".join("?" for _ in columns)
+
+        with self._connect() as connection:
+            for item in items:
+                updated_at = item.get(UPDATED_AT_ATTRIBUTE)
+                values = [
+                    item["key"],
+                    json.dumps(item, default=encode_json_value),
+                    None if updated_at is None else float(updated_at),
+                    *(extract(item) for extract in self._columns.values()),
+                ]
+                connection.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+
+                for column, extract in self._multi_columns.items():
+                    multi_table = self._multi_column_table(column)
+                    connection.execute(f"DELETE FROM {multi_table} WHERE key = ?", (item["key"],))
+                    connection.executemany(
+                        f"INSERT OR IGNORE INTO {multi_table} (key, value) VALUES (?, ?)",
+                        [(item["key"], value) for value in extract(item)],
+                    )
+
+        if progress is not None:
+            progress(len(items))
+
+    def update_item(
+        self,
+        key: str,
+        set_attributes: Mapping[str, Any],
+        remove_attributes: Sequence[str],
+        expected_attributes: Optional[Mapping[str, bool]] = None,
+    ) -> None:
+        # the indexed columns are derived from the whole item, so it is rewritten
+        items = self.get_items([key])
+        if len(items) == 0:
+            raise KeyError(f"Item {key} does not exist")
+
+        item = items[0]
+        for attribute, exists in (expected_attributes or {}).items():
+            if (attribute in item) != exists:
+                raise UpdateConditionFailed(f"Item {key} {'lacks' if exists else 'has'} {attribute}")
+
+        item.update(set_attributes)
+        for attribute in remove_attributes:
+            item.pop(attribute, None)
+
+        self.put_items([item])
+
+    def delete_item(self, key: str) -> None:
+        self.delete_items([key])
+
+    def delete_items(self, keys: Sequence[str], progress: Optional[ProgressCallback] = None) -> None:
+        parameters = [(key,) for key in keys]
+        with self._connect() as connection:
+            connection.executemany(f"DELETE FROM {self._table_name} WHERE key = ?", parameters)
+            for column in self._multi_columns:
+                connection.executemany(f"DELETE FROM {self._multi_column_table(column)} WHERE key = ?", parameters)
+
+        if progress is not None:
+            progress(len(keys))
+
+    def query_items(self, **filters: Any) -> list[dict]:
+        conditions = []
+        parameters = []
+
+        for field, value in filters.items():
+            if field == "date_from":
+                conditions.append("earliest_date >= ?")
+                parameters.append(value.isoformat())
+            elif field == "date_to":
+                conditions.append("earliest_date <= ?")
+                parameters.append(value.isoformat())
+            elif field == "created_from":
+                # keys start with the time they were created at
+                conditions.append("key >= ?")
+                parameters.append(get_key_prefix(value))
+            elif field in self._multi_columns:
+                multi_table = self._multi_column_table(field)
+                conditions.append(f"key IN (SELECT key FROM {multi_table} WHERE value = ?)")
+                parameters.append(value)
+            elif field in self._columns:
+                conditions.append(f"{field} = ?")
+                parameters.append(value)
+            else:
+                raise ValueError(f"Cannot query {self._table_name} by {field}")
+
+        where = "" if len(conditions) == 0 else "WHERE " + " AND ".join(conditions)
+        return self._select(where, parameters)
@@ -0,0 +1,132 @@
+import os
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Protocol, Sequence
+
+import streamlit as st
+from streamlit.errors import StreamlitSecretNotFoundError
+
+# Every item written by `put_db` records when it was written, this is used
+# to find out which items changed since a snapshot was taken
+UPDATED_AT_ATTRIBUTE = "updated_at"
+
+# Called with the number of items that have been written so far
+ProgressCallback = Callable[[int], None]
+
+# The filters that `StorageBackend.query_items` understands
+QUERY_FIELDS = ("stage", "name", "composer", "person", "archived", "date_from", "date_to", "created_from")
+
+
+class UpdateConditionFailed(Exception):
+    """
+    Raised by `StorageBackend.update_item` if the stored item does not have the expected attributes.
+    """
+
+
+def load_setting(setting_name: str, default: str) -> str:
+    """
+    Load an app setting from the [pyopera] section of the Streamlit secrets or
+    from a PYOPERA_<SETTING_NAME> environment variable.
+    """
+    try:
+        setting = st.secrets.get("pyopera", {}).get(setting_name)
+    except StreamlitSecretNotFoundError:
+        setting = None
+
+    if setting is None:
+        setting = os.getenv(f"PYOPERA_{setting_name.upper()}")
+
+    return default if setting is None else setting
+
+
+def encode_json_value(value: Any) -> Any:
+    """
+    `default` for `json.dumps` of raw items, DynamoDB returns all numbers as decimals.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+
+    raise TypeError(f"Object of type {type(value)} is not JSON serializable")
+
+
+def project_item(item: Mapping, paths: Sequence[tuple[str, ...]]) -> dict:
+    """
+    Keep only the given attribute paths of an item, e.g. ("leading_team", "Inszenierung").
+    Paths that do not exist in the item are skipped.
+    """
+    projected: dict = {}
+    for path in paths:
+        value = item
+        for part in path:
+            if not isinstance(value, Mapping) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+
+    return projected
+
+
+class StorageBackend(Protocol):
+    """
+    The storage of one table. Items are plain dictionaries as they are stored
+    (i.e. the json dump of a model), every item has a string "key".
+    """
+
+    # local backends are not mirrored to on-disk snapshots
+    is_local: bool
+    # whether `query_items` filters in the backend
+    supports_query: bool
+
+    def scan_items(self) -> list[dict]: ...
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[dict], Any]]:
+        """
+        Iterate over the items page by page. Every page comes with a json serializable
+        token that continues the iteration after it (None after the last page).
+        """
+        ...
+
+    def scan_projection(self, paths: Sequence[tuple[str, ...]]) -> list[dict]:
+        """
+        Scan only the given attribute paths of every item, see `project_item`.
+        """
+        ...
+
+    def scan_versions(self) -> dict[str, Any]:
+        """
+        Map the key of every item to the time it was last written.
+        """
+        ...
+
+    def get_items(self, keys: Iterable[str]) -> list[dict]: ...
+
+    def put_items(self, items: Sequence[dict], progress: Optional[ProgressCallback] = None) -> None: ...
+
+    def update_item(
+        self,
+        key: str,
+        set_attributes: Mapping[str, Any],
+        remove_attributes: Sequence[str],
+        expected_attributes: Optional[Mapping[str, bool]] = None,
+    ) -> None:
+        """
+        Change only the given attributes of an existing item. If `expected_attributes` is given
+        (attribute -> whether the stored item has it) and the stored item does not match it,
+        nothing is changed and `UpdateConditionFailed` is raised.
+        """
+        ...
+
+    def delete_item(self, key: str) -> None: ...
+
+    def delete_items(self, keys: Sequence[str], progress: Optional[ProgressCallback] = None) -> None: ...
+
+    def query_items(self, **filters: Any) -> list[dict]:
+        """
+        Return the items matching all filters, see `QUERY_FIELDS`. Backends may apply only
+        some of the filters (the caller filters the result again) and raise NotImplementedError
+        if none of them can be answered without reading the whole table.
+        """
+        ...
@@ -1,21 +1,22 @@
+import bisect
 import platform
 import re
 from datetime import date, datetime
-from typing import Literal, Mapping, Sequence, overload
+from typing import Callable, Iterator, Literal, Mapping, Sequence, overload
 
 import streamlit as st
 
 from pyopera.common import (
-    DB_TYPE,
     ApproxDate,
     Performance,
+    PerformanceSummary,
     VenueModel,
     WorkYearEntryModel,
     soft_isinstance,
 )
-from pyopera.deta_base import DatabaseInterface
+from pyopera.deta_base import TableSnapshot, get_date_sort_key, get_interface, track_stale_reads
 
-WORKS_DATES_INTERFACE = DatabaseInterface(WorkYearEntryModel)
+WORKS_DATES_INTERFACE = get_interface(WorkYearEntryModel)
 
 
 def load_db_works_year() -> dict[tuple[str, str], WorkYearEntryModel]:
@@ -23,29 +24,91 @@ def load_db_works_year() -> dict[tuple[str, str], WorkYearEntryModel]:
     return {(data.title, data.composer): data for data in raw_data}
 
 
-PERFORMANCES_INTERFACE = DatabaseInterface(Performance)
+PERFORMANCES_INTERFACE = get_interface(Performance)
 
 
-def load_db(include_archived_entries: bool = False) -> DB_TYPE:
-    raw_data = PERFORMANCES_INTERFACE.fetch_db()
+def load_db(include_archived_entries: bool = False) -> TableSnapshot[Performance]:
+    performances = PERFORMANCES_INTERFACE.fetch_db()
+    if include_archived_entries:
+        return performances
+
+    return performances.without_archived
+
+
+def get_ascending_sort_key(performance: Performance) -> tuple[int, int]:
+    # `get_date_sort_key` negated, ascending order of this key is descending order by date
+    earliest_date, day_index = get_date_sort_key(performance)
+    return -earliest_date.toordinal(), -day_index
+
+
+def load_db_progressively(
+    include_archived_entries: bool = False,
+) -> Iterator[tuple[list[Performance], list[tuple[int, Performance]]]]:
+    """
+    Yield the performances loaded so far (sorted by date) after every page that is read, together
+    with the (index, performance) insertions that added the page to them. Callers that keep a list
+    parallel to the performances (e.g. of rendered lines) apply the same insertions in order,
+    instead of rebuilding it for every page.
+    """
+    loaded: list[Performance] = []
+    sort_keys: list[tuple[int, int]] = []
+    for page in PERFORMANCES_INTERFACE.iter_db(cache=True):
+        if not include_archived_entries:
+            page = [entry for entry in page if not entry.archived]
+
+        insertions = []
+        for entry in page:
+            sort_key = get_ascending_sort_key(entry)
+            # after the entries with the same date, like a stable sort
+            index = bisect.bisect_right(sort_keys, sort_key)
+            sort_keys.insert(index, sort_key)
+            loaded.insert(index, entry)
+            insertions.append((index, entry))
+
+        yield loaded, insertions
+
+
+def load_db_summaries(include_archived_entries: bool = False) -> Sequence[PerformanceSummary | Performance]:
+    raw_data = PERFORMANCES_INTERFACE.fetch_summaries()
     if not include_archived_entries:
         raw_data = [entry for entry in raw_data if not entry.archived]
 
     return raw_data
 
 
-VENUES_INTERFACE = DatabaseInterface(VenueModel)
+def load_performance_details(key: str) -> Performance:
+    details = PERFORMANCES_INTERFACE.fetch_details([key])
+    if len(details) == 0:
+        raise KeyError(f"Performance {key} does not exist")
+
+    return details[0]
+
+
+def load_current_performance(key: str) -> Performance:
+    """
+    The stored version of a performance, including the changes other replicas made since
+    the change log was last polled.
+    """
+    PERFORMANCES_INTERFACE.sync_changes(force=True)
+    return load_performance_details(key)
+
+
+def query_db(**filters) -> list[Performance]:
+    return PERFORMANCES_INTERFACE.query(**filters)
+
+
+VENUES_INTERFACE = get_interface(VenueModel)
 
 
 @overload
-def load_db_venues(list_of_entries: Literal[True]) -> list[VenueModel]: ...
+def load_db_venues(list_of_entries: Literal[True]) -> Sequence[VenueModel]: ...
 
 
 @overload
 def load_db_venues(list_of_entries: Literal[False] = False) -> dict[str, str]: ...
 
 
-def load_db_venues(list_of_entries: bool = False) -> dict[str, str] | list[VenueModel]:
+def load_db_venues(list_of_entries: bool = False) -> dict[str, str] | Sequence[VenueModel]:
     raw_data = VENUES_INTERFACE.fetch_db()
 
     if list_of_entries:
@@ -54,6 +117,20 @@ def load_db_venues(list_of_entries: bool = False) -> dict[str, str] | list[Venue
     return {data.short_name: data.name for data in raw_data}
 
 
+def run_with_staleness_indicator(page_run: Callable[[], None]) -> None:
+    """
+    Run a page and note in the sidebar which tables it showed stale data of
+    (see the "stale_while_revalidate" setting).
+    """
+    stale_reads = track_stale_reads()
+    page_run()
+
+    for table_name, age in sorted(stale_reads.items()):
+        st.sidebar.caption(
+            f":material/history: {table_name.replace('_', ' ').capitalize()} from {age / 60:.0f} min ago, updating"
+        )
+
+
 def key_is_exception(key: str) -> bool:
     exceptions = {"orchester", "orchestra", "chor"}
     key_alpha_lower = "".join(filter(str.isalpha, key.lower()))
@@ -0,0 +1,50 @@
+"""
+Test cases against DynamoDB as mocked by moto. They are skipped if moto is not installed.
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from pyopera import create_table, rate_limit
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+SETTINGS = {
+    "aws_access_key_id": "testing",
+    "aws_secret_access_key": "testing",
+    "aws_region": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+
+@unittest.skipIf(mock_aws is None, "moto is not installed")
+class MockDynamoDBTestCase(unittest.TestCase):
+    """
+    Every test gets empty mocked tables and new table handles and token buckets.
+    """
+
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(os.environ, SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        self.addCleanup(self.forget_handles)
+        self.forget_handles()
+
+    @staticmethod
+    def forget_handles() -> None:
+        create_table._dynamodb_resources.clear()
+        create_table._tables.clear()
+        create_table._rate_limited_tables.clear()
+        rate_limit._buckets.clear()
+        rate_limit._index_buckets.clear()
@@ -0,0 +1,194 @@
+"""
+The change log, the gap handling on its own and reading against DynamoDB as mocked by moto.
+
+    python -m unittest tests.test_change_log
+"""
+
+import random
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from benchmarks.synthetic_data import create_synthetic_performance
+from pyopera import change_log
+
+from pyopera.change_log import (
+    CHANGE_LOG_RETENTION_SECONDS,
+    CHANGE_LOG_TABLE_NAME,
+    MISSING_ENTRY_GRACE_SECONDS,
+    ChangeLog,
+    ChangeLogGap,
+    TableVersion,
+    change_digest,
+)
+from pyopera.common import Performance
+from pyopera.create_table import get_table, make_change_log_table
+from pyopera.deta_base import DatabaseInterface, get_detail_cache, get_table_cache
+from tests.mock_dynamodb import MockDynamoDBTestCase
+
+TABLE_NAME = "performances"
+
+
+def create_entry(seq: int, age: float = 0.0) -> dict:
+    # entries expire a fixed time after they were written
+    expires_at = int(time.time() - age) + CHANGE_LOG_RETENTION_SECONDS
+    return {"table": TABLE_NAME, "seq": seq, "expires_at": expires_at, "op": "delete", "key": f"key{seq}"}
+
+
+def get_seqs(entries: list[dict]) -> list[int]:
+    return [int(entry["seq"]) for entry in entries]
+
+
+class ContiguousEntriesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.change_log = ChangeLog(TABLE_NAME)
+
+    def test_contiguous(self) -> None:
+        entries = [create_entry(seq) for seq in range(4, 8)]
+        self.assertEqual(get_seqs(self.change_log._contiguous_entries(3, entries)), [4, 5, 6, 7])
+
+    def test_no_entries(self) -> None:
+        self.assertEqual(self.change_log._contiguous_entries(3, []), [])
+
+    def test_recent_gap_stops_before_it(self) -> None:
+        # seq 6 is reserved but its writer has not written it yet
+        entries = [create_entry(4), create_entry(5), create_entry(7), create_entry(8)]
+        self.assertEqual(get_seqs(self.change_log._contiguous_entries(3, entries)), [4, 5])
+
+    def test_recent_gap_at_the_start(self) -> None:
+        entries = [create_entry(5), create_entry(6)]
+        self.assertEqual(self.change_log._contiguous_entries(3, entries), [])
+
+    def test_old_gap_is_lost(self) -> None:
+        entries = [create_entry(4), create_entry(6, age=MISSING_ENTRY_GRACE_SECONDS + 10)]
+        with self.assertRaises(ChangeLogGap):
+            self.change_log._contiguous_entries(3, entries)
+
+    def test_expired_entries_are_lost(self) -> None:
+        # the entries after the last read one were removed, the oldest remaining one is old too
+        entries = [create_entry(10, age=MISSING_ENTRY_GRACE_SECONDS + 10), create_entry(11)]
+        with self.assertRaises(ChangeLogGap):
+            self.change_log._contiguous_entries(3, entries)
+
+
+class ReadSinceTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.table = get_table(CHANGE_LOG_TABLE_NAME, make_change_log_table)
+        self.change_log = ChangeLog(TABLE_NAME)
+
+    def put_entries(self, entries: list[dict]) -> None:
+        with self.table.batch_writer() as batch:
+            for entry in entries:
+                batch.put_item(Item=entry)
+
+    def test_read_since(self) -> None:
+        self.put_entries([create_entry(seq) for seq in range(1, 6)])
+        # entries of other tables are not read
+        self.put_entries([{**create_entry(seq), "table": "venues"} for seq in range(1, 6)])
+
+        self.assertEqual(get_seqs(self.change_log.read_since(2)), [3, 4, 5])
+        self.assertEqual(self.change_log.read_since(5), [])
+
+    def test_read_since_recent_gap(self) -> None:
+        self.put_entries([create_entry(1), create_entry(2), create_entry(4)])
+        self.assertEqual(get_seqs(self.change_log.read_since(0)), [1, 2])
+
+    def test_read_since_old_gap(self) -> None:
+        old = MISSING_ENTRY_GRACE_SECONDS + 10
+        self.put_entries([create_entry(1, age=old), create_entry(3, age=old)])
+
+        with self.assertRaises(ChangeLogGap):
+            self.change_log.read_since(0)
+
+
+class AppendTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.change_log = ChangeLog(TABLE_NAME)
+
+    def test_append_and_read_since(self) -> None:
+        first = [
+            {"op": "put", "key": "a", "item": {"key": "a", "name": "Tosca", "updated_at": Decimal("1700000000.120")}},
+            {"op": "delete", "key": "b"},
+        ]
+        second = [{"op": "reload", "key": "*"}]
+
+        self.change_log.append(first)
+        self.change_log.append([])
+        self.change_log.append(second)
+
+        entries = self.change_log.read_since(0)
+        self.assertEqual(get_seqs(entries), [1, 2, 3])
+        self.assertEqual({key: entries[0][key] for key in first[0]}, first[0])
+        self.assertEqual([entry["op"] for entry in entries], ["put", "delete", "reload"])
+        self.assertEqual(get_seqs(self.change_log.read_since(2)), [3])
+
+        # the checksum of the entries read back matches the one added up when they were appended
+        checksum = sum(change_digest(entry) for entry in entries)
+        self.assertEqual(checksum, sum(change_digest(entry) for entry in [*first, *second]))
+        self.assertEqual(self.change_log.current_version(), TableVersion(3, checksum))
+
+    def test_empty(self) -> None:
+        self.assertEqual(self.change_log.current_version(), TableVersion(0, 0))
+        self.assertEqual(self.change_log.read_since(0), [])
+
+
+def fail_once(function):
+    # the first call fails like a throttled request that ran out of retries, later ones go through
+    calls = []
+
+    def run(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+
+        return function(*args, **kwargs)
+
+    return run
+
+
+class FailedAppendTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.addCleanup(get_table_cache.clear)
+        self.addCleanup(get_detail_cache.clear)
+        self.interface = DatabaseInterface(Performance)
+        self.performance = create_synthetic_performance(random.Random(0))
+        self.change_log = ChangeLog("performances")
+
+    def after_grace_period(self):
+        return mock.patch.object(change_log.time, "time", return_value=time.time() + MISSING_ENTRY_GRACE_SECONDS + 10)
+
+    def test_entries_not_written(self) -> None:
+        with mock.patch.object(change_log, "batch_write", fail_once(change_log.batch_write)):
+            self.interface.put_db(self.performance)
+
+        # the entry of the write is missing, the reload entry after it is found once the gap is old enough
+        self.assertEqual(self.change_log.current_version().generation, 2)
+        self.assertEqual(self.change_log.read_since(0), [])
+        with self.after_grace_period(), self.assertRaises(ChangeLogGap):
+            self.change_log.read_since(0)
+
+    def test_sequence_numbers_not_reserved(self) -> None:
+        with mock.patch.object(ChangeLog, "_allocate", fail_once(ChangeLog._allocate)):
+            self.interface.put_db(self.performance)
+
+        entries = self.change_log.read_since(0)
+        self.assertEqual([entry["op"] for entry in entries], ["reload"])
+        self.assertEqual(self.change_log.current_version().generation, 1)
+
+    def test_reload_entry_not_written(self) -> None:
+        failing_write = mock.Mock(side_effect=ClientError({"Error": {"Code": "InternalServerError"}}, "BatchWriteItem"))
+        with mock.patch.object(change_log, "batch_write", failing_write):
+            # the write itself is not failed
+            self.interface.put_db(self.performance)
+
+        # the sequence numbers were still reserved, the gap is found once a later entry is written
+        self.assertEqual(self.change_log.current_version().generation, 2)
+        self.change_log.append([{"op": "delete", "key": "other"}])
+        with self.after_grace_period(), self.assertRaises(ChangeLogGap):
+            self.change_log.read_since(0)
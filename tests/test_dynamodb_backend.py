@@ -0,0 +1,145 @@
+"""
+The DynamoDB backend against DynamoDB as mocked by moto.
+
+    python -m unittest tests.test_dynamodb_backend
+"""
+
+import os
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from pyopera.create_table import get_table
+from pyopera.dynamodb_backend import DynamoDBBackend
+from tests.mock_dynamodb import MockDynamoDBTestCase
+
+TABLE_NAME = "test_items"
+
+
+def create_items(count: int) -> list[dict]:
+    return [
+        dict(key=f"item{index:04}", name=f"Item {index}", count=Decimal(index), tags=["a", "b"], nested={"x": "y"})
+        for index in range(count)
+    ]
+
+
+class ScanTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.items = create_items(300)
+        with get_table(TABLE_NAME).batch_writer() as batch:
+            for item in self.items:
+                batch.put_item(Item=item)
+
+    def test_scan_items(self) -> None:
+        items = DynamoDBBackend(TABLE_NAME).scan_items()
+        self.assertCountEqual(items, self.items)
+
+    def test_parallel_scan_items(self) -> None:
+        items = DynamoDBBackend(TABLE_NAME, total_segments=4).scan_items()
+        self.assertCountEqual(items, self.items)
+
+    def test_iter_pages(self) -> None:
+        items = [item for page, _ in DynamoDBBackend(TABLE_NAME).iter_pages() for item in page]
+        self.assertCountEqual(items, self.items)
+
+    def test_scan_projection(self) -> None:
+        items = DynamoDBBackend(TABLE_NAME, total_segments=2).scan_projection([("key",), ("nested", "x")])
+        self.assertCountEqual(items, [dict(key=item["key"], nested={"x": "y"}) for item in self.items])
+
+    def test_scan_versions(self) -> None:
+        versions = DynamoDBBackend(TABLE_NAME).scan_versions()
+        self.assertEqual(versions, {item["key"]: None for item in self.items})
+
+
+class GetItemsTest(MockDynamoDBTestCase):
+    def test_get_items(self) -> None:
+        items = create_items(150)
+        with get_table(TABLE_NAME).batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+        # more keys than one BatchGetItem request takes, and one that does not exist
+        keys = [item["key"] for item in items] + ["missing"]
+        self.assertCountEqual(DynamoDBBackend(TABLE_NAME).get_items(keys), items)
+
+
+class WriteTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.backend = DynamoDBBackend(TABLE_NAME)
+
+    def test_put_items(self) -> None:
+        items = create_items(60)
+        done = []
+        self.backend.put_items(items, progress=done.append)
+
+        self.assertCountEqual(self.backend.scan_items(), items)
+        self.assertEqual(done[-1], len(items))
+
+    def test_put_items_replaces_items(self) -> None:
+        items = create_items(10)
+        self.backend.put_items(items)
+        # the later of two items with the same key wins
+        self.backend.put_items([{**items[0], "name": "Old"}, {**items[0], "name": "New"}])
+
+        self.assertEqual(self.backend.get_items([items[0]["key"]]), [{**items[0], "name": "New"}])
+
+    def test_delete_items(self) -> None:
+        items = create_items(60)
+        self.backend.put_items(items)
+        self.backend.delete_items([item["key"] for item in items[:40]])
+
+        self.assertCountEqual(self.backend.scan_items(), items[40:])
+
+    def test_delete_item(self) -> None:
+        items = create_items(2)
+        self.backend.put_items(items)
+        self.backend.delete_item(items[0]["key"])
+
+        self.assertEqual(self.backend.scan_items(), items[1:])
+
+    def test_update_item(self) -> None:
+        items = create_items(1)
+        self.backend.put_items(items)
+        self.backend.update_item(items[0]["key"], {"name": "Renamed", "archived": True}, ["tags"])
+
+        expected = {key: value for key, value in items[0].items() if key != "tags"}
+        self.assertEqual(self.backend.scan_items(), [{**expected, "name": "Renamed", "archived": True}])
+
+
+class QueryTest(MockDynamoDBTestCase):
+    def create_backend(self, indexes: str) -> DynamoDBBackend:
+        # the table is created (with the enabled indexes) on first use
+        patcher = mock.patch.dict(os.environ, {"PYOPERA_DYNAMODB_QUERIES": "true", "PYOPERA_DYNAMODB_INDEXES": indexes})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return DynamoDBBackend("performances")
+
+    def test_indexes_are_opt_in(self) -> None:
+        backend = self.create_backend("")
+        backend.put_items(create_items(1))
+
+        self.assertFalse(backend.supports_query)
+        self.assertEqual(get_table("performances").global_secondary_indexes or [], [])
+
+    def test_query_enabled_index(self) -> None:
+        backend = self.create_backend("stage-index")
+        items = [
+            {**item, "stage": "WSO" if index % 3 == 0 else "BSO", "earliest_date": f"2020-01-{index + 1:02}"}
+            for index, item in enumerate(create_items(20))
+        ]
+        backend.put_items(items)
+
+        indexes = [index["IndexName"] for index in get_table("performances").global_secondary_indexes]
+        self.assertEqual(indexes, ["stage-index"])
+        self.assertTrue(backend.supports_query)
+
+        expected = [item for item in items if item["stage"] == "WSO" and item["earliest_date"] >= "2020-01-10"]
+        self.assertCountEqual(backend.query_items(stage="WSO", date_from=date(2020, 1, 10)), expected)
+
+        # the year index is not enabled
+        with self.assertRaises(NotImplementedError):
+            backend.query_items(date_from=date(2020, 1, 1), date_to=date(2020, 12, 31))
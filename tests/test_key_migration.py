@@ -0,0 +1,53 @@
+"""
+The time-ordered keys that performances with old (random) keys are migrated to.
+
+    python -m unittest tests.test_key_migration
+"""
+
+import hashlib
+import random
+import unittest
+from datetime import date, datetime, timezone
+
+from benchmarks.synthetic_data import create_synthetic_performance
+from pyopera.common import ApproxDate, Performance, get_key_prefix, get_key_time, is_time_ordered_key
+from pyopera.key_migration import get_migrated_key, plan_migration
+
+
+def create_old_performance(performance_date: date, old_key: str = "old") -> Performance:
+    performance = create_synthetic_performance(random.Random(0))
+    return Performance(
+        **{
+            **performance.model_dump(),
+            "key": hashlib.sha1(old_key.encode()).hexdigest(),
+            "visit_index": None,
+            "date": ApproxDate(earliest_date=performance_date, latest_date=performance_date),
+        }
+    )
+
+
+class MigratedKeyTest(unittest.TestCase):
+    def test_time_is_the_date(self) -> None:
+        performance = create_old_performance(date(2015, 5, 17))
+        key = get_migrated_key(performance)
+
+        self.assertTrue(is_time_ordered_key(key))
+        self.assertEqual(get_key_time(key), datetime(2015, 5, 17, tzinfo=timezone.utc))
+        self.assertEqual(get_migrated_key(performance), key)
+
+    def test_before_1970(self) -> None:
+        performances = [create_old_performance(date(1955, 3, 1), "a"), create_old_performance(date(1969, 12, 31), "b")]
+        keys = [get_migrated_key(performance) for performance in performances]
+
+        self.assertEqual([get_key_time(key) for key in keys], [datetime(1970, 1, 1, tzinfo=timezone.utc)] * 2)
+        self.assertNotEqual(keys[0], keys[1])
+
+        # the migrated performances are valid
+        self.assertEqual([new.key for _, new in plan_migration(performances)], keys)
+
+    def test_prefix_before_1970(self) -> None:
+        self.assertEqual(get_key_prefix(datetime(1900, 1, 1, tzinfo=timezone.utc)), "0" * 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
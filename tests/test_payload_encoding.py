@@ -0,0 +1,73 @@
+"""
+The compressed payload of items.
+
+    python -m unittest tests.test_payload_encoding
+"""
+
+import unittest
+
+from boto3.dynamodb.types import Binary
+
+from pyopera.payload_encoding import (
+    PAYLOAD_ATTRIBUTE,
+    compress_payload,
+    decompress_payload,
+    is_compressed,
+    item_size,
+)
+
+FIELDS = ("cast", "leading_team")
+
+
+def create_item() -> dict:
+    return dict(
+        key="a" * 40,
+        name="Tosca",
+        cast={"Tosca": ["Anna Netrebko"], "Cavaradossi": ["Jonas Kaufmann"], "Scarpia": ["Bryn Terfel"]},
+        leading_team={"Musikalische Leitung": ["Zubin Mehta"], "Inszenierung": ["Margarethe Wallmann"]},
+        comments="Einspringer als Scarpia, Gänsehaut im 2. Akt",
+    )
+
+
+class PayloadEncodingTest(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        item = create_item()
+        compressed = compress_payload(item, FIELDS)
+
+        self.assertTrue(is_compressed(compressed))
+        self.assertNotIn("cast", compressed)
+        self.assertNotIn("leading_team", compressed)
+        self.assertEqual(decompress_payload(compressed), item)
+
+    def test_round_trip_as_read_from_dynamodb(self) -> None:
+        # boto3 returns binary attributes wrapped in `Binary`
+        item = create_item()
+        compressed = compress_payload(item, FIELDS)
+        compressed[PAYLOAD_ATTRIBUTE] = Binary(compressed[PAYLOAD_ATTRIBUTE])
+
+        self.assertEqual(decompress_payload(compressed), item)
+
+    def test_kept_paths_stay_uncompressed(self) -> None:
+        item = create_item()
+        compressed = compress_payload(item, FIELDS, kept_paths=[("leading_team", "Inszenierung"), ("name",)])
+
+        self.assertEqual(compressed["leading_team"], {"Inszenierung": ["Margarethe Wallmann"]})
+        self.assertEqual(compressed["name"], "Tosca")
+        # the full field from the payload replaces the kept part
+        self.assertEqual(decompress_payload(compressed), item)
+
+    def test_missing_fields(self) -> None:
+        item = dict(key="b" * 40, name="Wozzeck")
+        self.assertEqual(decompress_payload(compress_payload(item, FIELDS)), item)
+
+    def test_uncompressed_item_is_read_as_it_is(self) -> None:
+        item = create_item()
+
+        self.assertFalse(is_compressed(item))
+        self.assertEqual(decompress_payload(item), item)
+
+    def test_compression_makes_large_items_smaller(self) -> None:
+        item = create_item()
+        item["cast"] = {f"Role {index}": [f"Singer {index}"] for index in range(200)}
+
+        self.assertLess(item_size(compress_payload(item, FIELDS)), item_size(item))
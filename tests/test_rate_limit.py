@@ -0,0 +1,131 @@
+"""
+The token bucket and the backoff of throttled requests, with a fake clock.
+
+    python -m unittest tests.test_rate_limit
+"""
+
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from pyopera.rate_limit import (
+    MAX_BACKOFF_SECONDS,
+    MAX_RETRIES,
+    MIN_RATE_FRACTION,
+    RATE_INCREASE_FRACTION,
+    TokenBucket,
+    backoff_delay,
+    call_with_backoff,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def throttling_error() -> ClientError:
+    return ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Scan")
+
+
+class FakeClockTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        patcher = mock.patch("pyopera.rate_limit.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(FakeClockTestCase):
+    def test_starts_with_the_burst_capacity(self) -> None:
+        bucket = TokenBucket(10.0, burst_seconds=5.0)
+
+        for _ in range(49):
+            bucket.wait()
+            bucket.consume(1.0)
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_waits_for_the_debt_of_a_large_page(self) -> None:
+        bucket = TokenBucket(10.0, burst_seconds=5.0)
+        bucket.wait()
+        bucket.consume(70.0)
+
+        bucket.wait()
+        # 20 units of debt at 10 units per second
+        self.assertAlmostEqual(sum(self.clock.sleeps), 2.0, places=2)
+
+    def test_saves_up_at_most_the_burst(self) -> None:
+        bucket = TokenBucket(10.0, burst_seconds=5.0)
+        bucket.consume(50.0)
+        self.clock.now += 1000.0
+
+        bucket.consume(60.0)
+        bucket.wait()
+        self.assertAlmostEqual(sum(self.clock.sleeps), 1.0, places=2)
+
+    def test_throttling_halves_the_rate_and_empties_the_bucket(self) -> None:
+        bucket = TokenBucket(10.0, burst_seconds=5.0)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 5.0)
+
+        bucket.wait()
+        # the burst is used up, the next request waits for the (halved) rate
+        self.assertGreater(sum(self.clock.sleeps), 0.0)
+
+    def test_rate_stays_above_the_minimum(self) -> None:
+        bucket = TokenBucket(10.0)
+        for _ in range(20):
+            bucket.throttled()
+
+        self.assertAlmostEqual(bucket.rate, 10.0 * MIN_RATE_FRACTION)
+
+    def test_rate_recovers_up_to_the_capacity(self) -> None:
+        bucket = TokenBucket(10.0)
+        bucket.throttled()
+        for _ in range(100):
+            bucket.consume(0.0)
+
+        self.assertEqual(bucket.rate, 10.0)
+
+
+class CallWithBackoffTest(FakeClockTestCase):
+    def test_retries_throttled_requests(self) -> None:
+        operation = mock.Mock(
+            side_effect=[throttling_error(), throttling_error(), {"ConsumedCapacity": {"CapacityUnits": 3.0}}]
+        )
+        bucket = TokenBucket(10.0)
+
+        response = call_with_backoff(operation, bucket, TableName="performances")
+
+        self.assertEqual(response, {"ConsumedCapacity": {"CapacityUnits": 3.0}})
+        self.assertEqual(operation.call_count, 3)
+        operation.assert_called_with(ReturnConsumedCapacity="TOTAL", TableName="performances")
+        self.assertEqual(bucket.rate, 10.0 / 4 + 10.0 * RATE_INCREASE_FRACTION)
+
+    def test_raises_other_errors(self) -> None:
+        operation = mock.Mock(side_effect=ClientError({"Error": {"Code": "ValidationException"}}, "Scan"))
+
+        with self.assertRaises(ClientError):
+            call_with_backoff(operation, None)
+        self.assertEqual(operation.call_count, 1)
+
+    def test_gives_up_after_the_retries(self) -> None:
+        operation = mock.Mock(side_effect=throttling_error())
+
+        with self.assertRaises(ClientError):
+            call_with_backoff(operation, TokenBucket(10.0))
+        self.assertEqual(operation.call_count, MAX_RETRIES + 1)
+
+    def test_backoff_delay_is_bounded(self) -> None:
+        for attempt in range(30):
+            self.assertLessEqual(backoff_delay(attempt), MAX_BACKOFF_SECONDS)
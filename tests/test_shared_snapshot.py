@@ -0,0 +1,159 @@
+"""
+The memory mapped columnar snapshot: publishing, appending to its delta and attaching.
+
+    python -m unittest tests.test_shared_snapshot
+"""
+
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.synthetic_data import create_synthetic_performance
+from pyopera import shared_snapshot
+from pyopera.common import Performance, construct_performance_unchecked
+from pyopera.deta_base import get_date_sort_key
+from pyopera.shared_snapshot import (
+    append_shared_changes,
+    attach_shared_entries,
+    discard_shared_snapshot,
+    get_shared_dir,
+    publish_shared_snapshot,
+)
+
+TABLE_NAME = "performances"
+
+
+def to_item(performance: Performance) -> dict:
+    return json.loads(performance.model_dump_json())
+
+
+def sort_performances(performances: list[Performance]) -> list[Performance]:
+    # the order in which the table is published and kept
+    return sorted(performances, key=get_date_sort_key, reverse=True)
+
+
+class SharedSnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        patcher = mock.patch.dict(os.environ, {"PYOPERA_SHARED_SNAPSHOT_DIR": os.path.join(directory.name, "shared")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.forget_attached()
+        self.addCleanup(self.forget_attached)
+
+        rng = random.Random(0)
+        self.performances = sort_performances([create_synthetic_performance(rng) for _ in range(50)])
+        self.performances[3] = Performance(**{**self.performances[3].model_dump(), "archived": True})
+        self.new_performances = [create_synthetic_performance(rng) for _ in range(5)]
+
+    @staticmethod
+    def forget_attached() -> None:
+        # like a process that has not attached any snapshot yet
+        shared_snapshot._attached.clear()
+
+    def attach(self):
+        return attach_shared_entries(TABLE_NAME, construct_performance_unchecked, get_date_sort_key)
+
+    def publish(self) -> str:
+        return publish_shared_snapshot(TABLE_NAME, [to_item(p) for p in self.performances], {"change_seq": 7})
+
+    def append(self, put: list[Performance], deleted: list[str]) -> None:
+        changes = [dict(op="delete", key=key) for key in deleted]
+        changes.extend(dict(op="put", item=to_item(performance)) for performance in put)
+        append_shared_changes(TABLE_NAME, changes, construct_performance_unchecked, get_date_sort_key)
+
+    def test_nothing_published(self) -> None:
+        self.assertIsNone(self.attach())
+
+    def test_publish_and_attach(self) -> None:
+        token = self.publish()
+        shared = self.attach()
+
+        self.assertEqual(list(shared), self.performances)
+        self.assertEqual(shared.generation, (token, 0))
+        self.assertEqual(shared.snapshot.metadata, {"change_seq": 7})
+        self.assertEqual(shared[5], self.performances[5])
+        self.assertEqual(shared[2:4], self.performances[2:4])
+
+    def test_entries_are_built_once(self) -> None:
+        self.publish()
+        shared = self.attach()
+
+        self.assertIs(shared[0], shared[0])
+        self.assertIs(self.attach()[0], shared[0])
+
+    def test_lookup(self) -> None:
+        self.publish()
+        keys = [self.performances[10].key, "missing", self.performances[2].key]
+
+        self.assertEqual(self.attach().lookup(keys), [self.performances[10], self.performances[2]])
+
+    def test_without_archived(self) -> None:
+        self.publish()
+        expected = [performance for performance in self.performances if not performance.archived]
+
+        self.assertEqual(list(self.attach().without_archived()), expected)
+
+    def test_append_and_attach(self) -> None:
+        self.publish()
+        before = self.attach()
+
+        deleted = [self.performances[0].key, self.performances[20].key]
+        changed = Performance(**{**self.performances[7].model_dump(), "comments": "Changed"})
+        # the delta of the small test table is not folded into a new snapshot
+        with mock.patch.object(shared_snapshot, "MAX_DELTA_FRACTION", 100.0):
+            self.append([*self.new_performances, changed], deleted)
+
+        expected = [performance for performance in self.performances if performance.key not in deleted]
+        expected = [changed if performance.key == changed.key else performance for performance in expected]
+        expected = sort_performances([*expected, *self.new_performances])
+
+        after = self.attach()
+        self.assertEqual(list(after), expected)
+        self.assertEqual(after.lookup([changed.key, deleted[0]]), [changed])
+        self.assertEqual(after.generation[0], before.generation[0])
+        self.assertNotEqual(after.generation, before.generation)
+        # views never change
+        self.assertEqual(list(before), self.performances)
+
+        # another process maps the snapshot and reads the whole delta
+        self.forget_attached()
+        self.assertEqual(list(self.attach()), expected)
+
+    def test_large_delta_is_folded_into_a_new_snapshot(self) -> None:
+        token = self.publish()
+
+        with mock.patch.object(shared_snapshot, "MAX_DELTA_FRACTION", 0.0):
+            self.append(self.new_performances, [self.performances[0].key])
+
+        shared = self.attach()
+        self.assertNotEqual(shared.generation[0], token)
+        self.assertEqual(shared.generation[1], 0)
+        self.assertEqual(shared.snapshot.metadata, {"change_seq": 7})
+        self.assertEqual(list(shared), sort_performances([*self.performances[1:], *self.new_performances]))
+        # the files of the old snapshot are removed
+        self.assertEqual([path for path in os.listdir(get_shared_dir()) if token in path], [])
+
+    def test_discard(self) -> None:
+        token = self.publish()
+        self.attach()
+        discard_shared_snapshot(TABLE_NAME)
+
+        self.assertIsNone(self.attach())
+        # changes without a snapshot are dropped, the next reader loads the table
+        self.append(self.new_performances, [])
+        self.assertIsNone(self.attach())
+
+        # a snapshot published after a discard never has the token of an earlier one
+        self.assertNotEqual(self.publish(), token)
+        self.assertEqual(list(self.attach()), self.performances)
+
+    def test_private_directory(self) -> None:
+        self.publish()
+        self.assertEqual(os.stat(get_shared_dir()).st_mode & 0o777, 0o700)
@@ -0,0 +1,174 @@
+"""
+Concurrent readers of a table that is not cached share a single scan, also while it is written to.
+
+    python -m unittest tests.test_single_flight
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+from unittest import mock
+
+from pyopera.common import VenueModel
+from pyopera.deta_base import DatabaseInterface, fetch_all_cached, get_table_cache
+
+SESSIONS = 50
+
+SCAN_SECONDS = 0.2
+
+
+class CountingBackend:
+    """
+    Wraps the storage backend of a table, counts the scans and makes them slow.
+    """
+
+    def __init__(self, backend) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._backend, name)
+
+    def _count_scan(self) -> None:
+        with self._lock:
+            self.scans += 1
+
+        # long enough for all sessions to arrive (and writes to happen) while the scan is running
+        time.sleep(SCAN_SECONDS)
+
+    def scan_items(self) -> list[dict]:
+        self._count_scan()
+        return self._backend.scan_items()
+
+    def iter_pages(self, start_token: Any = None) -> Iterator[tuple[list[dict], Any]]:
+        self._count_scan()
+        yield from self._backend.iter_pages(start_token)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        settings = {
+            "PYOPERA_STORAGE_BACKEND": "sqlite",
+            "PYOPERA_SQLITE_PATH": os.path.join(directory.name, "test.sqlite3"),
+            "PYOPERA_STALE_WHILE_REVALIDATE": "false",
+            "PYOPERA_SHARED_SNAPSHOT": "false",
+        }
+        patcher = mock.patch.dict(os.environ, settings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.interface = DatabaseInterface(VenueModel)
+        self.venues = [VenueModel(name=f"Venue {index}", short_name=f"V{index}") for index in range(100)]
+        self.interface.put_db(self.venues)
+
+        self.backend = CountingBackend(self.interface._backend)
+        self.interface._backend = self.backend
+
+        self.table_cache = get_table_cache(self.interface)
+        self.table_cache.invalidate()
+        self.addCleanup(get_table_cache.clear)
+
+    def read_concurrently(self, read, while_loading=None) -> list[set[str]]:
+        """
+        The keys every session read. All sessions start at the same moment, like the sessions
+        rerunning after an edit. `while_loading` is called once the table is loading.
+        """
+        barrier = threading.Barrier(SESSIONS)
+
+        def run_session(index: int) -> set[str]:
+            barrier.wait()
+            return {entry.key for entry in read(index)}
+
+        with ThreadPoolExecutor(max_workers=SESSIONS) as executor:
+            sessions = executor.map(run_session, range(SESSIONS))
+
+            if while_loading is not None:
+                while not self.table_cache.is_loading:
+                    time.sleep(0.001)
+                while_loading()
+
+            return list(sessions)
+
+    def iter_db(self) -> list[VenueModel]:
+        return [entry for page in self.interface.iter_db(cache=True) for entry in page]
+
+    def test_fetch_all_cached_scans_once(self) -> None:
+        keys = self.read_concurrently(lambda _: fetch_all_cached(self.interface))
+
+        self.assertEqual(keys, [{venue.key for venue in self.venues}] * SESSIONS)
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_fetch_db_scans_once(self) -> None:
+        keys = self.read_concurrently(lambda _: self.interface.fetch_db())
+
+        self.assertEqual(keys, [{venue.key for venue in self.venues}] * SESSIONS)
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_iter_db_scans_once(self) -> None:
+        # like the overview pages, some sessions load the table progressively and some all at once
+        keys = self.read_concurrently(lambda index: self.iter_db() if index % 2 == 0 else self.interface.fetch_db())
+
+        self.assertEqual(keys, [{venue.key for venue in self.venues}] * SESSIONS)
+        self.assertEqual(self.backend.scans, 1)
+        self.assertTrue(self.table_cache.is_loaded)
+
+        self.assertEqual(len(self.iter_db()), len(self.venues))
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_iter_db_stopped_early(self) -> None:
+        pages = self.interface.iter_db(cache=True)
+        next(pages)
+        pages.close()
+
+        # the flight was abandoned, the next session loads the table
+        self.assertFalse(self.table_cache.is_loading)
+        self.assertEqual(len(self.interface.fetch_db()), len(self.venues))
+        self.assertEqual(self.backend.scans, 2)
+
+    def test_writes_while_loading(self) -> None:
+        added = VenueModel(name="New venue", short_name="NV")
+        deleted = self.venues[0]
+
+        def write() -> None:
+            self.interface.put_db(added)
+            self.interface.delete_item_db(deleted)
+
+        keys = self.read_concurrently(lambda _: self.interface.fetch_db(), while_loading=write)
+
+        expected = {venue.key for venue in self.venues[1:]} | {added.key}
+        self.assertEqual(keys, [expected] * SESSIONS)
+        self.assertEqual({entry.key for entry in self.interface.fetch_db()}, expected)
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_writes_after_loading(self) -> None:
+        self.read_concurrently(lambda _: self.interface.fetch_db())
+
+        added = VenueModel(name="New venue", short_name="NV")
+        self.interface.put_db(added)
+        self.interface.delete_item_db(self.venues[0].key)
+
+        keys = self.read_concurrently(lambda index: self.iter_db() if index % 2 == 0 else self.interface.fetch_db())
+
+        expected = {venue.key for venue in self.venues[1:]} | {added.key}
+        self.assertEqual(keys, [expected] * SESSIONS)
+        # the writes are applied to the cached entries, which are not loaded again
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_refresh_scans_once_more(self) -> None:
+        self.read_concurrently(lambda _: self.interface.fetch_db())
+        self.interface.refresh_db()
+        self.read_concurrently(lambda index: self.iter_db() if index % 2 == 0 else self.interface.fetch_db())
+
+        self.assertEqual(self.backend.scans, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Updates send only the changed attributes, also with compressed payloads, against DynamoDB as mocked by moto.
+
+    python -m unittest tests.test_update_db
+"""
+
+import os
+import random
+from unittest import mock
+
+from benchmarks.synthetic_data import create_synthetic_performance
+from pyopera.common import Performance
+from pyopera.create_table import get_table
+from pyopera.deta_base import DatabaseInterface, get_detail_cache, get_table_cache
+from pyopera.payload_encoding import PAYLOAD_ATTRIBUTE
+from tests.mock_dynamodb import MockDynamoDBTestCase
+
+LARGE_ATTRIBUTES = {"cast", PAYLOAD_ATTRIBUTE}
+
+
+class UpdateDbTest(MockDynamoDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.addCleanup(get_table_cache.clear)
+        self.addCleanup(get_detail_cache.clear)
+        self.performance = create_synthetic_performance(random.Random(0))
+
+    def create_interface(self, compress: bool) -> DatabaseInterface[Performance]:
+        with mock.patch.dict(os.environ, {"PYOPERA_COMPRESS_PAYLOADS": str(compress).lower()}):
+            return DatabaseInterface(Performance)
+
+    def update_comments(self, interface: DatabaseInterface[Performance]) -> list[mock.call]:
+        new_performance = Performance(**{**self.performance.model_dump(), "comments": "Great evening"})
+        with mock.patch.object(interface._backend, "update_item", wraps=interface._backend.update_item) as update:
+            interface.update_db(self.performance, new_performance)
+
+        return update.call_args_list
+
+    def get_stored_item(self) -> dict:
+        return get_table("performances").get_item(Key={"key": self.performance.key})["Item"]
+
+    def assert_stored_comments(self, interface: DatabaseInterface[Performance]) -> None:
+        stored = interface._validate_items([self.get_stored_item()])[0]
+        self.assertEqual(stored, Performance(**{**self.performance.model_dump(), "comments": "Great evening"}))
+
+    def test_uncompressed(self) -> None:
+        interface = self.create_interface(compress=False)
+        interface.put_db(self.performance)
+
+        calls = self.update_comments(interface)
+
+        self.assertEqual(len(calls), 1)
+        key, set_attributes, remove_attributes = calls[0].args[:3]
+        self.assertEqual(set_attributes.keys() & LARGE_ATTRIBUTES, set())
+        self.assertEqual(remove_attributes, [])
+        self.assert_stored_comments(interface)
+
+    def test_compressed(self) -> None:
+        interface = self.create_interface(compress=True)
+        interface.put_db(self.performance)
+
+        calls = self.update_comments(interface)
+
+        self.assertEqual(len(calls), 1)
+        key, set_attributes, remove_attributes = calls[0].args[:3]
+        self.assertEqual(set_attributes.keys() & LARGE_ATTRIBUTES, set())
+        self.assertEqual(remove_attributes, [])
+        self.assertIn(PAYLOAD_ATTRIBUTE, self.get_stored_item())
+        self.assert_stored_comments(interface)
+
+    def test_compression_turned_off(self) -> None:
+        self.create_interface(compress=True).put_db(self.performance)
+        interface = self.create_interface(compress=False)
+
+        calls = self.update_comments(interface)
+
+        # the first update finds the payload and is not applied, the second one rewrites the large fields
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn(PAYLOAD_ATTRIBUTE, self.get_stored_item())
+        self.assertEqual(self.get_stored_item()["cast"], self.performance.cast)
+        self.assert_stored_comments(interface)
+
+    def test_compression_turned_on(self) -> None:
+        self.create_interface(compress=False).put_db(self.performance)
+        interface = self.create_interface(compress=True)
+
+        calls = self.update_comments(interface)
+
+        self.assertEqual(len(calls), 2)
+        self.assertIn(PAYLOAD_ATTRIBUTE, self.get_stored_item())
+        self.assertNotIn("cast", self.get_stored_item())
+        self.assert_stored_comments(interface)